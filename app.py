@@ -1,154 +1,351 @@
 # Using IslamicFinder API-compatible calculations
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from utils.db import execute_query
+from utils import aladhan, export, grid, http_cache, metrics, responses
+from utils.db import get_pool_stats, connection_scope
+from utils.geo import location_key
+from utils.hijri import ramadan_calendar
+from utils.logging_config import configure_logging
+from utils.mosque_index import mosque_index
+from utils.mosques import find_nearby_mosques
+from utils.prayer_calc import UndefinedTimeError, calculate_prayer_times
+from utils.profiling import RequestProfiler
+from utils.prayer_cache import (
+    cache_prayer_times, get_approximate_prayer_times, get_cache_writer_stats,
+    get_cached_prayer_times, get_cached_prayer_times_bulk, get_cached_prayer_times_range,
+    get_l1_cache_stats, get_cached_prayer_times_between
+)
+from utils.singleflight import SingleFlight, export_metrics
+from utils.timetable import calculate_timetable
+from config import Config
+import calendar
+import itertools
+import logging
 import math
-import requests
+import threading
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider that counts response encoding as the request's serialize
+    phase, and encodes with orjson when it is installed
+    """
+
+    def response(self, *args, **kwargs):
+        with metrics.phase('serialize'):
+            if (self.compact is None and self._app.debug) or self.compact is False:
+                # Pretty-printed output
+                return super().response(*args, **kwargs)
+            obj = self._prepare_response_obj(args, kwargs)
+            return self._app.response_class(responses.dumps(obj, self.default, self.sort_keys) + b'\n', mimetype=self.mimetype)
 
 app = Flask(__name__)
+app.json = TimedJSONProvider(app)
 CORS(app)
 
-def calculate_prayer_times_accurate(lat, lon, date, method='ISNA', asr_method='standard'):
+if Config.MOSQUE_INDEX_ENABLED:
+    mosque_index.start()
+
+# Concurrent cache misses for the same key share one computation
+prayer_flight = SingleFlight()
+export_metrics(prayer_flight, 'salah_single_flight')
+
+# Computes cache misses of batch requests in parallel
+batch_executor = ThreadPoolExecutor(max_workers=Config.BATCH_WORKERS, thread_name_prefix='batch')
+
+# Recomputes days that were served approximately while the upstream was down
+refresh_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='refresh')
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+# ============= REQUEST METRICS =============
+
+@app.before_request
+def start_request_metrics():
+    g.metrics_token = metrics.start_request()
+
+@app.after_request
+def note_response_status(response):
+    g.response_status = response.status_code
+    return response
+
+@app.teardown_request
+def record_request_metrics(exc):
+    # Teardown also runs when an exception skips the after_request hooks;
+    # without a response status the request counts as a 500
+    token = g.pop('metrics_token', None)
+    if token is not None:
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        status = 500 if exc is not None else g.pop('response_status', 500)
+        metrics.finish_request(token, endpoint, request.method, status)
+
+@app.after_request
+def compress(response):
+    with metrics.phase('serialize'):
+        return responses.compress_response(response, request.accept_encodings)
+
+metrics.gauge('salah_db_pool_connections', 'Pooled database connections by state',
+              lambda: {(state,): get_pool_stats().get(key, 0)
+                       for state, key in (('in_use', 'in_use'), ('idle', 'available'), ('waiting', 'waiting'))},
+              ('state',))
+metrics.gauge('salah_cache_writer_queued_rows', 'Cache rows waiting to be written',
+              lambda: get_cache_writer_stats()['queued'])
+metrics.callback_counter('salah_cache_writer_dropped_rows_total',
+                         'Cache rows not written because the queue was full or the write failed',
+                         lambda: get_cache_writer_stats()['dropped'])
+metrics.gauge('salah_upstream_circuit_open', '1 while the upstream circuit breaker is not closed',
+              lambda: 0 if aladhan.breaker.state == 'closed' else 1)
+
+if Config.PROFILING_ENABLED:
+    RequestProfiler(
+        mode=Config.PROFILING_MODE,
+        sample_rate=Config.PROFILING_SAMPLE_RATE,
+        admin_token=Config.ADMIN_TOKEN
+    ).init_app(app)
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Metrics in the Prometheus text format"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+def fetch_prayer_times_aladhan(lat, lon, date, method='ISNA', asr_method='standard'):
     """
-    Calculate prayer times using the Aladhan API (free, reliable, accurate)
-    This is what IslamicFinder and most apps use behind the scenes
+    Fetch prayer times from the Aladhan API
+    Only used when PRAYER_TIMES_SOURCE=aladhan; the local engine is the default
     """
     try:
-        # Format date
-        date_str = date.strftime('%d-%m-%Y')
-        
-        # Method mapping to Aladhan API codes
-        method_codes = {
-            'ISNA': 2,
-            'MWL': 3,
-            'EGYPTIAN': 5,
-            'KARACHI': 1,
-            'MAKKAH': 4,
-            'TEHRAN': 7
-        }
-        
-        method_code = method_codes.get(method, 2)
-        
-        # School mapping (0 = Standard Shafi, 1 = Hanafi)
-        school = 1 if asr_method == 'hanafi' else 0
-        
-        # Call Aladhan API
-        url = f'http://api.aladhan.com/v1/timings/{date_str}'
-        params = {
-            'latitude': lat,
-            'longitude': lon,
-            'method': method_code,
-            'school': school
-        }
-        
-        response = requests.get(url, params=params, timeout=10)
-        
-        if response.status_code == 200:
-            data = response.json()
-            
-            if data['code'] == 200:
-                timings = data['data']['timings']
-                
-                # Extract and format times (they come as HH:MM)
-                times = {
-                    'fajr': timings['Fajr'],
-                    'sunrise': timings['Sunrise'],
-                    'dhuhr': timings['Dhuhr'],
-                    'asr': timings['Asr'],
-                    'maghrib': timings['Maghrib'],
-                    'isha': timings['Isha']
-                }
-                
-                print(f"✅ Prayer times calculated via Aladhan API:")
-                print(f"   Location: {lat:.4f}, {lon:.4f}")
-                print(f"   Date: {date.strftime('%Y-%m-%d')}")
-                print(f"   Method: {method}, Asr: {asr_method}")
-                print(f"   Fajr: {times['fajr']}, Sunrise: {times['sunrise']}, Dhuhr: {times['dhuhr']}")
-                print(f"   Asr: {times['asr']}, Maghrib: {times['maghrib']}, Isha: {times['isha']}")
-                
-                return times
-            else:
-                raise Exception(f"Aladhan API error: {data.get('data', 'Unknown error')}")
-        else:
-            raise Exception(f"HTTP error: {response.status_code}")
-            
+        return aladhan.fetch_day(lat, lon, date, method, asr_method)
     except Exception as e:
-        print(f"❌ Prayer time calculation error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.warning("Aladhan fetch failed: %s", e)
         raise
 
-def get_cached_prayer_times(lat, lon, date_str, method, asr_method):
-    """Get cached prayer times from database"""
+def calculate_prayer_times_accurate(lat, lon, date, method='ISNA', asr_method='standard'):
+    """
+    Calculate prayer times for a location and date
+    Uses the local astronomical engine (same algorithm as Aladhan) unless
+    PRAYER_TIMES_SOURCE is set to 'aladhan'. Days the engine has no time
+    for (polar day/night) are asked from Aladhan.
+    """
+    if Config.PRAYER_TIMES_SOURCE == 'aladhan':
+        return fetch_prayer_times_aladhan(lat, lon, date, method, asr_method)
+
     try:
-        # Round coordinates to 4 decimal places for cache matching
-        lat = round(lat, 4)
-        lon = round(lon, 4)
-        
-        query = """
-            SELECT fajr_time, sunrise_time, dhuhr_time, asr_time, 
-                   maghrib_time, isha_time
-            FROM prayer_time_cache
-            WHERE ROUND(CAST(latitude AS numeric), 4) = %s 
-              AND ROUND(CAST(longitude AS numeric), 4) = %s 
-              AND prayer_date = %s
-              AND calculation_method = %s
-              AND asr_method = %s
-            LIMIT 1
-        """
-        
-        result = execute_query(query, (lat, lon, date_str, method, asr_method), fetch_one=True)
-        
-        if result:
-            return {
-                'fajr': str(result['fajr_time'])[:-3] if result['fajr_time'] else '00:00',
-                'sunrise': str(result['sunrise_time'])[:-3] if result['sunrise_time'] else '00:00',
-                'dhuhr': str(result['dhuhr_time'])[:-3] if result['dhuhr_time'] else '00:00',
-                'asr': str(result['asr_time'])[:-3] if result['asr_time'] else '00:00',
-                'maghrib': str(result['maghrib_time'])[:-3] if result['maghrib_time'] else '00:00',
-                'isha': str(result['isha_time'])[:-3] if result['isha_time'] else '00:00'
-            }
+        return calculate_prayer_times(lat, lon, date, method, asr_method)
+    except UndefinedTimeError as e:
+        logger.info("%s, asking Aladhan", e)
+        return fetch_prayer_times_aladhan(lat, lon, date, method, asr_method)
     except Exception as e:
-        print(f"⚠️ Cache lookup failed: {e}")
+        logger.warning("Prayer time calculation error: %s", e)
+        raise
+
+def calculate_prayer_times_for_dates(lat, lon, dates, method='ISNA', asr_method='standard', polar_fallback=True):
+    """
+    Calculate prayer times for several dates of one location
+    The local engine computes the whole span in a single vectorized pass,
+    Aladhan is asked for whole months
+
+    Args:
+        polar_fallback: Ask Aladhan when the local engine has no time for
+            some day (polar day/night); if False, UndefinedTimeError is raised
+
+    Returns:
+        Dict of date -> times dict
+    """
+    if not dates:
+        return {}
+
+    if Config.PRAYER_TIMES_SOURCE == 'aladhan':
+        # One calendar request per month instead of one request per day
+        return aladhan.fetch_dates(lat, lon, dates, method, asr_method)
+
+    try:
+        return calculate_dates_locally(lat, lon, dates, method, asr_method)
+    except UndefinedTimeError as e:
+        if not polar_fallback:
+            raise
+        logger.info("%s, asking Aladhan", e)
+        return aladhan.fetch_dates(lat, lon, dates, method, asr_method)
+
+def calculate_dates_locally(lat, lon, dates, method='ISNA', asr_method='standard'):
+    """
+    Calculate prayer times for several dates with the local engine, in
+    one vectorized pass over their span, whatever PRAYER_TIMES_SOURCE is
+
+    Returns:
+        Dict of date -> times dict
+    """
+    first = min(dates)
+    num_days = (max(dates) - first).days + 1
+    timetable = calculate_timetable(lat, lon, first, num_days, method, asr_method)
+    return {d: timetable[(d - first).days] for d in dates}
+
+def get_prayer_times_for_dates(lat, lon, dates, method, asr_method):
+    """
+    Get prayer times for several dates, serving what is cached and
+    computing all missing days together
+
+    Returns:
+        (times_by_date, approximate): dict of date -> times dict, and True
+        if some days are stand-ins because the upstream is unavailable
+    """
+    times_by_date, approximate, _ = get_grid_prayer_times(lat, lon, dates, method, asr_method)
+    return times_by_date, approximate
+
+def get_grid_prayer_times(lat, lon, dates, method, asr_method):
+    """
+    get_prayer_times_for_dates for the grid cell(s) serving the location
+    under GRID_MODE (see utils/grid.py), or the location itself
+
+    Returns:
+        (times_by_date, approximate, cached): cached is True if no day had
+        to be computed
+    """
+    points = grid.cache_points(lat, lon)
+    if len(points) == 1:
+        return _get_location_prayer_times(points[0][0], points[0][1], dates, method, asr_method)
+    
+    parts = [_get_location_prayer_times(point_lat, point_lon, dates, method, asr_method)
+             for point_lat, point_lon, _ in points]
+    weights = [weight for _, _, weight in points]
+    times_by_date = {date: grid.blend([part[0][date] for part in parts], weights) for date in dates}
+    return times_by_date, any(part[1] for part in parts), all(part[2] for part in parts)
+
+def _get_location_prayer_times(lat, lon, dates, method, asr_method):
+    # Reuse one pooled connection for all the cache reads and writes
+    with connection_scope():
+        times_by_date, missing = get_cached_prayer_times_range(lat, lon, dates, method, asr_method)
+    
+    approximate = False
+    if missing:
+        key = ('range', *location_key(lat, lon), tuple(d.strftime('%Y-%m-%d') for d in missing),
+               method, asr_method)
+        try:
+            with metrics.phase('compute'):
+                computed = prayer_flight.do(key, _compute_and_cache_dates, lat, lon, missing, method, asr_method)
+        except aladhan.UPSTREAM_ERRORS as e:
+            computed = get_approximate_or_raise(e, lat, lon, missing, method, asr_method)
+            approximate = True
+        times_by_date.update(computed)
+    
+    return times_by_date, approximate, not missing
+
+def _compute_and_cache_dates(lat, lon, dates, method, asr_method):
+    computed = calculate_prayer_times_for_dates(lat, lon, dates, method, asr_method)
+    with connection_scope():
+        for date, times in computed.items():
+            cache_prayer_times(lat, lon, date.strftime('%Y-%m-%d'), method, asr_method, times)
+    return computed
+
+def _compute_and_cache_day(lat, lon, date, date_str, method, asr_method):
+    times = calculate_prayer_times_accurate(lat, lon, date, method, asr_method)
+    cache_prayer_times(lat, lon, date_str, method, asr_method, times)
+    return times
+
+def get_approximate_or_raise(error, lat, lon, dates, method, asr_method):
+    """
+    Degraded mode: serve stand-in times (a nearby cached cell or the day
+    before) for dates the upstream couldn't provide, and recompute them in
+    the background. Re-raises error if any date has no stand-in.
+    """
+    stand_ins = get_approximate_prayer_times(lat, lon, dates, method, asr_method)
+    if len(stand_ins) < len(dates):
+        raise error
     
-    return None
+    logger.warning("Serving approximate prayer times: %s", error)
+    schedule_refresh(lat, lon, dates, method, asr_method)
+    return stand_ins
+
+def schedule_refresh(lat, lon, dates, method, asr_method):
+    """Compute and cache dates in the background (at most one refresh per key)"""
+    key = ('range', *location_key(lat, lon), tuple(d.strftime('%Y-%m-%d') for d in dates),
+           method, asr_method)
+    with _refreshing_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+    refresh_executor.submit(_refresh, key, lat, lon, dates, method, asr_method)
 
-def cache_prayer_times(lat, lon, date_str, method, asr_method, times):
-    """Cache calculated prayer times to database"""
+def _refresh(key, lat, lon, dates, method, asr_method):
+    # While the circuit is open this fails immediately; once it half-opens,
+    # the refresh is the trial request
     try:
-        # Round coordinates to 4 decimal places
-        lat = round(lat, 4)
-        lon = round(lon, 4)
-        
-        query = """
-            INSERT INTO prayer_time_cache 
-            (latitude, longitude, calculation_method, asr_method, prayer_date,
-             fajr_time, sunrise_time, dhuhr_time, asr_time, maghrib_time, isha_time)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (latitude, longitude, calculation_method, asr_method, prayer_date)
-            DO UPDATE SET
-                fajr_time = EXCLUDED.fajr_time,
-                sunrise_time = EXCLUDED.sunrise_time,
-                dhuhr_time = EXCLUDED.dhuhr_time,
-                asr_time = EXCLUDED.asr_time,
-                maghrib_time = EXCLUDED.maghrib_time,
-                isha_time = EXCLUDED.isha_time
-        """
-        
-        execute_query(query, (
-            lat, lon, method, asr_method, date_str,
-            times['fajr'], times['sunrise'], times['dhuhr'],
-            times['asr'], times['maghrib'], times['isha']
-        ))
-        
-        print(f"💾 Prayer times cached for {date_str}")
+        prayer_flight.do(key, _compute_and_cache_dates, lat, lon, dates, method, asr_method)
     except Exception as e:
-        print(f"⚠️ Failed to cache prayer times: {e}")
+        logger.warning("Background refresh failed: %s", e)
+    finally:
+        with _refreshing_lock:
+            _refreshing.discard(key)
+
+def upstream_unavailable_response(error):
+    """503 with Retry-After for requests that need the upstream while it is down"""
+    response = jsonify({
+        'success': False,
+        'error': f'Prayer time source unavailable: {error}'
+    })
+    response.status_code = 503
+    retry_after = getattr(error, 'retry_after', None) or aladhan.ALADHAN_BREAKER_RESET_SECONDS
+    response.headers['Retry-After'] = str(math.ceil(retry_after))
+    return response
+
+def compute_prayer_times_once(lat, lon, date, date_str, method, asr_method):
+    """
+    Calculate and cache times for one day
+    Concurrent callers for the same location/date/method wait for a single computation
+    """
+    key = ('day', *location_key(lat, lon), date_str, method, asr_method)
+    with metrics.phase('compute'):
+        return prayer_flight.do(key, _compute_and_cache_day, lat, lon, date, date_str, method, asr_method)
 
 # ============= PRAYER TIMES ROUTE =============
 
+def prayer_times_payload(date_str, times, method, asr_method, cached, approximate=False):
+    """Response body of /api/prayer-times (also built by the async app)"""
+    result = {
+        'success': True,
+        'date': date_str,
+        'times': times,
+        'method': method,
+        'asr_method': asr_method,
+        'cached': cached
+    }
+    if approximate:
+        result['approximate'] = True
+    return result
+
+def build_prayer_times_result(lat, lon, date_str, method, asr_method, bypass_cache=False):
+    """Response body for one day's prayer times (shared by the POST and GET routes)"""
+    date = datetime.strptime(date_str, '%Y-%m-%d')
+    
+    # Check cache first (unless bypassed)
+    if not bypass_cache:
+        points = grid.cache_points(lat, lon)
+        if len(points) > 1:
+            times_by_date, approximate, cached = get_grid_prayer_times(lat, lon, [date], method, asr_method)
+            return prayer_times_payload(date_str, times_by_date[date], method, asr_method,
+                                        cached=cached or approximate, approximate=approximate)
+        lat, lon = points[0][:2]
+        
+        cached = get_cached_prayer_times(lat, lon, date_str, method, asr_method)
+        if cached:
+            logger.debug("Serving cached prayer times for %s", date_str)
+            return prayer_times_payload(date_str, cached, method, asr_method, cached=True)
+    
+    # Calculate new times
+    logger.debug("Calculating prayer times for %s", date_str)
+    try:
+        times = compute_prayer_times_once(lat, lon, date, date_str, method, asr_method)
+    except aladhan.UPSTREAM_ERRORS as e:
+        times = get_approximate_or_raise(e, lat, lon, [date], method, asr_method)[date]
+        return prayer_times_payload(date_str, times, method, asr_method, cached=True, approximate=True)
+    
+    return prayer_times_payload(date_str, times, method, asr_method, cached=False)
+
 @app.route('/api/prayer-times', methods=['POST'])
 def get_prayer_times():
     """Get prayer times for specific date and location"""
@@ -162,47 +359,172 @@ def get_prayer_times():
         asr_method = data.get('asr_method', 'standard')
         bypass_cache = data.get('bypass_cache', False)
         
-        # Parse date
-        date = datetime.strptime(date_str, '%Y-%m-%d')
+        return jsonify(build_prayer_times_result(lat, lon, date_str, method, asr_method, bypass_cache))
         
-        # Check cache first (unless bypassed)
-        if not bypass_cache:
-            cached = get_cached_prayer_times(lat, lon, date_str, method, asr_method)
-            if cached:
-                print(f"📦 Serving cached prayer times for {date_str}")
-                return jsonify({
-                    'success': True,
-                    'date': date_str,
-                    'times': cached,
-                    'method': method,
-                    'asr_method': asr_method,
-                    'cached': True
-                })
-        
-        # Calculate new times using Aladhan API
-        print(f"🔄 Calculating prayer times via Aladhan API for {date_str}")
-        times = calculate_prayer_times_accurate(lat, lon, date, method, asr_method)
-        
-        # Cache the results
-        cache_prayer_times(lat, lon, date_str, method, asr_method, times)
+    except aladhan.UPSTREAM_ERRORS as e:
+        logger.warning("Prayer times error: %s", e)
+        return upstream_unavailable_response(e)
+    except Exception as e:
+        logger.exception("Prayer times error: %s", e)
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+# ============= BATCH PRAYER TIMES ROUTE =============
+
+def _parse_batch_item(item):
+    """Validate one batch item, raising ValueError with a client-facing message"""
+    if not isinstance(item, dict):
+        raise ValueError('Item must be an object')
+    
+    lat = float(item.get('latitude'))
+    lon = float(item.get('longitude'))
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError('Coordinates out of range')
+    
+    if item.get('date'):
+        start_date = end_date = datetime.strptime(item['date'], '%Y-%m-%d').date()
+    else:
+        start_date = datetime.strptime(item.get('start_date') or '', '%Y-%m-%d').date()
+        end_date = datetime.strptime(item.get('end_date') or '', '%Y-%m-%d').date()
+    
+    num_days = (end_date - start_date).days + 1
+    if num_days < 1:
+        raise ValueError('end_date is before start_date')
+    if num_days > Config.BATCH_MAX_DAYS:
+        raise ValueError(f'Date range longer than {Config.BATCH_MAX_DAYS} days')
+    
+    return {
+        'latitude': lat,
+        'longitude': lon,
+        'single_date': bool(item.get('date')),
+        'dates': [start_date + timedelta(days=i) for i in range(num_days)],
+        'method': item.get('method', 'ISNA'),
+        'asr_method': item.get('asr_method', 'standard')
+    }
+
+def _batch_item_result(item, times_by_date, cached, fmt='full', time_format='hhmm'):
+    """Build the response entry for one batch item"""
+    result = {
+        'success': True,
+        'latitude': item['latitude'],
+        'longitude': item['longitude'],
+        'method': item['method'],
+        'asr_method': item['asr_method'],
+        'cached': cached
+    }
+    if item['single_date']:
+        date = item['dates'][0]
+        result['date'] = date.strftime('%Y-%m-%d')
+        result['times'] = responses.format_times(times_by_date[date], time_format)
+    else:
+        result['start_date'] = item['dates'][0].strftime('%Y-%m-%d')
+        result['end_date'] = item['dates'][-1].strftime('%Y-%m-%d')
+        result['days'] = responses.format_days([{
+            'date': date.strftime('%Y-%m-%d'),
+            'times': times_by_date[date]
+        } for date in item['dates']], fmt, time_format)
+    return result
+
+@app.route('/api/prayer-times/batch', methods=['POST'])
+def get_prayer_times_batch():
+    """Get prayer times for many locations and dates in one call"""
+    data = request.json
+    
+    try:
+        items = data.get('items')
+        if not isinstance(items, list) or not items:
+            return jsonify({'success': False, 'error': 'items must be a non-empty list'}), 400
+        if len(items) > Config.BATCH_MAX_ITEMS:
+            return jsonify({
+                'success': False,
+                'error': f'Batch too large: {len(items)} items (max {Config.BATCH_MAX_ITEMS})'
+            }), 400
+        fmt, time_format = responses.response_format(data, request.accept_mimetypes)
+        
+        results = [None] * len(items)
+        parsed = []
+        for i, item in enumerate(items):
+            try:
+                parsed.append((i, _parse_batch_item(item)))
+            except (TypeError, ValueError) as e:
+                results[i] = {'success': False, 'error': str(e)}
+        
+        # All cache hits in one query, then all misses in parallel
+        lookups = get_cached_prayer_times_bulk([
+            (p['latitude'], p['longitude'], p['dates'], p['method'], p['asr_method'])
+            for _, p in parsed
+        ])
+        futures = {}
+        for (i, p), (found, missing) in zip(parsed, lookups):
+            if missing:
+                futures[i] = batch_executor.submit(
+                    calculate_prayer_times_for_dates,
+                    p['latitude'], p['longitude'], missing, p['method'], p['asr_method']
+                )
+        
+        with connection_scope():
+            for (i, p), (found, missing) in zip(parsed, lookups):
+                try:
+                    with metrics.phase('compute'):
+                        computed = futures[i].result() if i in futures else {}
+                except Exception as e:
+                    results[i] = {'success': False, 'error': str(e)}
+                    continue
+                
+                for date, times in computed.items():
+                    cache_prayer_times(p['latitude'], p['longitude'], date.strftime('%Y-%m-%d'),
+                                       p['method'], p['asr_method'], times)
+                results[i] = _batch_item_result(p, {**found, **computed}, not missing, fmt, time_format)
         
-        return jsonify({
+        result = {
             'success': True,
-            'date': date_str,
-            'times': times,
-            'method': method,
-            'asr_method': asr_method,
-            'cached': False
-        })
+            'count': len(results),
+            'results': results
+        }
+        if fmt != 'full' or time_format != 'hhmm':
+            result['format'] = fmt
+            result['times'] = time_format
+        return jsonify(result)
         
     except Exception as e:
-        print(f"❌ Prayer times error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Batch prayer times error: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 400
 
 # ============= MONTHLY PRAYERS ROUTE =============
 
+def month_dates(year, month):
+    num_days = calendar.monthrange(year, month)[1]
+    return [datetime(year, month, day) for day in range(1, num_days + 1)]
+
+def monthly_payload(year, month, dates, times_by_date, approximate, fmt='full', time_format='hhmm'):
+    """Response body of /api/monthly-prayers (also built by the async app)"""
+    prayers = [{
+        'day': date.day,
+        'date': date.strftime('%Y-%m-%d'),
+        'times': times_by_date[date]
+    } for date in dates]
+    
+    result = {
+        'success': True,
+        'year': year,
+        'month': month,
+        'prayers': responses.format_days(prayers, fmt, time_format)
+    }
+    if fmt != 'full' or time_format != 'hhmm':
+        result['format'] = fmt
+        result['times'] = time_format
+    if approximate:
+        result['approximate'] = True
+    return result
+
+def build_monthly_result(lat, lon, year, month, method, asr_method, fmt='full', time_format='hhmm'):
+    """
+    Response body for a month of prayer times (shared by the POST and GET routes)
+    fmt/time_format select the representation, see utils/responses.py
+    """
+    dates = month_dates(year, month)
+    times_by_date, approximate = get_prayer_times_for_dates(lat, lon, dates, method, asr_method)
+    return monthly_payload(year, month, dates, times_by_date, approximate, fmt, time_format)
+
 @app.route('/api/monthly-prayers', methods=['POST'])
 def get_monthly_prayers():
     """Get prayer times for entire month"""
@@ -215,44 +537,242 @@ def get_monthly_prayers():
         month = int(data.get('month'))
         method = data.get('method', 'ISNA')
         asr_method = data.get('asr_method', 'standard')
+        fmt, time_format = responses.response_format(data, request.accept_mimetypes)
         
-        import calendar
-        num_days = calendar.monthrange(year, month)[1]
-        
-        prayers = []
-        for day in range(1, num_days + 1):
-            date = datetime(year, month, day)
-            date_str = date.strftime('%Y-%m-%d')
-            
-            # Check cache first
-            cached = get_cached_prayer_times(lat, lon, date_str, method, asr_method)
-            if cached:
-                times = cached
-            else:
-                times = calculate_prayer_times_accurate(lat, lon, date, method, asr_method)
-                cache_prayer_times(lat, lon, date_str, method, asr_method, times)
-            
-            prayers.append({
-                'day': day,
-                'date': date_str,
-                'times': times
-            })
-        
-        return jsonify({
-            'success': True,
-            'year': year,
-            'month': month,
-            'prayers': prayers
-        })
+        return jsonify(build_monthly_result(lat, lon, year, month, method, asr_method, fmt, time_format))
         
+    except aladhan.UPSTREAM_ERRORS as e:
+        logger.warning("Monthly prayers error: %s", e)
+        return upstream_unavailable_response(e)
+    except Exception as e:
+        logger.exception("Monthly prayers error: %s", e)
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+# ============= CACHEABLE GET ROUTES =============
+
+def cacheable_get(params, last_date, build, variant='', vary_accept=False):
+    """
+    Serve a GET whose body depends only on its canonical query params
+
+    Non-canonical URLs are redirected, If-None-Match is answered from the
+    ETag alone (no cache or DB access), and full responses carry the ETag
+    and Cache-Control. Approximate (degraded mode) results are sent with
+    no-store so caches never keep them.
+
+    Args:
+        params: Canonical (name, value) query pairs, in URL order
+        last_date: Last date the response covers (decides max-age)
+        build: fn() -> response body dict
+        variant: Representation picked from request headers, part of the ETag
+        vary_accept: Whether the Accept header picked the representation
+    """
+    # Snapped coordinates follow GRID_CELL_KM, so those redirects may change
+    redirect_response = http_cache.redirect_if_not_canonical(
+        request.path, request.query_string.decode(), params, shared=grid.GRID_MODE != 'snap')
+    if redirect_response is not None:
+        return redirect_response
+    
+    query = http_cache.canonical_query(params)
+    etag = http_cache.make_etag(Config.PRAYER_TIMES_SOURCE + grid.describe(), request.path, query, variant)
+    cache_control = http_cache.cache_control(last_date)
+    not_modified = http_cache.not_modified_response(request, etag, cache_control)
+    if not_modified is not None:
+        if vary_accept:
+            not_modified.vary.add('Accept')
+        return not_modified
+    
+    try:
+        result = build()
+    except aladhan.UPSTREAM_ERRORS as e:
+        logger.warning("Prayer times error: %s", e)
+        return upstream_unavailable_response(e)
     except Exception as e:
-        print(f"❌ Monthly prayers error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Prayer times error: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 400
+    
+    # Whether this worker had it cached is not part of the representation
+    result.pop('cached', None)
+    response = jsonify(result)
+    if vary_accept:
+        response.vary.add('Accept')
+    if result.get('approximate'):
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+    return http_cache.set_cache_headers(response, etag, cache_control)
+
+def _canonical_location_params():
+    """Parse lat/lng/method/asr_method query args, raising ValueError/TypeError when invalid"""
+    lat, lon, lat_str, lon_str = http_cache.canonical_coordinates(
+        float(request.args.get('lat')), float(request.args.get('lng')))
+    if grid.GRID_MODE == 'snap':
+        # Every location in a cell gets the same response, so share one URL per cell
+        lat, lon, lat_str, lon_str = http_cache.canonical_coordinates(*grid.cache_points(lat, lon)[0][:2])
+    method, asr_method = http_cache.canonical_method(
+        request.args.get('method'), request.args.get('asr_method'))
+    return lat, lon, lat_str, lon_str, method, asr_method
+
+@app.route('/api/prayer-times', methods=['GET'])
+def get_prayer_times_get():
+    """
+    HTTP-cacheable prayer times for one day
+    Canonical form: ?lat=21.4225&lng=39.8262&date=2026-03-01&method=ISNA&asr_method=standard
+    """
+    try:
+        lat, lon, lat_str, lon_str, method, asr_method = _canonical_location_params()
+        date = datetime.strptime(request.args.get('date') or '', '%Y-%m-%d').date()
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    date_str = date.strftime('%Y-%m-%d')
+    params = [('lat', lat_str), ('lng', lon_str), ('date', date_str),
+              ('method', method), ('asr_method', asr_method)]
+    return cacheable_get(params, date, lambda: build_prayer_times_result(lat, lon, date_str, method, asr_method))
+
+@app.route('/api/monthly-prayers', methods=['GET'])
+def get_monthly_prayers_get():
+    """
+    HTTP-cacheable prayer times for a month
+    Canonical form: ?lat=21.4225&lng=39.8262&year=2026&month=3&method=ISNA&asr_method=standard
+    """
+    try:
+        lat, lon, lat_str, lon_str, method, asr_method = _canonical_location_params()
+        year = int(request.args.get('year'))
+        month = int(request.args.get('month'))
+        last_date = datetime(year, month, calendar.monthrange(year, month)[1]).date()
+        fmt, time_format = responses.response_format(request.args, request.accept_mimetypes)
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    params = [('lat', lat_str), ('lng', lon_str), ('year', str(year)), ('month', str(month)),
+              ('method', method), ('asr_method', asr_method)]
+    # Representation options are part of the URL when given there...
+    if 'format' in request.args:
+        params.append(('format', fmt))
+    if 'times' in request.args:
+        params.append(('times', time_format))
+    # ...otherwise the format comes from the Accept header
+    vary_accept = 'format' not in request.args
+    return cacheable_get(
+        params, last_date,
+        lambda: build_monthly_result(lat, lon, year, month, method, asr_method, fmt, time_format),
+        variant=fmt if vary_accept else '', vary_accept=vary_accept
+    )
+
+# ============= TIMETABLE EXPORT ROUTE =============
+
+def _compute_export_days(lat, lon, dates, method, asr_method, started):
+    """
+    Compute days missing from the cache and persist them (not into L1)
+    Polar day/night days are left to export.iter_chunks, which exports them blank.
+    Once the response has started an upstream failure can't become a 503
+    any more, so the rest of the file is computed locally (and not cached).
+    """
+    try:
+        computed = calculate_prayer_times_for_dates(lat, lon, dates, method, asr_method, polar_fallback=False)
+    except aladhan.UPSTREAM_ERRORS as e:
+        if not started:
+            raise
+        logger.warning("Export continues with the local engine: %s", e)
+        return calculate_dates_locally(lat, lon, dates, method, asr_method)
+    for date, times in computed.items():
+        cache_prayer_times(lat, lon, date.strftime('%Y-%m-%d'), method, asr_method, times, l1=False)
+    return computed
+
+@app.route('/api/prayer-times/export', methods=['GET'])
+def export_prayer_times():
+    """
+    Stream a timetable as CSV or iCalendar
+    ?lat=..&lng=..&year=2026 (or start=2026-01-01&end=2026-12-31)&format=csv|ics&method=..&asr_method=..
+    """
+    try:
+        lat, lon, lat_str, lon_str, method, asr_method = _canonical_location_params()
+        fmt = request.args.get('format', 'csv').lower()
+        if fmt not in export.FORMATS:
+            raise ValueError(f"Unknown format {fmt!r}, expected one of {', '.join(export.FORMATS)}")
+        if request.args.get('year'):
+            year = int(request.args['year'])
+            first, last = datetime(year, 1, 1).date(), datetime(year, 12, 31).date()
+        else:
+            first = datetime.strptime(request.args.get('start') or '', '%Y-%m-%d').date()
+            last = datetime.strptime(request.args.get('end') or '', '%Y-%m-%d').date()
+        num_days = (last - first).days + 1
+        if num_days < 1:
+            raise ValueError('end is before start')
+        if num_days > Config.EXPORT_MAX_DAYS:
+            raise ValueError(f'Date range longer than {Config.EXPORT_MAX_DAYS} days')
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    # Chunks are read and computed as the client downloads them, each with
+    # its own short range query. The first one is computed before the 200 goes
+    # out, so an upstream failure becomes a 503 rather than a cut-off file.
+    chunks = export.iter_chunks(
+        first, last,
+        lambda start, end: get_cached_prayer_times_between(lat, lon, start, end, method, asr_method),
+        lambda dates, started: _compute_export_days(lat, lon, dates, method, asr_method, started)
+    )
+    try:
+        chunks = itertools.chain([next(chunks)], chunks)
+    except aladhan.UPSTREAM_ERRORS as e:
+        logger.warning("Export error: %s", e)
+        return upstream_unavailable_response(e)
+    
+    if fmt == 'ics':
+        body = export.ics_stream(chunks, lat, lon, method, asr_method,
+                                 f'Prayer times {lat_str}, {lon_str} ({method})')
+    else:
+        body = export.csv_stream(chunks)
+    
+    filename = f'prayer-times_{lat_str}_{lon_str}_{first:%Y%m%d}-{last:%Y%m%d}.{fmt}'
+    return Response(stream_with_context(body), mimetype=export.FORMATS[fmt], headers={
+        'Content-Disposition': f'attachment; filename="{filename}"'
+    })
 
 # ============= RAMADAN ROUTE =============
 
+def ramadan_days(start_date, end_date):
+    # Islamic lunar month is maximum 30 days
+    max_days = 30
+    num_days = min((end_date - start_date).days + 1, max_days)
+    return [start_date + timedelta(days=i) for i in range(num_days)]
+
+def find_ramadan(data):
+    """
+    Ramadan asked for by an /api/ramadan body (also used by the async app):
+    Ramadan of its hijri_year, or else the first beginning in its year
+
+    Returns:
+        (hijri_year, start_date, end_date), or None if the year is not covered
+    """
+    if data.get('hijri_year') is not None:
+        hijri_year = int(data.get('hijri_year'))
+        ramadan_dates = ramadan_calendar.hijri_dates(hijri_year)
+        return (hijri_year, *ramadan_dates) if ramadan_dates else None
+    
+    ramadans = ramadan_calendar.dates(int(data.get('year')))
+    return ramadans[0] if ramadans else None
+
+def ramadan_payload(hijri_year, start_date, end_date, dates, times_by_date, approximate):
+    """Response body of /api/ramadan (also built by the async app)"""
+    fasting_schedule = [{
+        'day': day_num,
+        'date': date.strftime('%Y-%m-%d'),
+        'suhoor_end': times_by_date[date]['fajr'],
+        'iftar_time': times_by_date[date]['maghrib']
+    } for day_num, date in enumerate(dates, start=1)]
+
+    result = {
+        'success': True,
+        'year': start_date.year,
+        'hijri_year': hijri_year,
+        'start_date': start_date.strftime('%Y-%m-%d'),
+        'end_date': end_date.strftime('%Y-%m-%d'),
+        'fasting_schedule': fasting_schedule
+    }
+    if approximate:
+        result['approximate'] = True
+    return result
+
 @app.route('/api/ramadan', methods=['POST'])
 def get_ramadan():
     """Get Ramadan fasting schedule"""
@@ -261,69 +781,29 @@ def get_ramadan():
     try:
         lat = float(data.get('latitude'))
         lon = float(data.get('longitude'))
-        year = int(data.get('year'))
         method = data.get('method', 'ISNA')
         
-        # Get Ramadan dates from database
-        query = """
-            SELECT start_date, end_date 
-            FROM ramadan_dates 
-            WHERE gregorian_year = %s
-        """
-        ramadan_dates = execute_query(query, (year,), fetch_one=True)
+        # Computed Hijri calendar with ramadan_dates overrides, held in memory
+        ramadan = find_ramadan(data)
         
-        if not ramadan_dates:
+        if not ramadan:
             return jsonify({
                 'success': False,
-                'error': f'Ramadan dates not found for {year}'
+                'error': f"Ramadan dates not found for {data.get('hijri_year') or data.get('year')}"
             }), 404
         
-        start_date = ramadan_dates['start_date']
-        end_date = ramadan_dates['end_date']
+        hijri_year, start_date, end_date = ramadan
+        dates = ramadan_days(start_date, end_date)
         
-        # Calculate fasting times for each day (max 30 days)
-        fasting_schedule = []
-        current_date = start_date
-        day_num = 1
-        max_days = 30  # Islamic lunar month is maximum 30 days
-
-        while current_date <= end_date and day_num <= max_days:  # ✅ Added max_days limit
-            date_str = current_date.strftime('%Y-%m-%d')
-            
-            # Get prayer times
-            cached = get_cached_prayer_times(lat, lon, date_str, method, 'standard')
-            if cached:
-                times = cached
-            else:
-                times = calculate_prayer_times_accurate(lat, lon, current_date, method, 'standard')
-                cache_prayer_times(lat, lon, date_str, method, 'standard', times)
-            
-            fasting_schedule.append({
-                'day': day_num,
-                'date': date_str,
-                'suhoor_end': times['fajr'],
-                'iftar_time': times['maghrib']
-            })
-            
-            current_date += timedelta(days=1)
-            day_num += 1
-
-        # Ensure we have 29 or 30 days (never more)
-        if len(fasting_schedule) > 30:
-            fasting_schedule = fasting_schedule[:30]
-
-        return jsonify({
-            'success': True,
-            'year': year,
-            'start_date': start_date.strftime('%Y-%m-%d'),
-            'end_date': end_date.strftime('%Y-%m-%d'),
-            'fasting_schedule': fasting_schedule
-        })
+        times_by_date, approximate = get_prayer_times_for_dates(lat, lon, dates, method, 'standard')
+        
+        return jsonify(ramadan_payload(hijri_year, start_date, end_date, dates, times_by_date, approximate))
         
+    except aladhan.UPSTREAM_ERRORS as e:
+        logger.warning("Ramadan error: %s", e)
+        return upstream_unavailable_response(e)
     except Exception as e:
-        print(f"❌ Ramadan error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Ramadan error: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 400
 
 # ============= QIBLA ROUTE =============
@@ -361,7 +841,7 @@ def get_qibla():
         })
         
     except Exception as e:
-        print(f"❌ Qibla error: {e}")
+        logger.warning("Qibla error: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 400
 
 # ============= MOSQUES ROUTE (POST) =============
@@ -376,27 +856,7 @@ def get_mosques():
         lon = float(data.get('longitude'))
         radius = float(data.get('radius', 10.0))
         
-        query = """
-            SELECT 
-                mosque_id, name, address, city, country,
-                latitude, longitude, phone, website,
-                ( 6371 * acos( 
-                    cos( radians(%s) ) * cos( radians( latitude ) ) * 
-                    cos( radians( longitude ) - radians(%s) ) + 
-                    sin( radians(%s) ) * sin( radians( latitude ) ) 
-                )) AS distance
-            FROM mosques
-            WHERE verified = TRUE
-            AND ( 6371 * acos( 
-                    cos( radians(%s) ) * cos( radians( latitude ) ) * 
-                    cos( radians( longitude ) - radians(%s) ) + 
-                    sin( radians(%s) ) * sin( radians( latitude ) ) 
-                )) < %s
-            ORDER BY distance
-            LIMIT 50
-        """
-        
-        mosques = execute_query(query, (lat, lon, lat, lat, lon, lat, radius))
+        mosques = find_nearby_mosques(lat, lon, radius, limit=50)
         
         return jsonify({
             'success': True,
@@ -404,9 +864,7 @@ def get_mosques():
         })
         
     except Exception as e:
-        print(f"❌ Mosques error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Mosques error: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 400
 
 # ============= MOSQUES ROUTE (GET) =============
@@ -419,27 +877,7 @@ def get_mosques_nearby_get():
         lng = float(request.args.get('lng'))
         radius = float(request.args.get('radius', 10.0))
         
-        query = """
-            SELECT 
-                mosque_id, name, address, city, country,
-                latitude, longitude, phone, website,
-                ( 6371 * acos( 
-                    cos( radians(%s) ) * cos( radians( latitude ) ) * 
-                    cos( radians( longitude ) - radians(%s) ) + 
-                    sin( radians(%s) ) * sin( radians( latitude ) ) 
-                )) AS distance
-            FROM mosques
-            WHERE verified = TRUE
-            AND ( 6371 * acos( 
-                    cos( radians(%s) ) * cos( radians( latitude ) ) * 
-                    cos( radians( longitude ) - radians(%s) ) + 
-                    sin( radians(%s) ) * sin( radians( latitude ) ) 
-                )) < %s
-            ORDER BY distance
-            LIMIT 50
-        """
-        
-        mosques = execute_query(query, (lat, lng, lat, lat, lng, lat, radius))
+        mosques = find_nearby_mosques(lat, lng, radius, limit=50)
         
         return jsonify({
             'success': True,
@@ -447,9 +885,7 @@ def get_mosques_nearby_get():
         })
         
     except Exception as e:
-        print(f"❌ Mosques error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Mosques error: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 400
 
 # ============= HEALTH CHECK =============
@@ -460,7 +896,13 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'version': '1.0',
-        'calculation_method': 'Aladhan API'
+        'calculation_method': 'Aladhan API' if Config.PRAYER_TIMES_SOURCE == 'aladhan' else 'Local engine',
+        'db_pool': get_pool_stats(),
+        'prayer_cache': get_l1_cache_stats(),
+        'cache_writer': get_cache_writer_stats(),
+        'mosque_index': mosque_index.stats(),
+        'single_flight': prayer_flight.stats(),
+        'upstream': aladhan.breaker.stats()
     })
 
 # ============= CALCULATION METHODS =============
@@ -474,8 +916,7 @@ def get_calculation_methods():
     })
 
 if __name__ == '__main__':
-    print('🚀 Starting Worldwide Salah API...')
-    print('📍 Prayer time calculation: ENABLED (Aladhan API)')
-    print('🕌 Mosque queries: ENABLED')
-    print('💾 PostgreSQL caching: ENABLED')
+    logger.info('Starting Worldwide Salah API')
+    logger.info('Prayer time calculation: %s', Config.PRAYER_TIMES_SOURCE)
+    logger.info('Mosque queries: %s', 'in-memory index' if Config.MOSQUE_INDEX_ENABLED else 'PostgreSQL')
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
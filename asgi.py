@@ -0,0 +1,394 @@
+# asgi.py - Optional asyncio serving mode
+#
+#   pip install -r requirements-async.txt
+#   hypercorn asgi:application --bind 0.0.0.0:5000
+#
+# The I/O-bound routes (prayer times, monthly prayers, Ramadan, mosque
+# search) run as coroutines on Quart, with an async PostgreSQL pool and an
+# async Aladhan client, so a single process keeps thousands of requests in
+# flight while they wait on the database or the upstream. Every other route,
+# and CORS preflights, are passed to the Flask app in app.py on a thread
+# pool. Both share the L1 cache, write-behind queue, circuit breaker and
+# metrics, and return the same responses.
+import asyncio
+import functools
+import logging
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from hypercorn.middleware import AsyncioWSGIMiddleware
+from quart import Quart, g, jsonify, request
+from quart.json.provider import DefaultJSONProvider
+from werkzeug.exceptions import HTTPException
+
+from app import (
+    app as flask_app, calculate_dates_locally, find_ramadan,
+    month_dates, monthly_payload, prayer_times_payload, ramadan_days, ramadan_payload, schedule_refresh
+)
+from config import Config
+from utils import aladhan, aladhan_async, async_db, grid, metrics, responses
+from utils.geo import location_key
+from utils.hijri import RAMADAN_OVERRIDES_QUERY, ramadan_calendar
+from utils.mosques import find_nearby_mosques_async
+from utils.prayer_calc import UndefinedTimeError, calculate_prayer_times
+from utils.prayer_cache import (
+    cache_prayer_times_async, get_approximate_prayer_times_async, get_cached_prayer_times_async,
+    get_cached_prayer_times_range_async
+)
+from utils.singleflight import AsyncSingleFlight, export_metrics
+
+logger = logging.getLogger(__name__)
+
+class JSONProvider(DefaultJSONProvider):
+    """Same encoding as the Flask app (orjson when installed)"""
+
+    def response(self, *args, **kwargs):
+        with metrics.phase('serialize'):
+            if (self.compact is None and self._app.debug) or self.compact is False:
+                return super().response(*args, **kwargs)
+            obj = self._prepare_response_obj(args, kwargs)
+            return self._app.response_class(responses.dumps(obj, self.default, self.sort_keys) + b'\n',
+                                            mimetype=self.mimetype)
+
+async_app = Quart(__name__)
+async_app.json = JSONProvider(async_app)
+
+# Concurrent cache misses for the same key share one computation
+prayer_flight = AsyncSingleFlight()
+export_metrics(prayer_flight, 'salah_async_single_flight')
+
+# The local engine and timezone lookups are CPU-bound (the first lookup also
+# loads polygon data), so they run here rather than stall the event loop
+engine_executor = ThreadPoolExecutor(max_workers=min(4, os.cpu_count() or 1), thread_name_prefix='engine')
+
+async def run_engine(fn, *args, **kwargs):
+    """Run CPU-bound engine work on engine_executor"""
+    return await asyncio.get_running_loop().run_in_executor(engine_executor, functools.partial(fn, *args, **kwargs))
+
+async def cache_points(lat, lon):
+    """grid.cache_points; off the loop when the grid needs timezone lookups"""
+    if grid.GRID_MODE == 'off':
+        return grid.cache_points(lat, lon)
+    return await run_engine(grid.cache_points, lat, lon)
+
+@async_app.before_serving
+async def startup():
+    await async_db.open_pool()
+    # Load Ramadan overrides here, so requests never run the blocking first load
+    try:
+        rows = await async_db.execute_query(RAMADAN_OVERRIDES_QUERY)
+    except Exception as e:
+        logger.warning("Could not load Ramadan date overrides: %s", e)
+        rows = None
+    ramadan_calendar.load(rows)
+
+@async_app.after_serving
+async def shutdown():
+    await async_db.close_pool()
+    await aladhan_async.close_client()
+
+@async_app.before_request
+async def start_request_metrics():
+    g.metrics_token = metrics.start_request()
+
+@async_app.after_request
+async def finish_response(response):
+    # Same headers as CORS(app) in app.py, which allows every origin
+    if 'Origin' in request.headers:
+        response.headers['Access-Control-Allow-Origin'] = request.headers['Origin']
+        response.vary.add('Origin')
+
+    if response.mimetype in responses.COMPRESSIBLE_MIMETYPES and 'Content-Encoding' not in response.headers:
+        response.vary.add('Accept-Encoding')
+        with metrics.phase('serialize'):
+            encoded = responses.encode_body(await response.get_data(), request.accept_encodings)
+        if encoded is not None:
+            response.set_data(encoded[0])
+            response.headers['Content-Encoding'] = encoded[1]
+
+    g.response_status = response.status_code
+    return response
+
+@async_app.teardown_request
+async def record_request_metrics(exc):
+    # As in app.py: also counts requests an exception cut short, as 500s
+    token = g.pop('metrics_token', None)
+    if token is not None:
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        status = 500 if exc is not None else g.pop('response_status', 500)
+        metrics.finish_request(token, endpoint, request.method, status)
+
+metrics.gauge('salah_async_db_pool_connections', 'Async pooled database connections by state',
+              lambda: {(state,): async_db.get_pool_stats().get(key, 0)
+                       for state, key in (('in_use', 'in_use'), ('idle', 'available'), ('waiting', 'waiting'))},
+              ('state',))
+
+# ============= PRAYER TIME HELPERS =============
+
+async def _compute_and_cache_dates(lat, lon, dates, method, asr_method):
+    if Config.PRAYER_TIMES_SOURCE == 'aladhan':
+        computed = await aladhan_async.fetch_dates(lat, lon, dates, method, asr_method)
+    else:
+        try:
+            computed = await run_engine(calculate_dates_locally, lat, lon, dates, method, asr_method)
+        except UndefinedTimeError as e:
+            logger.info("%s, asking Aladhan", e)
+            computed = await aladhan_async.fetch_dates(lat, lon, dates, method, asr_method)
+    await cache_prayer_times_async(lat, lon, computed, method, asr_method)
+    return computed
+
+async def _compute_and_cache_day(lat, lon, date, date_str, method, asr_method):
+    if Config.PRAYER_TIMES_SOURCE == 'aladhan':
+        times = await aladhan_async.fetch_day(lat, lon, date, method, asr_method)
+    else:
+        try:
+            times = await run_engine(calculate_prayer_times, lat, lon, date, method, asr_method)
+        except UndefinedTimeError as e:
+            logger.info("%s, asking Aladhan", e)
+            times = await aladhan_async.fetch_day(lat, lon, date, method, asr_method)
+    await cache_prayer_times_async(lat, lon, {date: times}, method, asr_method)
+    return times
+
+async def get_approximate_or_raise(error, lat, lon, dates, method, asr_method):
+    """Async app.get_approximate_or_raise (the refresh still runs on the app's thread)"""
+    stand_ins = await get_approximate_prayer_times_async(lat, lon, dates, method, asr_method)
+    if len(stand_ins) < len(dates):
+        raise error
+
+    logger.warning("Serving approximate prayer times: %s", error)
+    schedule_refresh(lat, lon, dates, method, asr_method)
+    return stand_ins
+
+async def get_prayer_times_for_dates(lat, lon, dates, method, asr_method):
+    """Async app.get_prayer_times_for_dates"""
+    times_by_date, approximate, _ = await get_grid_prayer_times(lat, lon, dates, method, asr_method)
+    return times_by_date, approximate
+
+async def get_grid_prayer_times(lat, lon, dates, method, asr_method):
+    """Async app.get_grid_prayer_times (the cells around the location are fetched concurrently)"""
+    points = await cache_points(lat, lon)
+    if len(points) == 1:
+        return await _get_location_prayer_times(points[0][0], points[0][1], dates, method, asr_method)
+
+    parts = await asyncio.gather(*(_get_location_prayer_times(point_lat, point_lon, dates, method, asr_method)
+                                   for point_lat, point_lon, _ in points))
+    weights = [weight for _, _, weight in points]
+    times_by_date = {date: grid.blend([part[0][date] for part in parts], weights) for date in dates}
+    return times_by_date, any(part[1] for part in parts), all(part[2] for part in parts)
+
+async def _get_location_prayer_times(lat, lon, dates, method, asr_method):
+    times_by_date, missing = await get_cached_prayer_times_range_async(lat, lon, dates, method, asr_method)
+
+    approximate = False
+    if missing:
+        key = ('range', *location_key(lat, lon), tuple(d.strftime('%Y-%m-%d') for d in missing),
+               method, asr_method)
+        try:
+            with metrics.phase('compute'):
+                computed = await prayer_flight.do(key, _compute_and_cache_dates, lat, lon, missing, method, asr_method)
+        except aladhan.UPSTREAM_ERRORS as e:
+            computed = await get_approximate_or_raise(e, lat, lon, missing, method, asr_method)
+            approximate = True
+        times_by_date.update(computed)
+
+    return times_by_date, approximate, not missing
+
+def upstream_unavailable_response(error):
+    """503 with Retry-After for requests that need the upstream while it is down"""
+    retry_after = getattr(error, 'retry_after', None) or aladhan.ALADHAN_BREAKER_RESET_SECONDS
+    return jsonify({
+        'success': False,
+        'error': f'Prayer time source unavailable: {error}'
+    }), 503, {'Retry-After': str(math.ceil(retry_after))}
+
+# ============= ROUTES =============
+# OPTIONS is left to the Flask app, which answers CORS preflights
+
+@async_app.route('/api/prayer-times', methods=['POST'], provide_automatic_options=False)
+async def get_prayer_times():
+    """Get prayer times for specific date and location"""
+    data = await request.get_json()
+
+    try:
+        lat = float(data.get('latitude'))
+        lon = float(data.get('longitude'))
+        date_str = data.get('date')
+        method = data.get('method', 'ISNA')
+        asr_method = data.get('asr_method', 'standard')
+        bypass_cache = data.get('bypass_cache', False)
+
+        date = datetime.strptime(date_str, '%Y-%m-%d')
+
+        if not bypass_cache:
+            points = await cache_points(lat, lon)
+            if len(points) > 1:
+                times_by_date, approximate, cached = await get_grid_prayer_times(lat, lon, [date], method, asr_method)
+                return jsonify(prayer_times_payload(date_str, times_by_date[date], method, asr_method,
+                                                    cached=cached or approximate, approximate=approximate))
+            lat, lon = points[0][:2]
+
+            cached = await get_cached_prayer_times_async(lat, lon, date_str, method, asr_method)
+            if cached:
+                return jsonify(prayer_times_payload(date_str, cached, method, asr_method, cached=True))
+
+        key = ('day', *location_key(lat, lon), date_str, method, asr_method)
+        try:
+            with metrics.phase('compute'):
+                times = await prayer_flight.do(key, _compute_and_cache_day, lat, lon, date, date_str,
+                                               method, asr_method)
+        except aladhan.UPSTREAM_ERRORS as e:
+            times = (await get_approximate_or_raise(e, lat, lon, [date], method, asr_method))[date]
+            return jsonify(prayer_times_payload(date_str, times, method, asr_method, cached=True, approximate=True))
+
+        return jsonify(prayer_times_payload(date_str, times, method, asr_method, cached=False))
+
+    except aladhan.UPSTREAM_ERRORS as e:
+        logger.warning("Prayer times error: %s", e)
+        return upstream_unavailable_response(e)
+    except Exception as e:
+        logger.exception("Prayer times error: %s", e)
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+@async_app.route('/api/monthly-prayers', methods=['POST'], provide_automatic_options=False)
+async def get_monthly_prayers():
+    """Get prayer times for entire month"""
+    data = await request.get_json()
+
+    try:
+        lat = float(data.get('latitude'))
+        lon = float(data.get('longitude'))
+        year = int(data.get('year'))
+        month = int(data.get('month'))
+        method = data.get('method', 'ISNA')
+        asr_method = data.get('asr_method', 'standard')
+        fmt, time_format = responses.response_format(data, request.accept_mimetypes)
+
+        dates = month_dates(year, month)
+        times_by_date, approximate = await get_prayer_times_for_dates(lat, lon, dates, method, asr_method)
+        return jsonify(monthly_payload(year, month, dates, times_by_date, approximate, fmt, time_format))
+
+    except aladhan.UPSTREAM_ERRORS as e:
+        logger.warning("Monthly prayers error: %s", e)
+        return upstream_unavailable_response(e)
+    except Exception as e:
+        logger.exception("Monthly prayers error: %s", e)
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+@async_app.route('/api/ramadan', methods=['POST'], provide_automatic_options=False)
+async def get_ramadan():
+    """Get Ramadan fasting schedule"""
+    data = await request.get_json()
+
+    try:
+        lat = float(data.get('latitude'))
+        lon = float(data.get('longitude'))
+        method = data.get('method', 'ISNA')
+
+        ramadan = find_ramadan(data)
+        if not ramadan:
+            return jsonify({
+                'success': False,
+                'error': f"Ramadan dates not found for {data.get('hijri_year') or data.get('year')}"
+            }), 404
+
+        hijri_year, start_date, end_date = ramadan
+        dates = ramadan_days(start_date, end_date)
+
+        times_by_date, approximate = await get_prayer_times_for_dates(lat, lon, dates, method, 'standard')
+        return jsonify(ramadan_payload(hijri_year, start_date, end_date, dates, times_by_date, approximate))
+
+    except aladhan.UPSTREAM_ERRORS as e:
+        logger.warning("Ramadan error: %s", e)
+        return upstream_unavailable_response(e)
+    except Exception as e:
+        logger.exception("Ramadan error: %s", e)
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+@async_app.route('/api/mosques', methods=['POST'], provide_automatic_options=False)
+async def get_mosques():
+    """Get nearby mosques"""
+    data = await request.get_json()
+
+    try:
+        lat = float(data.get('latitude'))
+        lon = float(data.get('longitude'))
+        radius = float(data.get('radius', 10.0))
+
+        mosques = await find_nearby_mosques_async(lat, lon, radius, limit=50)
+        return jsonify({
+            'success': True,
+            'mosques': mosques if mosques else []
+        })
+
+    except Exception as e:
+        logger.exception("Mosques error: %s", e)
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+@async_app.route('/api/mosques/nearby', methods=['GET'], provide_automatic_options=False)
+async def get_mosques_nearby_get():
+    """Get nearby mosques (GET method for compatibility)"""
+    try:
+        lat = float(request.args.get('lat'))
+        lng = float(request.args.get('lng'))
+        radius = float(request.args.get('radius', 10.0))
+
+        mosques = await find_nearby_mosques_async(lat, lng, radius, limit=50)
+        return jsonify({
+            'success': True,
+            'mosques': mosques if mosques else []
+        })
+
+    except Exception as e:
+        logger.exception("Mosques error: %s", e)
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+# ============= DISPATCH =============
+
+def _start_empty_responses(wsgi_app):
+    """
+    hypercorn's WSGI middleware sends the status line together with the
+    first body chunk, so a response without a body (304, CORS preflight)
+    would never start; give those one empty chunk
+    """
+    def app(environ, start_response):
+        body = wsgi_app(environ, start_response)
+        try:
+            empty = True
+            for chunk in body:
+                empty = False
+                yield chunk
+            if empty:
+                yield b''
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+    return app
+
+class AsyncRoutesFirst:
+    """
+    ASGI app: requests matching an async_app route go to it, everything
+    else to the Flask app (run in a thread pool). Lifespan events go to
+    async_app, which opens and closes the async pool.
+    """
+
+    def __init__(self, async_app, wsgi_app):
+        self.async_app = async_app
+        self.wsgi_app = AsyncioWSGIMiddleware(_start_empty_responses(wsgi_app), max_body_size=16 * 1024 * 1024)
+        self._urls = async_app.url_map.bind('localhost')
+
+    def _is_async_route(self, scope):
+        try:
+            self._urls.match(scope['path'], scope['method'])
+            return True
+        except HTTPException:
+            return False
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and not self._is_async_route(scope):
+            await self.wsgi_app(scope, receive, send)
+        else:
+            await self.async_app(scope, receive, send)
+
+application = AsyncRoutesFirst(async_app, flask_app)
@@ -0,0 +1,196 @@
+# benchmarks/bench_api.py - Throughput and latency of every API endpoint
+#
+# Usage: python -m benchmarks.bench_api [--duration 20] [--concurrency 16] [--output results.json]
+#
+# Starts a throwaway PostgreSQL cluster from schema.sql (needs initdb and
+# pg_ctl, see --pg-bin), seeds synthetic cache rows and mosques, starts the
+# API in a subprocess (and the Aladhan stub for --source aladhan), then runs
+# each scenario with a closed-loop load generator. 'hot' scenarios hit
+# seeded locations and dates, 'cold' ones random uncached coordinates.
+#
+# Results are written as JSON; compare two runs with benchmarks/compare.py.
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import requests
+
+from benchmarks.load import run_load
+from benchmarks.local_postgres import LocalPostgres
+from benchmarks.seed import RAMADAN_DATES, seed_all
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _cold_point(rng):
+    return round(rng.uniform(-45, 60), 4), round(rng.uniform(-180, 180), 4)
+
+def fully_cached_months(first, last):
+    """First days of the months that lie entirely within first..last"""
+    months = []
+    month = first.replace(day=1)
+    while month <= last:
+        next_month = (month + timedelta(days=32)).replace(day=1)
+        if month >= first and next_month - timedelta(days=1) <= last:
+            months.append(month)
+        month = next_month
+    return months
+
+def build_scenarios(data, ramadan_year):
+    """
+    Scenario name -> make_request(rng), see benchmarks.load.run_load
+
+    Returns:
+        Dict of scenario name to request factory
+    """
+    hot = data['hot_locations']
+    centres = hot[:500]
+    cache_start = data['cache_start']
+    cache_days = (data['cache_end'] - cache_start).days + 1
+    month_starts = fully_cached_months(cache_start, data['cache_end'])
+
+    def hot_day(rng):
+        return (cache_start + timedelta(days=rng.randrange(cache_days))).isoformat()
+
+    def prayer_times(point, day):
+        return 'POST', '/api/prayer-times', {'latitude': point[0], 'longitude': point[1], 'date': day}, None
+
+    def monthly(point, month_start):
+        return 'POST', '/api/monthly-prayers', {
+            'latitude': point[0], 'longitude': point[1], 'year': month_start.year, 'month': month_start.month
+        }, None
+
+    def ramadan(point):
+        return 'POST', '/api/ramadan', {'latitude': point[0], 'longitude': point[1], 'year': ramadan_year}, None
+
+    def near_centre(rng):
+        lat, lng = rng.choice(centres)
+        return lat + rng.uniform(-0.2, 0.2), lng + rng.uniform(-0.2, 0.2)
+
+    return {
+        'prayer_times_hot': lambda rng: prayer_times(rng.choice(hot), hot_day(rng)),
+        'prayer_times_cold': lambda rng: prayer_times(_cold_point(rng), hot_day(rng)),
+        'monthly_hot': lambda rng: monthly(rng.choice(hot), rng.choice(month_starts)),
+        'monthly_cold': lambda rng: monthly(_cold_point(rng), rng.choice(month_starts)),
+        'ramadan_hot': lambda rng: ramadan(rng.choice(hot)),
+        'ramadan_cold': lambda rng: ramadan(_cold_point(rng)),
+        'qibla': lambda rng: ('POST', '/api/qibla', dict(zip(('latitude', 'longitude'), _cold_point(rng))), None),
+        'mosques_search': lambda rng: ('POST', '/api/mosques', dict(
+            zip(('latitude', 'longitude'), near_centre(rng)), radius=10.0), None),
+        'mosques_nearby': lambda rng: ('GET', '/api/mosques/nearby', None, dict(
+            zip(('lat', 'lng'), near_centre(rng)), radius=10.0)),
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def start_api(port, env, server='wsgi'):
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'benchmarks.serve_app', '--port', str(port), '--server', server],
+        cwd=ROOT, env={**os.environ, **env}
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'API exited with code {process.returncode}')
+        try:
+            requests.get(base_url + '/api/health', timeout=1)
+            return process, base_url
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError('API did not start within 60s')
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the API endpoints against a local PostgreSQL')
+    parser.add_argument('--pg-bin', help='directory with initdb/pg_ctl (default: PATH)')
+    parser.add_argument('--pg-port', type=int, default=55432)
+    parser.add_argument('--keep', action='store_true', help='leave the PostgreSQL cluster running')
+    parser.add_argument('--api-port', type=int, default=5055)
+    parser.add_argument('--cache-locations', type=int, default=5000)
+    parser.add_argument('--cache-start', type=date.fromisoformat, default=date(2026, 1, 1))
+    parser.add_argument('--cache-days', type=int, default=365)
+    parser.add_argument('--mosques', type=int, default=300_000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=20, help='seconds measured per scenario')
+    parser.add_argument('--warmup', type=float, default=3, help='unmeasured seconds before each scenario')
+    parser.add_argument('--scenarios', help='comma-separated subset (default: all)')
+    parser.add_argument('--source', choices=('local', 'aladhan'), default='local',
+                        help='how cold requests compute times (aladhan uses the stub server)')
+    parser.add_argument('--stub-latency-ms', type=float, default=150)
+    parser.add_argument('--env', action='append', default=[], metavar='NAME=VALUE',
+                        help='extra environment for the API, e.g. --env PRAYER_L1_CACHE_SIZE=0')
+    parser.add_argument('--server', choices=('wsgi', 'asgi'), default='wsgi',
+                        help='threaded Flask app, or the async app (asgi.py, needs requirements-async.txt)')
+    parser.add_argument('--output', default='bench_results.json')
+    args = parser.parse_args()
+
+    ramadan_year = args.cache_start.year if args.cache_start.year in RAMADAN_DATES else 2026
+    stub = None
+    api = None
+    with LocalPostgres(port=args.pg_port, bin_dir=args.pg_bin, keep=args.keep) as pg:
+        print(f"Seeding {args.cache_locations} locations x {args.cache_days} days and {args.mosques} mosques...")
+        start = time.perf_counter()
+        with pg.connect() as conn:
+            data = seed_all(conn, args.cache_locations, args.cache_start, args.cache_days, args.mosques, args.seed)
+        print(f"Seeded {data['cache_rows']} cache rows in {time.perf_counter() - start:.1f}s")
+
+        scenarios = build_scenarios(data, ramadan_year)
+        selected = args.scenarios.split(',') if args.scenarios else list(scenarios)
+        unknown = [name for name in selected if name not in scenarios]
+        if unknown:
+            parser.error(f"unknown scenarios: {', '.join(unknown)} (choose from {', '.join(scenarios)})")
+
+        env = {**pg.env(), 'PRAYER_TIMES_SOURCE': args.source, 'LOG_LEVEL': 'WARNING'}
+        if args.source == 'aladhan':
+            from scripts.stub_aladhan import start_stub_server
+            stub = start_stub_server(latency_ms=args.stub_latency_ms)
+            env['ALADHAN_BASE_URL'] = f'http://127.0.0.1:{stub.server_port}/v1'
+        env.update(item.split('=', 1) for item in args.env)
+
+        try:
+            api, base_url = start_api(args.api_port, env, args.server)
+            results = {}
+            for name in selected:
+                summary = run_load(base_url, scenarios[name], args.concurrency, args.duration,
+                                   args.warmup, seed=f'{args.seed}-{name}')
+                results[name] = summary
+                latency = summary['latency_ms']
+                print(f"{name:<18} {summary['throughput_rps']:>9.1f} req/s  "
+                      f"p50 {latency['p50']}ms  p95 {latency['p95']}ms  p99 {latency['p99']}ms  "
+                      f"errors {summary['errors']}")
+        finally:
+            if api is not None:
+                api.terminate()
+                api.wait(10)
+            if stub is not None:
+                stub.shutdown()
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'cache_rows': data['cache_rows'],
+            'args': {key: str(value) if isinstance(value, date) else value for key, value in vars(args).items()},
+        },
+        'scenarios': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+if __name__ == '__main__':
+    main()
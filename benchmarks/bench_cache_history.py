@@ -0,0 +1,108 @@
+# benchmarks/bench_cache_history.py - Cache lookup latency as prayer_time_cache history grows
+#
+# Usage: python -m benchmarks.bench_cache_history [--years 5] [--locations 2000] [--queries 2000]
+#
+# Starts a throwaway PostgreSQL cluster (see local_postgres.py) and adds one
+# year of history at a time for the same locations to two layouts: the
+# monthly-partitioned table from schema.sql, and a plain table with the
+# same unique index (the layout before migration 002). After each year it
+# times day and month lookups of the newest year, as the API would make
+# them, and prints the cache's size in each layout.
+import argparse
+import random
+import statistics
+import time
+from datetime import date
+
+from benchmarks.load import percentile
+from benchmarks.local_postgres import LocalPostgres
+from benchmarks.seed import hot_locations, seed_prayer_cache
+from scripts.maintain_cache import add_months, ensure_partitions
+from utils.geo import location_key
+from utils.prayer_cache import SELECT_CACHED_DAY, SELECT_CACHED_RANGE
+
+LAYOUTS = ('partitioned', 'plain')
+
+CREATE_PLAIN = """
+    CREATE SCHEMA plain;
+    CREATE TABLE plain.prayer_time_cache (LIKE public.prayer_time_cache INCLUDING DEFAULTS);
+    CREATE UNIQUE INDEX idx_prayer_time_cache_key
+        ON plain.prayer_time_cache(lat_key, lon_key, calculation_method, asr_method, prayer_date);
+"""
+
+TOTAL_SIZE = """
+    SELECT COALESCE(SUM(pg_total_relation_size(c.oid)), 0) AS bytes
+    FROM pg_class c
+    WHERE c.oid = 'prayer_time_cache'::regclass
+       OR c.oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = 'prayer_time_cache'::regclass)
+"""
+
+def use_layout(conn, layout):
+    conn.execute("SET search_path TO plain, public" if layout == 'plain' else "SET search_path TO public")
+
+def time_lookups(conn, lookups):
+    """Run (query, params) lookups, returning latencies in ms"""
+    latencies = []
+    with conn.cursor() as cur:
+        for query, params in lookups:
+            start = time.perf_counter()
+            cur.execute(query, params)
+            cur.fetchall()
+            latencies.append((time.perf_counter() - start) * 1000)
+    return sorted(latencies)
+
+def build_lookups(locations, year, count, rng):
+    """Random day and month lookups of one year, in the API's parameter shape"""
+    days, months = [], []
+    for _ in range(count):
+        lat_key, lon_key = location_key(*rng.choice(locations))
+        month = rng.randint(1, 12)
+        day = date(year, month, rng.randint(1, 28))
+        days.append((SELECT_CACHED_DAY, (lat_key, lon_key, 'ISNA', 'standard', day)))
+        last = add_months(date(year, month, 1), 1).toordinal() - 1
+        months.append((SELECT_CACHED_RANGE, (lat_key, lon_key, 'ISNA', 'standard',
+                                             date(year, month, 1), date.fromordinal(last))))
+    return days, months
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark cache lookups as history grows')
+    parser.add_argument('--pg-bin', help='directory with initdb/pg_ctl (default: PATH)')
+    parser.add_argument('--pg-port', type=int, default=55433)
+    parser.add_argument('--years', type=int, default=5)
+    parser.add_argument('--first-year', type=int, default=2022)
+    parser.add_argument('--locations', type=int, default=2000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    locations = hot_locations(args.locations, args.seed)
+    last_year = args.first_year + args.years - 1
+
+    with LocalPostgres(port=args.pg_port, bin_dir=args.pg_bin) as pg:
+        with pg.connect() as conn:
+            conn.execute(CREATE_PLAIN)
+            ensure_partitions(conn, date(args.first_year, 1, 1), date(last_year, 12, 1))
+
+            print(f"{'history':>8} {'layout':>12} {'rows':>10} {'size MB':>8}   "
+                  f"{'day p50':>8} {'day p95':>8}   {'month p50':>9} {'month p95':>9}")
+            for year in range(args.first_year, last_year + 1):
+                rng = random.Random(f'{args.seed}-{year}')
+                day_lookups, month_lookups = build_lookups(locations, year, args.queries, rng)
+                for layout in LAYOUTS:
+                    use_layout(conn, layout)
+                    days = (date(year + 1, 1, 1) - date(year, 1, 1)).days
+                    seed_prayer_cache(conn, locations, date(year, 1, 1), days)
+                    conn.execute("VACUUM ANALYZE prayer_time_cache")
+                    rows = conn.execute("SELECT COUNT(*) AS n FROM prayer_time_cache").fetchone()['n']
+                    size_mb = conn.execute(TOTAL_SIZE).fetchone()['bytes'] / 1024 / 1024
+
+                    # Warm up so both layouts are measured from shared buffers
+                    time_lookups(conn, day_lookups[:200] + month_lookups[:200])
+                    day = time_lookups(conn, day_lookups)
+                    month = time_lookups(conn, month_lookups)
+                    print(f"{year - args.first_year + 1:>6} y {layout:>12} {rows:>10} {size_mb:>8.1f}   "
+                          f"{statistics.median(day):>8.3f} {percentile(day, 95):>8.3f}   "
+                          f"{statistics.median(month):>9.3f} {percentile(month, 95):>9.3f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+# benchmarks/bench_nearby_mosques.py - Nearby mosque search on a large synthetic table
+#
+# Usage: python -m benchmarks.bench_nearby_mosques [--rows 1000000] [--queries 200]
+#
+# Loads synthetic mosques into a scratch schema (salah_bench) of the
+# configured database, then times the old full-table great-circle query
+# against the bounding-box query used by utils/mosques.py.
+import argparse
+import random
+import statistics
+import time
+
+from utils.db import get_connection
+from utils.mosques import build_nearby_query
+
+BENCH_SCHEMA = 'salah_bench'
+
+# The query the mosque endpoints ran before the bounding-box prefilter
+LEGACY_QUERY = """
+    SELECT
+        mosque_id, name, address, city, country,
+        latitude, longitude, phone, website,
+        ( 6371 * acos(
+            cos( radians(%(lat)s) ) * cos( radians( latitude ) ) *
+            cos( radians( longitude ) - radians(%(lng)s) ) +
+            sin( radians(%(lat)s) ) * sin( radians( latitude ) )
+        )) AS distance
+    FROM mosques
+    WHERE verified = TRUE
+    AND ( 6371 * acos(
+            cos( radians(%(lat)s) ) * cos( radians( latitude ) ) *
+            cos( radians( longitude ) - radians(%(lng)s) ) +
+            sin( radians(%(lat)s) ) * sin( radians( latitude ) )
+        )) < %(radius)s
+    ORDER BY distance
+    LIMIT %(limit)s
+"""
+
+def load_synthetic_mosques(cur, rows, clusters, seed):
+    """Create salah_bench.mosques with rows mosques, most of them clustered around cities"""
+    cur.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE")
+    cur.execute(f"CREATE SCHEMA {BENCH_SCHEMA}")
+    cur.execute(f"CREATE TABLE {BENCH_SCHEMA}.mosques (LIKE public.mosques INCLUDING INDEXES)")
+    cur.execute("SELECT setseed(%s)", (seed,))
+    cur.execute(f"""
+        CREATE TEMP TABLE bench_clusters AS
+        SELECT g AS cluster_id,
+               random() * 120 - 55 AS lat,
+               random() * 360 - 180 AS lng
+        FROM generate_series(0, %s - 1) g
+    """, (clusters,))
+    # 80% within ~50 km of a cluster centre, 20% spread uniformly
+    cur.execute(f"""
+        INSERT INTO {BENCH_SCHEMA}.mosques
+            (mosque_id, name, city, country, latitude, longitude, verified)
+        SELECT g,
+               'Synthetic Mosque ' || g,
+               'City ' || c.cluster_id,
+               'Country',
+               GREATEST(-89.9, LEAST(89.9,
+                   CASE WHEN random() < 0.8 THEN c.lat + (random() - 0.5) ELSE random() * 140 - 60 END)),
+               CASE WHEN random() < 0.8
+                    THEN ((c.lng + (random() - 0.5) + 540)::numeric %% 360) - 180
+                    ELSE random() * 360 - 180 END,
+               random() < 0.9
+        FROM generate_series(1, %s) g
+        JOIN bench_clusters c ON c.cluster_id = g %% %s
+    """, (rows, clusters))
+    cur.execute(f"ANALYZE {BENCH_SCHEMA}.mosques")
+    cur.execute("SELECT lat, lng FROM bench_clusters")
+    return [(row['lat'], row['lng']) for row in cur.fetchall()]
+
+def time_queries(cur, points, build):
+    """Run one query per point, returning latencies in ms"""
+    latencies = []
+    for lat, lng in points:
+        query, params = build(lat, lng)
+        start = time.perf_counter()
+        cur.execute(query, params)
+        cur.fetchall()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+def summarize(name, latencies):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{name:>14}: mean {statistics.mean(latencies):8.2f} ms   "
+          f"p50 {statistics.median(latencies):8.2f} ms   p95 {p95:8.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark nearby mosque search on synthetic data')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--clusters', type=int, default=500)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--radius', type=float, default=10.0)
+    parser.add_argument('--seed', type=float, default=0.42)
+    parser.add_argument('--keep', action='store_true', help=f'keep the {BENCH_SCHEMA} schema afterwards')
+    args = parser.parse_args()
+
+    with get_connection() as conn:
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            start = time.perf_counter()
+            centres = load_synthetic_mosques(cur, args.rows, args.clusters, args.seed)
+            print(f"Loaded {args.rows} mosques in {time.perf_counter() - start:.1f} s")
+
+            cur.execute(f"SET search_path TO {BENCH_SCHEMA}, public")
+
+            rng = random.Random(args.seed)
+            points = []
+            for _ in range(args.queries):
+                lat, lng = rng.choice(centres)
+                points.append((lat + rng.uniform(-0.3, 0.3), lng + rng.uniform(-0.3, 0.3)))
+
+            def build_legacy(lat, lng):
+                return LEGACY_QUERY, {'lat': lat, 'lng': lng, 'radius': args.radius, 'limit': 50}
+
+            def build_bbox(lat, lng):
+                return build_nearby_query(lat, lng, args.radius, limit=50)
+
+            # Warm the buffer cache so both variants read from memory
+            time_queries(cur, points[:5], build_bbox)
+            time_queries(cur, points[:5], build_legacy)
+
+            summarize('full scan', time_queries(cur, points, build_legacy))
+            summarize('bounding box', time_queries(cur, points, build_bbox))
+
+            query, params = build_bbox(*points[0])
+            cur.execute("EXPLAIN " + query, params)
+            print("\nBounding box plan:")
+            for row in cur.fetchall():
+                print("  " + row['QUERY PLAN'])
+
+            if not args.keep:
+                cur.execute(f"DROP SCHEMA {BENCH_SCHEMA} CASCADE")
+
+if __name__ == '__main__':
+    main()
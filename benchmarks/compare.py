@@ -0,0 +1,67 @@
+# benchmarks/compare.py - Compare two bench_api.py result files
+#
+# Usage: python -m benchmarks.compare base.json new.json [--threshold 10]
+#
+# Prints throughput and p50/p95/p99 per scenario with the change in percent.
+# With --threshold, exits with status 1 if any scenario's throughput dropped
+# or its p95 grew by more than that many percent.
+import argparse
+import json
+import sys
+
+def _change(base, new):
+    if base in (None, 0) or new is None:
+        return None
+    return (new - base) / base * 100
+
+def _fmt_change(change):
+    return '     n/a' if change is None else f'{change:+7.1f}%'
+
+def compare(base, new, threshold=None):
+    """
+    Returns:
+        (report lines, list of regressed scenario names)
+    """
+    lines = [f"{'scenario':<18} {'req/s':>10} {'Δ':>8}  {'p50 ms':>9} {'Δ':>8}  "
+             f"{'p95 ms':>9} {'Δ':>8}  {'p99 ms':>9} {'Δ':>8}"]
+    regressions = []
+    for name, new_summary in new['scenarios'].items():
+        base_summary = base['scenarios'].get(name)
+        if base_summary is None:
+            lines.append(f'{name:<18} (not in base)')
+            continue
+        rps_change = _change(base_summary['throughput_rps'], new_summary['throughput_rps'])
+        row = f"{name:<18} {new_summary['throughput_rps']:>10.1f} {_fmt_change(rps_change)}"
+        for pct in ('p50', 'p95', 'p99'):
+            value = new_summary['latency_ms'][pct]
+            row += f"  {value if value is not None else 'n/a':>9} {_fmt_change(_change(base_summary['latency_ms'][pct], value))}"
+        lines.append(row)
+
+        p95_change = _change(base_summary['latency_ms']['p95'], new_summary['latency_ms']['p95'])
+        if threshold is not None and ((rps_change is not None and rps_change < -threshold)
+                                      or (p95_change is not None and p95_change > threshold)):
+            regressions.append(name)
+    return lines, regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare two API benchmark results')
+    parser.add_argument('base')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, help='fail on regressions larger than this percentage')
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    print(f"base: {base['meta'].get('commit')} ({base['meta'].get('timestamp')})")
+    print(f"new:  {new['meta'].get('commit')} ({new['meta'].get('timestamp')})")
+    lines, regressions = compare(base, new, args.threshold)
+    print('\n'.join(lines))
+    if regressions:
+        print(f"Regressed by more than {args.threshold}%: {', '.join(regressions)}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
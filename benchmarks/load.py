@@ -0,0 +1,95 @@
+# benchmarks/load.py - Closed-loop HTTP load generator
+import math
+import random
+import statistics
+import threading
+import time
+
+import requests
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def summarize(latencies_ms, errors, elapsed, statuses):
+    latencies_ms = sorted(latencies_ms)
+    completed = len(latencies_ms)
+    return {
+        'requests': completed,
+        'errors': errors,
+        'duration_s': round(elapsed, 3),
+        'throughput_rps': round(completed / elapsed, 2) if elapsed else 0.0,
+        'latency_ms': {
+            'mean': round(statistics.mean(latencies_ms), 3) if latencies_ms else None,
+            'p50': round(percentile(latencies_ms, 50), 3) if latencies_ms else None,
+            'p95': round(percentile(latencies_ms, 95), 3) if latencies_ms else None,
+            'p99': round(percentile(latencies_ms, 99), 3) if latencies_ms else None,
+            'max': round(latencies_ms[-1], 3) if latencies_ms else None,
+        },
+        'statuses': dict(sorted(statuses.items())),
+    }
+
+def run_load(base_url, make_request, concurrency, duration, warmup=0.0, seed=0):
+    """
+    Send requests from concurrency threads for duration seconds
+
+    Each thread waits for its response before sending the next request
+    (closed loop), so throughput is what the server sustains at that
+    concurrency. Requests in the first warmup seconds are not recorded.
+
+    Args:
+        make_request: fn(rng) -> (method, path, json_body_or_None, query_params_or_None)
+
+    Returns:
+        Summary dict (see summarize)
+    """
+    lock = threading.Lock()
+    latencies = []
+    statuses = {}
+    errors = 0
+    start = time.perf_counter()
+    record_from = start + warmup
+    stop_at = record_from + duration
+
+    def worker(index):
+        nonlocal errors
+        rng = random.Random(f'{seed}-{index}')
+        session = requests.Session()
+        local_latencies = []
+        local_statuses = {}
+        local_errors = 0
+        while True:
+            method, path, body, params = make_request(rng)
+            sent = time.perf_counter()
+            if sent >= stop_at:
+                break
+            try:
+                response = session.request(method, base_url + path, json=body, params=params, timeout=30)
+                response.content
+                status = response.status_code
+            except requests.RequestException:
+                status = 'exception'
+            done = time.perf_counter()
+            if sent < record_from:
+                continue
+            local_latencies.append((done - sent) * 1000)
+            if status == 'exception' or status >= 400:
+                local_errors += 1
+            status = str(status)
+            local_statuses[status] = local_statuses.get(status, 0) + 1
+        with lock:
+            latencies.extend(local_latencies)
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+            errors += local_errors
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return summarize(latencies, errors, time.perf_counter() - record_from, statuses)
@@ -0,0 +1,101 @@
+# benchmarks/local_postgres.py - Throwaway PostgreSQL cluster for benchmarks
+#
+# Needs the PostgreSQL server binaries (initdb, pg_ctl) on PATH or in --pg-bin.
+# Durability is switched off (fsync, synchronous_commit, full_page_writes):
+# the cluster only lives for one benchmark run.
+import os
+import shutil
+import subprocess
+import tempfile
+
+import psycopg
+from psycopg.rows import dict_row
+
+SCHEMA_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'schema.sql')
+
+class LocalPostgres:
+    """initdb + pg_ctl start a private cluster, load schema.sql, remove it all on exit"""
+
+    def __init__(self, port=55432, bin_dir=None, dbname='worldwide_salah_bench', keep=False):
+        self.port = port
+        self.bin_dir = bin_dir
+        self.dbname = dbname
+        self.keep = keep
+        self.base_dir = None
+
+    def _bin(self, name):
+        path = os.path.join(self.bin_dir, name) if self.bin_dir else shutil.which(name)
+        if not path or not os.path.exists(path):
+            raise RuntimeError(f'{name} not found; install PostgreSQL or pass --pg-bin')
+        return path
+
+    @property
+    def data_dir(self):
+        return os.path.join(self.base_dir, 'data')
+
+    def start(self):
+        self.base_dir = tempfile.mkdtemp(prefix='salah-bench-pg-')
+        try:
+            self._start()
+        except BaseException:
+            self.keep = False
+            self.stop()
+            raise
+        return self
+
+    def _start(self):
+        subprocess.run(
+            [self._bin('initdb'), '-D', self.data_dir, '-U', 'postgres', '-A', 'trust', '-E', 'UTF8', '--no-sync'],
+            check=True, stdout=subprocess.DEVNULL
+        )
+        options = ' '.join([
+            f'-p {self.port}', f'-k {self.base_dir}', '-c listen_addresses=127.0.0.1',
+            '-c fsync=off', '-c synchronous_commit=off', '-c full_page_writes=off',
+            '-c shared_buffers=256MB', '-c max_connections=200',
+        ])
+        subprocess.run(
+            [self._bin('pg_ctl'), '-D', self.data_dir, '-o', options,
+             '-l', os.path.join(self.base_dir, 'postgres.log'), '-w', 'start'],
+            check=True, stdout=subprocess.DEVNULL
+        )
+        with psycopg.connect(self.conninfo('postgres'), autocommit=True) as conn:
+            conn.execute(f'CREATE DATABASE {self.dbname}')
+        with self.connect() as conn:
+            with open(SCHEMA_FILE) as f:
+                conn.execute(f.read())
+
+    def stop(self):
+        if self.base_dir is None:
+            return
+        if self.keep:
+            print(f"Keeping PostgreSQL running: data in {self.data_dir}, stop with "
+                  f"pg_ctl -D {self.data_dir} stop")
+            return
+        if os.path.exists(os.path.join(self.data_dir, 'postmaster.pid')):
+            subprocess.run([self._bin('pg_ctl'), '-D', self.data_dir, '-m', 'fast', '-w', 'stop'],
+                           check=False, stdout=subprocess.DEVNULL)
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+        self.base_dir = None
+
+    def conninfo(self, dbname=None):
+        return f"dbname={dbname or self.dbname} user=postgres host=127.0.0.1 port={self.port}"
+
+    def connect(self):
+        return psycopg.connect(self.conninfo(), row_factory=dict_row, autocommit=True)
+
+    def env(self):
+        """DB_* variables pointing the app at this cluster"""
+        return {
+            'DB_NAME': self.dbname,
+            'DB_USER': 'postgres',
+            # Ignored under trust auth, but get_conninfo() needs a non-empty value
+            'DB_PASSWORD': 'bench',
+            'DB_HOST': '127.0.0.1',
+            'DB_PORT': str(self.port),
+        }
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,115 @@
+# benchmarks/seed.py - Synthetic data for the API benchmarks
+#
+# Cache rows use made-up (but well-formed) times: the benchmarks measure
+# how fast rows are found and served, not what they contain.
+import random
+from datetime import date, timedelta
+
+from scripts.maintain_cache import ensure_partitions
+from utils.geo import location_key
+
+# Ramadan (1 Ramadan .. last day) per Gregorian year
+RAMADAN_DATES = {
+    2024: (1445, date(2024, 3, 11), date(2024, 4, 9)),
+    2025: (1446, date(2025, 3, 1), date(2025, 3, 29)),
+    2026: (1447, date(2026, 2, 18), date(2026, 3, 19)),
+    2027: (1448, date(2027, 2, 8), date(2027, 3, 9)),
+    2028: (1449, date(2028, 1, 28), date(2028, 2, 25)),
+}
+
+def hot_locations(count, seed):
+    """Deterministic (lat, lon) points, 4 decimals like the cache key"""
+    rng = random.Random(seed)
+    points = []
+    for _ in range(count):
+        lat = round(rng.uniform(-45, 60), 4)
+        lon = round(rng.uniform(-180, 180), 4)
+        points.append((lat, lon))
+    return points
+
+def seed_prayer_cache(conn, locations, start_date, days, methods=('ISNA',), asr_methods=('standard',)):
+    """Insert len(locations) * days * methods * asr_methods cache rows; returns the row count"""
+    with conn.cursor() as cur:
+        cur.execute("CREATE TEMP TABLE bench_locations (lat_key INTEGER, lon_key INTEGER)")
+        with cur.copy("COPY bench_locations (lat_key, lon_key) FROM STDIN") as copy:
+            for lat, lon in locations:
+                copy.write_row(location_key(lat, lon))
+        cur.execute("""
+            INSERT INTO prayer_time_cache
+            (lat_key, lon_key, latitude, longitude, calculation_method, asr_method, prayer_date,
+             fajr_time, sunrise_time, dhuhr_time, asr_time, maghrib_time, isha_time)
+            SELECT l.lat_key, l.lon_key, l.lat_key / 10000.0, l.lon_key / 10000.0, m.method, a.asr,
+                   %(start)s::date + d,
+                   make_time(5, (abs(l.lat_key) + d) %% 60, 0),
+                   make_time(6, (abs(l.lon_key) + d) %% 60, 0),
+                   make_time(12, d %% 60, 0),
+                   make_time(15, (abs(l.lat_key) + 2 * d) %% 60, 0),
+                   make_time(18, (abs(l.lon_key) + 2 * d) %% 60, 0),
+                   make_time(19, (abs(l.lat_key) + 3 * d) %% 60, 0)
+            FROM bench_locations l
+            CROSS JOIN generate_series(0, %(days)s - 1) d
+            CROSS JOIN unnest(%(methods)s::text[]) m(method)
+            CROSS JOIN unnest(%(asr_methods)s::text[]) a(asr)
+            ON CONFLICT DO NOTHING
+        """, {'start': start_date, 'days': days, 'methods': list(methods), 'asr_methods': list(asr_methods)})
+        rows = cur.rowcount
+        cur.execute("DROP TABLE bench_locations")
+        cur.execute("ANALYZE prayer_time_cache")
+    return rows
+
+def seed_mosques(conn, count, centres, seed):
+    """Insert count mosques, 80% within ~50 km of one of centres, 90% verified"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT setseed(%s)", (seed,))
+        cur.execute("CREATE TEMP TABLE bench_centres (centre_id INTEGER, lat FLOAT8, lng FLOAT8)")
+        with cur.copy("COPY bench_centres (centre_id, lat, lng) FROM STDIN") as copy:
+            for i, (lat, lng) in enumerate(centres):
+                copy.write_row((i, lat, lng))
+        cur.execute("""
+            INSERT INTO mosques (name, city, country, latitude, longitude, verified)
+            SELECT 'Synthetic Mosque ' || g,
+                   'City ' || c.centre_id,
+                   'Country',
+                   GREATEST(-89.9, LEAST(89.9,
+                       CASE WHEN random() < 0.8 THEN c.lat + (random() - 0.5) ELSE random() * 140 - 60 END)),
+                   CASE WHEN random() < 0.8
+                        THEN ((c.lng + (random() - 0.5) + 540)::numeric %% 360) - 180
+                        ELSE random() * 360 - 180 END,
+                   random() < 0.9
+            FROM generate_series(1, %s) g
+            JOIN bench_centres c ON c.centre_id = g %% %s
+        """, (count, len(centres)))
+        cur.execute("DROP TABLE bench_centres")
+        cur.execute("ANALYZE mosques")
+
+def seed_ramadan_dates(conn):
+    with conn.cursor() as cur:
+        for year, (hijri_year, start, end) in RAMADAN_DATES.items():
+            cur.execute(
+                "INSERT INTO ramadan_dates (hijri_year, gregorian_year, start_date, end_date) "
+                "VALUES (%s, %s, %s, %s) ON CONFLICT DO NOTHING",
+                (hijri_year, year, start, end)
+            )
+
+def seed_all(conn, cache_locations, cache_start, cache_days, mosques, seed):
+    """
+    Load everything the API benchmarks need
+
+    Returns:
+        Dict with the hot locations and row counts
+    """
+    locations = hot_locations(cache_locations, seed)
+    # Monthly partitions for the seeded range, as scripts/maintain_cache.py keeps them
+    ensure_partitions(conn, cache_start.replace(day=1),
+                      (cache_start + timedelta(days=cache_days - 1)).replace(day=1))
+    cache_rows = seed_prayer_cache(conn, locations, cache_start, cache_days)
+    # setseed() takes a value in [-1, 1]
+    seed_mosques(conn, mosques, locations[:500], (seed % 1000) / 1000)
+    seed_ramadan_dates(conn)
+    return {
+        'hot_locations': locations,
+        'cache_rows': cache_rows,
+        'mosques': mosques,
+        'cache_start': cache_start,
+        'cache_end': cache_start + timedelta(days=cache_days - 1),
+    }
@@ -0,0 +1,41 @@
+# benchmarks/serve_app.py - Run the API for a benchmark
+#
+# Usage: python -m benchmarks.serve_app --port 5055 [--server asgi]
+#
+# Threaded werkzeug server without the debugger or reloader (or hypercorn
+# serving asgi.py), configured entirely from the environment (bench_api.py
+# sets DB_* and the prayer times source before starting it).
+import argparse
+import logging
+
+from werkzeug.serving import run_simple
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the API for benchmarks')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--server', choices=('wsgi', 'asgi'), default='wsgi')
+    args = parser.parse_args()
+
+    if args.server == 'asgi':
+        import asyncio
+
+        from hypercorn.asyncio import serve
+        from hypercorn.config import Config
+
+        from asgi import application
+
+        config = Config()
+        config.bind = [f'{args.host}:{args.port}']
+        config.accesslog = None
+        asyncio.run(serve(application, config))
+        return
+
+    from app import app
+
+    # Per-request access lines would dominate the run
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    run_simple(args.host, args.port, app, threaded=True, use_reloader=False, use_debugger=False)
+
+if __name__ == '__main__':
+    main()
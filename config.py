@@ -7,4 +7,20 @@ class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key')
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'jwt-secret-key')
\ No newline at end of file
+    JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'jwt-secret-key')
+    # 'local' computes prayer times in-process, 'aladhan' calls api.aladhan.com
+    PRAYER_TIMES_SOURCE = os.getenv('PRAYER_TIMES_SOURCE', 'local').lower()
+    # Serve nearby mosque searches from an in-memory spatial index
+    MOSQUE_INDEX_ENABLED = os.getenv('MOSQUE_INDEX_ENABLED', 'false').lower() == 'true'
+    # Limits and worker pool for /api/prayer-times/batch
+    BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', '100'))
+    BATCH_MAX_DAYS = int(os.getenv('BATCH_MAX_DAYS', '366'))
+    BATCH_WORKERS = int(os.getenv('BATCH_WORKERS', '4'))
+    # Longest date range /api/prayer-times/export streams in one response
+    EXPORT_MAX_DAYS = int(os.getenv('EXPORT_MAX_DAYS', '1830'))
+    # Token for /admin endpoints and the X-Profile header (admin endpoints are off when empty)
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+    # Request profiling: off unless enabled; 'cprofile' or 'sample' mode
+    PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() == 'true'
+    PROFILING_MODE = os.getenv('PROFILING_MODE', 'cprofile').lower()
+    PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', '0'))
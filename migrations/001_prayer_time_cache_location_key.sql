@@ -0,0 +1,55 @@
+-- Migration 001: integer location key for prayer_time_cache
+--
+-- Lookups used to filter on ROUND(CAST(latitude AS numeric), 4), which no
+-- index can serve. The cache is now keyed on lat_key/lon_key (coordinates
+-- x 10^4 as integers) with a unique index matching the lookup predicate.
+--
+-- Run with: psql -d worldwide_salah -f migrations/001_prayer_time_cache_location_key.sql
+
+BEGIN;
+
+ALTER TABLE prayer_time_cache ADD COLUMN IF NOT EXISTS lat_key INTEGER;
+ALTER TABLE prayer_time_cache ADD COLUMN IF NOT EXISTS lon_key INTEGER;
+
+-- Backfill existing rows
+UPDATE prayer_time_cache
+SET lat_key = ROUND(latitude * 10000)::INTEGER,
+    lon_key = ROUND(longitude * 10000)::INTEGER
+WHERE lat_key IS NULL OR lon_key IS NULL;
+
+-- Rows that only differed beyond the 4th decimal now share a key; keep the newest
+DELETE FROM prayer_time_cache a
+USING prayer_time_cache b
+WHERE a.lat_key = b.lat_key
+  AND a.lon_key = b.lon_key
+  AND a.calculation_method = b.calculation_method
+  AND a.asr_method = b.asr_method
+  AND a.prayer_date = b.prayer_date
+  AND a.cache_id < b.cache_id;
+
+ALTER TABLE prayer_time_cache ALTER COLUMN lat_key SET NOT NULL;
+ALTER TABLE prayer_time_cache ALTER COLUMN lon_key SET NOT NULL;
+
+-- Replace the old coordinate unique constraint and index
+DO $$
+DECLARE
+    constraint_name TEXT;
+BEGIN
+    SELECT conname INTO constraint_name
+    FROM pg_constraint
+    WHERE conrelid = 'prayer_time_cache'::regclass
+      AND contype = 'u'
+      AND pg_get_constraintdef(oid) LIKE 'UNIQUE (latitude, longitude,%';
+    IF constraint_name IS NOT NULL THEN
+        EXECUTE format('ALTER TABLE prayer_time_cache DROP CONSTRAINT %I', constraint_name);
+    END IF;
+END $$;
+
+DROP INDEX IF EXISTS idx_prayer_time_cache_coords;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_prayer_time_cache_key
+    ON prayer_time_cache(lat_key, lon_key, calculation_method, asr_method, prayer_date);
+
+COMMIT;
+
+ANALYZE prayer_time_cache;
@@ -0,0 +1,83 @@
+-- Migration 002: partition prayer_time_cache by month of prayer_date
+--
+-- The cache only ever grew. It is now range-partitioned by month, so a
+-- lookup touches one partition's index and old months are removed by
+-- dropping their partition instead of DELETE + VACUUM. Lookups per location
+-- cell are counted in prayer_cache_cells for size-budget eviction.
+-- scripts/maintain_cache.py keeps the partitions up to date afterwards.
+--
+-- Rows are copied into the new table, so this needs free disk space for a
+-- second copy of the cache and blocks cache writes while it runs; the API
+-- keeps serving (cache misses are computed).
+--
+-- Run with: psql -d worldwide_salah -f migrations/002_partition_prayer_time_cache.sql
+
+BEGIN;
+
+ALTER TABLE prayer_time_cache RENAME TO prayer_time_cache_unpartitioned;
+ALTER INDEX idx_prayer_time_cache_key RENAME TO idx_prayer_time_cache_key_unpartitioned;
+
+CREATE TABLE prayer_time_cache (
+    lat_key INTEGER NOT NULL,
+    lon_key INTEGER NOT NULL,
+    latitude DECIMAL(10, 8) NOT NULL,
+    longitude DECIMAL(11, 8) NOT NULL,
+    calculation_method VARCHAR(50) NOT NULL,
+    asr_method VARCHAR(20) NOT NULL,
+    prayer_date DATE NOT NULL,
+    fajr_time TIME NOT NULL,
+    sunrise_time TIME NOT NULL,
+    dhuhr_time TIME NOT NULL,
+    asr_time TIME NOT NULL,
+    maghrib_time TIME NOT NULL,
+    isha_time TIME NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+) PARTITION BY RANGE (prayer_date);
+
+CREATE TABLE prayer_time_cache_default PARTITION OF prayer_time_cache DEFAULT;
+
+-- One partition per month from the oldest cached day to two years ahead
+DO $$
+DECLARE
+    part_month DATE;
+    last_month DATE;
+BEGIN
+    SELECT date_trunc('month', LEAST(MIN(prayer_date), CURRENT_DATE))::date
+    INTO part_month
+    FROM prayer_time_cache_unpartitioned;
+    last_month := (date_trunc('month', CURRENT_DATE) + INTERVAL '24 months')::date;
+    WHILE part_month <= last_month LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF prayer_time_cache FOR VALUES FROM (%L) TO (%L)',
+            'prayer_time_cache_p' || to_char(part_month, 'YYYY_MM'),
+            part_month,
+            (part_month + INTERVAL '1 month')::date
+        );
+        part_month := (part_month + INTERVAL '1 month')::date;
+    END LOOP;
+END $$;
+
+INSERT INTO prayer_time_cache
+    (lat_key, lon_key, latitude, longitude, calculation_method, asr_method, prayer_date,
+     fajr_time, sunrise_time, dhuhr_time, asr_time, maghrib_time, isha_time, created_at)
+SELECT lat_key, lon_key, latitude, longitude, calculation_method, asr_method, prayer_date,
+       fajr_time, sunrise_time, dhuhr_time, asr_time, maghrib_time, isha_time, created_at
+FROM prayer_time_cache_unpartitioned;
+
+-- Built after the copy: one index per partition, attached to this one
+CREATE UNIQUE INDEX idx_prayer_time_cache_key
+    ON prayer_time_cache(lat_key, lon_key, calculation_method, asr_method, prayer_date);
+
+DROP TABLE prayer_time_cache_unpartitioned;
+
+CREATE TABLE IF NOT EXISTS prayer_cache_cells (
+    lat_key INTEGER NOT NULL,
+    lon_key INTEGER NOT NULL,
+    hits BIGINT NOT NULL DEFAULT 0,
+    last_used DATE NOT NULL DEFAULT CURRENT_DATE,
+    PRIMARY KEY (lat_key, lon_key)
+);
+
+COMMIT;
+
+ANALYZE prayer_time_cache;
@@ -0,0 +1,19 @@
+-- Migration 003: drop the sample ramadan_dates rows
+--
+-- schema.sql used to seed 2025-2027, written before the dates were computed
+-- (utils/hijri.py). As overrides, those rows now replace the Umm al-Qura dates
+-- with ones a day or two early (2026 started 02-17 instead of 02-18). Only rows
+-- still holding the sample dates are deleted; edited overrides are kept.
+--
+-- Run with: psql -d worldwide_salah -f migrations/003_drop_seeded_ramadan_dates.sql
+
+BEGIN;
+
+DELETE FROM ramadan_dates
+WHERE (hijri_year, gregorian_year, start_date, end_date) IN (
+    (1446, 2025, DATE '2025-02-28', DATE '2025-03-29'),
+    (1447, 2026, DATE '2026-02-17', DATE '2026-03-18'),
+    (1448, 2027, DATE '2027-02-06', DATE '2027-03-07')
+);
+
+COMMIT;
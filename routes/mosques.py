@@ -1,6 +1,10 @@
+import logging
+
 from flask import Blueprint, jsonify, request
 from utils.db import execute_query
-import math
+from utils.mosques import find_nearby_mosques
+
+logger = logging.getLogger(__name__)
 
 bp = Blueprint('mosques', __name__)
 
@@ -12,25 +16,7 @@ def get_nearby_mosques():
         lng = float(request.args.get('lng'))
         radius = float(request.args.get('radius', 10))  # km
         
-        # Fixed query with subquery
-        query = """
-            SELECT * FROM (
-                SELECT mosque_id, name, address, city, country,
-                       latitude, longitude, phone, website,
-                       (6371 * acos(
-                           cos(radians(%s)) * cos(radians(latitude)) *
-                           cos(radians(longitude) - radians(%s)) +
-                           sin(radians(%s)) * sin(radians(latitude))
-                       )) AS distance
-                FROM mosques
-                WHERE verified = true
-            ) AS mosques_with_distance
-            WHERE distance < %s
-            ORDER BY distance
-            LIMIT 20
-        """
-        
-        mosques = execute_query(query, (lat, lng, lat, radius))
+        mosques = find_nearby_mosques(lat, lng, radius, limit=20)
         
         return jsonify({
             'success': True,
@@ -43,7 +29,7 @@ def get_nearby_mosques():
     except ValueError:
         return jsonify({'success': False, 'error': 'Invalid parameters'}), 400
     except Exception as e:
-        print(f"Error: {e}")
+        logger.error("Nearby mosques error: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @bp.route('/<int:mosque_id>/prayer-times', methods=['GET'])
@@ -1,6 +1,8 @@
 from flask import Blueprint, jsonify, request
 from utils.db import execute_query
-from datetime import datetime
+from utils.geo import location_key
+from utils.prayer_cache import SELECT_CACHED_DAY
+from datetime import datetime, date as date_cls
 
 bp = Blueprint('prayer_times', __name__)
 
@@ -16,19 +18,10 @@ def get_prayer_times():
         asr_method = request.args.get('asr_method', 'Standard')
         
         # Check cache first
-        query = """
-            SELECT fajr_time, sunrise_time, dhuhr_time, asr_time, 
-                   maghrib_time, isha_time
-            FROM prayer_time_cache
-            WHERE latitude = %s AND longitude = %s 
-              AND prayer_date = %s
-              AND calculation_method = %s
-              AND asr_method = %s
-        """
-        
+        lat_key, lng_key = location_key(lat, lng)
         result = execute_query(
-            query, 
-            (lat, lng, date, method, asr_method),
+            SELECT_CACHED_DAY, 
+            (lat_key, lng_key, method, asr_method, date),
             fetch_one=True
         )
         
@@ -60,17 +53,22 @@ def get_monthly_prayer_times():
         year = int(request.args.get('year', datetime.now().year))
         month = int(request.args.get('month', datetime.now().month))
         
+        # Date range instead of EXTRACT() so the cache index can be used
+        first_day = date_cls(year, month, 1)
+        next_month = date_cls(year + 1, 1, 1) if month == 12 else date_cls(year, month + 1, 1)
+        lat_key, lng_key = location_key(lat, lng)
+        
         query = """
             SELECT prayer_date, fajr_time, sunrise_time, dhuhr_time, 
                    asr_time, maghrib_time, isha_time
             FROM prayer_time_cache
-            WHERE latitude = %s AND longitude = %s
-              AND EXTRACT(YEAR FROM prayer_date) = %s
-              AND EXTRACT(MONTH FROM prayer_date) = %s
+            WHERE lat_key = %s AND lon_key = %s
+              AND prayer_date >= %s
+              AND prayer_date < %s
             ORDER BY prayer_date
         """
         
-        results = execute_query(query, (lat, lng, year, month))
+        results = execute_query(query, (lat_key, lng_key, first_day, next_month))
         
         return jsonify({
             'year': year,
@@ -73,8 +73,12 @@ CREATE TABLE mosque_prayer_times (
 );
 
 -- Prayer time cache table - cache calculated prayer times
+-- Range-partitioned by month of prayer_date (prayer_time_cache_pYYYY_MM);
+-- scripts/maintain_cache.py creates future partitions, drops expired ones
+-- and moves rows out of the default partition
 CREATE TABLE prayer_time_cache (
-    cache_id SERIAL PRIMARY KEY,
+    lat_key INTEGER NOT NULL, -- ROUND(latitude * 10000), the indexed location key
+    lon_key INTEGER NOT NULL, -- ROUND(longitude * 10000)
     latitude DECIMAL(10, 8) NOT NULL,
     longitude DECIMAL(11, 8) NOT NULL,
     calculation_method VARCHAR(50) NOT NULL,
@@ -86,11 +90,22 @@ CREATE TABLE prayer_time_cache (
     asr_time TIME NOT NULL,
     maghrib_time TIME NOT NULL,
     isha_time TIME NOT NULL,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    UNIQUE(latitude, longitude, calculation_method, asr_method, prayer_date)
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+) PARTITION BY RANGE (prayer_date);
+
+-- Dates without a monthly partition yet
+CREATE TABLE prayer_time_cache_default PARTITION OF prayer_time_cache DEFAULT;
+
+-- Lookups per location cell, for evicting rarely used cells beyond the size budget
+CREATE TABLE prayer_cache_cells (
+    lat_key INTEGER NOT NULL,
+    lon_key INTEGER NOT NULL,
+    hits BIGINT NOT NULL DEFAULT 0,
+    last_used DATE NOT NULL DEFAULT CURRENT_DATE,
+    PRIMARY KEY (lat_key, lon_key)
 );
 
--- Ramadan dates table - store Ramadan start/end dates
+-- Ramadan dates table - overrides of the computed (Umm al-Qura) Ramadan dates, see utils/hijri.py
 CREATE TABLE ramadan_dates (
     ramadan_id SERIAL PRIMARY KEY,
     hijri_year INTEGER NOT NULL UNIQUE,
@@ -117,7 +132,7 @@ CREATE INDEX idx_user_locations_coords ON user_locations(latitude, longitude);
 CREATE INDEX idx_mosques_coords ON mosques(latitude, longitude);
 CREATE INDEX idx_mosques_city_country ON mosques(city, country);
 CREATE INDEX idx_mosque_prayer_times_mosque_id ON mosque_prayer_times(mosque_id);
-CREATE INDEX idx_prayer_time_cache_coords ON prayer_time_cache(latitude, longitude, prayer_date);
+CREATE UNIQUE INDEX idx_prayer_time_cache_key ON prayer_time_cache(lat_key, lon_key, calculation_method, asr_method, prayer_date);
 CREATE INDEX idx_ramadan_dates_year ON ramadan_dates(gregorian_year);
 CREATE INDEX idx_notification_logs_user_id ON notification_logs(user_id, sent_at);
 
@@ -146,12 +161,6 @@ CREATE TRIGGER update_mosques_updated_at BEFORE UPDATE ON mosques
 CREATE TRIGGER update_mosque_prayer_times_updated_at BEFORE UPDATE ON mosque_prayer_times
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
--- Insert sample Ramadan dates
-INSERT INTO ramadan_dates (hijri_year, gregorian_year, start_date, end_date) VALUES
-(1446, 2025, '2025-02-28', '2025-03-29'),
-(1447, 2026, '2026-02-17', '2026-03-18'),
-(1448, 2027, '2027-02-06', '2027-03-07');
-
 -- Sample mosque data (New York area)
 INSERT INTO mosques (name, address, city, country, latitude, longitude, phone, verified) VALUES
 ('Islamic Cultural Center of New York', '1711 3rd Ave', 'New York', 'USA', 40.7812, -73.9537, '212-722-5234', true),
@@ -0,0 +1,60 @@
+# scripts/backfill_timezones.py - Fill user_locations.timezone from coordinates
+#
+# Usage:
+#   python -m scripts.backfill_timezones
+#   python -m scripts.backfill_timezones --all --batch-size 5000   # recompute every row
+#
+# Resolves saved locations a batch at a time with utils.timezones.timezone_names
+# (build the grid first with scripts.build_timezone_grid, or this falls back
+# to polygon lookups) and writes the names back with one UPDATE per batch.
+import argparse
+import sys
+import time
+
+from utils.db import get_connection
+from utils.timezones import timezone_names
+
+SELECT_LOCATIONS = """
+    SELECT location_id, latitude, longitude
+    FROM user_locations
+    WHERE location_id > %s {where}
+    ORDER BY location_id
+    LIMIT %s
+"""
+
+UPDATE_TIMEZONES = """
+    UPDATE user_locations u
+    SET timezone = t.timezone
+    FROM unnest(%s::int[], %s::text[]) AS t(location_id, timezone)
+    WHERE u.location_id = t.location_id
+      AND u.timezone IS DISTINCT FROM t.timezone
+"""
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fill user_locations.timezone from coordinates')
+    parser.add_argument('--all', action='store_true', help='Recompute rows that already have a timezone')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    query = SELECT_LOCATIONS.format(where='' if args.all else 'AND timezone IS NULL')
+    started = time.perf_counter()
+    seen = updated = 0
+    last_id = 0
+    with get_connection() as conn:
+        conn.autocommit = True
+        while True:
+            rows = conn.execute(query, (last_id, args.batch_size)).fetchall()
+            if not rows:
+                break
+            names = timezone_names([(round(float(row['latitude']), 4), round(float(row['longitude']), 4))
+                                    for row in rows])
+            updated += conn.execute(UPDATE_TIMEZONES, ([row['location_id'] for row in rows], names)).rowcount
+            seen += len(rows)
+            last_id = rows[-1]['location_id']
+            print(f"🕰️ {seen} locations resolved, {updated} updated")
+
+    print(f"✅ Done in {time.perf_counter() - started:.1f}s")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,178 @@
+# scripts/build_timezone_grid.py - Precompute the timezone grid read by utils/timezones.py
+#
+# Usage:
+#   python -m scripts.build_timezone_grid                    # writes TIMEZONE_GRID_PATH
+#   python -m scripts.build_timezone_grid --cells-per-degree 20 --check 20000
+#
+# timezonefinder splits the world into 1 x 0.5 degree shortcuts and stores
+# which zone polygons each one overlaps. Grid cells nest inside shortcuts:
+# cells of a shortcut with a single zone get that zone. In the others, a
+# cell that some polygon edge (or hole edge) may cross is marked mixed and
+# looked up in the polygons at request time. No border runs through the
+# remaining cells, so each connected patch of them lies in one zone, found
+# with one polygon lookup. Rebuild after upgrading timezonefinder.
+from importlib.metadata import version
+import argparse
+import json
+import os
+import random
+import struct
+import sys
+import time
+
+import numpy as np
+
+from utils.timezones import GRID_DTYPE, GRID_MAGIC, GRID_MIXED, TIMEZONE_GRID_PATH, TimezoneGrid
+
+COORD_SCALE = 10 ** 7  # timezonefinder stores coordinates as int(degrees * 10^7)
+# Edges are widened by this much (scaled) so rounding never misses a crossing
+EDGE_MARGIN = 10
+
+def polygon_edges(finder, polygon_id, cache):
+    """(lon_min, lon_max, lat_min, lat_max) arrays of the polygon's edges, holes included, as scaled ints"""
+    if polygon_id not in cache:
+        bounds = []
+        for lons, lats in finder.get_polygon(polygon_id):
+            x = np.rint(np.asarray(lons) * COORD_SCALE).astype(np.int64)
+            y = np.rint(np.asarray(lats) * COORD_SCALE).astype(np.int64)
+            x_next, y_next = np.roll(x, -1), np.roll(y, -1)
+            bounds.append((np.minimum(x, x_next) - EDGE_MARGIN, np.maximum(x, x_next) + EDGE_MARGIN,
+                           np.minimum(y, y_next) - EDGE_MARGIN, np.maximum(y, y_next) + EDGE_MARGIN))
+        cache[polygon_id] = tuple(np.concatenate(parts) for parts in zip(*bounds))
+    return cache[polygon_id]
+
+def mark_border_cells(finder, x, y, cells_per_degree, cache):
+    """Cells of shortcut (x, y) that an edge of one of its polygons may cross, as a bool array"""
+    rows, cols = cells_per_degree // 2, cells_per_degree
+    cell_size = COORD_SCALE // cells_per_degree
+    left = (x - 180) * COORD_SCALE
+    top = 90 * COORD_SCALE - y * COORD_SCALE // 2
+    border = np.zeros((rows, cols), dtype=bool)
+    for polygon_id in finder.polygon_ids_of_shortcut(x, y):
+        lon_min, lon_max, lat_min, lat_max = polygon_edges(finder, int(polygon_id), cache)
+        inside = ((lon_min <= left + COORD_SCALE) & (lon_max >= left)
+                  & (lat_min <= top) & (lat_max >= top - COORD_SCALE // 2))
+        if not inside.any():
+            continue
+        col_first = np.clip((lon_min[inside] - left) // cell_size, 0, cols - 1)
+        col_last = np.clip((lon_max[inside] - left) // cell_size, 0, cols - 1)
+        row_first = np.clip((top - lat_max[inside]) // cell_size, 0, rows - 1)
+        row_last = np.clip((top - lat_min[inside]) // cell_size, 0, rows - 1)
+        for row0, row1, col0, col1 in zip(row_first, row_last, col_first, col_last):
+            border[row0:row1 + 1, col0:col1 + 1] = True
+    return border
+
+def fill_patches(finder, cells, pending, cells_per_degree):
+    """
+    Give each 4-connected patch of pending cells (longitudes wrap) the zone
+    at the centre of one of its cells
+
+    Returns:
+        Number of patches (polygon lookups made)
+    """
+    rows, cols = cells.shape
+    patches = 0
+    for start in zip(*np.nonzero(pending)):
+        if not pending[start]:
+            continue
+        row, col = start
+        lat = 90 - (row + 0.5) / cells_per_degree
+        lon = (col + 0.5) / cells_per_degree - 180
+        value = finder.timezone_names.index(finder.timezone_at(lng=lon, lat=lat)) + 1
+        patches += 1
+        pending[start] = False
+        stack = [start]
+        while stack:
+            row, col = stack.pop()
+            cells[row, col] = value
+            for neighbour in ((row - 1, col), (row + 1, col), (row, (col - 1) % cols), (row, (col + 1) % cols)):
+                if 0 <= neighbour[0] < rows and pending[neighbour]:
+                    pending[neighbour] = False
+                    stack.append(neighbour)
+    return patches
+
+def build(finder, cells_per_degree):
+    """
+    Returns:
+        (rows x cols uint16 array of zone index + 1 or GRID_MIXED,
+         border shortcuts, polygon lookups made)
+    """
+    cols_per_shortcut = cells_per_degree
+    rows_per_shortcut = cells_per_degree // 2
+    cells = np.zeros((180 * cells_per_degree, 360 * cells_per_degree), dtype=GRID_DTYPE)
+    pending = np.zeros(cells.shape, dtype=bool)
+    edge_cache = {}
+    border_shortcuts = 0
+
+    for x in range(360):
+        col0 = x * cols_per_shortcut
+        for y in range(360):
+            row0 = y * rows_per_shortcut
+            block = (slice(row0, row0 + rows_per_shortcut), slice(col0, col0 + cols_per_shortcut))
+            zone = finder.unique_timezone_at(lng=x - 179.5, lat=89.75 - y / 2)
+            if zone is not None:
+                cells[block] = finder.timezone_names.index(zone) + 1
+            else:
+                border_shortcuts += 1
+                pending[block] = ~mark_border_cells(finder, x, y, cells_per_degree, edge_cache)
+
+    patches = fill_patches(finder, cells, pending, cells_per_degree)
+    return cells, border_shortcuts, patches
+
+def write_grid(path, cells, cells_per_degree, zones, source):
+    header = json.dumps({'cells_per_degree': cells_per_degree, 'zones': zones, 'source': source}).encode()
+    prefix = GRID_MAGIC + struct.pack('<I', len(header)) + header
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(prefix + b'\0' * (-len(prefix) % 8))
+        f.write(cells.tobytes())
+    os.replace(tmp_path, path)
+
+def check(finder, grid, points, seed):
+    """Compare grid answers with polygon lookups at random points; returns mismatches"""
+    rng = random.Random(seed)
+    mismatches = 0
+    for _ in range(points):
+        lat, lon = rng.uniform(-90, 90), rng.uniform(-180, 180)
+        value = grid.cell_value(lat, lon)
+        if value != GRID_MIXED and grid.zones[value] != finder.timezone_at(lng=lon, lat=lat):
+            mismatches += 1
+            print(f"❌ ({lat:.4f}, {lon:.4f}): grid {grid.zones[value]}, polygons {finder.timezone_at(lng=lon, lat=lat)}")
+    return mismatches
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Precompute the timezone grid for utils/timezones.py')
+    parser.add_argument('--output', default=TIMEZONE_GRID_PATH, help='default: TIMEZONE_GRID_PATH')
+    parser.add_argument('--cells-per-degree', type=int, default=10,
+                        help='Even number; 10 = 0.1 degree cells, a 13 MB file (default 10)')
+    parser.add_argument('--check', type=int, default=2000, metavar='POINTS',
+                        help='Random points to verify against polygon lookups afterwards (default 2000)')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+    if args.cells_per_degree < 2 or args.cells_per_degree % 2:
+        parser.error('--cells-per-degree must be an even number (cells nest in half-degree shortcuts)')
+
+    from timezonefinder import TimezoneFinder
+
+    finder = TimezoneFinder()
+    started = time.perf_counter()
+    cells, border_shortcuts, patches = build(finder, args.cells_per_degree)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    write_grid(args.output, cells, args.cells_per_degree, list(finder.timezone_names),
+               f"timezonefinder {version('timezonefinder')}")
+    mixed = np.count_nonzero(cells == GRID_MIXED)
+    print(f"🗺️ {cells.size} cells written to {args.output} in {time.perf_counter() - started:.1f}s "
+          f"({os.path.getsize(args.output) / 1024 / 1024:.1f} MB)")
+    print(f"🧭 {mixed} cells ({mixed / cells.size:.2%}) in {border_shortcuts} border shortcuts fall back to polygons, "
+          f"{patches} patches between borders resolved once each")
+
+    if args.check:
+        mismatches = check(finder, TimezoneGrid(args.output), args.check, args.seed)
+        if mismatches:
+            print(f"⚠️ {mismatches} of {args.check} random points disagree with polygon lookups")
+            return 1
+        print(f"✅ {args.check} random points match polygon lookups")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
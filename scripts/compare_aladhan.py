@@ -0,0 +1,137 @@
+# scripts/compare_aladhan.py - Check the local engine against api.aladhan.com
+#
+# Usage:
+#   python -m scripts.compare_aladhan                 # live, needs network access
+#   python -m scripts.compare_aladhan --record        # save Aladhan's answers as the fixture file
+#   python -m scripts.compare_aladhan --offline       # compare with the fixture file
+#
+# Exits non-zero if any time differs by more than a minute. The fixture file
+# is what tests/test_aladhan_fixtures.py checks; re-record it after
+# changing FIXTURE_LOCATIONS or FIXTURE_DATES.
+import argparse
+import json
+import os
+import sys
+from datetime import date, datetime
+
+from utils.prayer_calc import METHODS, ASR_FACTORS, calculate_prayer_times
+
+FIXTURE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            'tests', 'fixtures', 'aladhan_timings.json')
+
+# Aladhan and the engine round seconds to the minute independently
+TOLERANCE_MINUTES = 1
+
+# Reference locations: mid latitudes, tropics, southern hemisphere,
+# DST zones, half-hour offsets and a high latitude city
+FIXTURE_LOCATIONS = [
+    ('New York', 40.7128, -74.0060),
+    ('London', 51.5074, -0.1278),
+    ('Makkah', 21.4225, 39.8262),
+    ('Cairo', 30.0444, 31.2357),
+    ('Karachi', 24.8607, 67.0011),
+    ('Tehran', 35.6892, 51.3890),
+    ('Jakarta', -6.2088, 106.8456),
+    ('Sydney', -33.8688, 151.2093),
+    ('Delhi', 28.6139, 77.2090),
+    ('Oslo', 59.9139, 10.7522),
+]
+
+# Includes the DST changes of North America (Mar 8, Nov 1) and Europe (Mar 29, Oct 25)
+FIXTURE_DATES = [
+    date(2026, 1, 15),
+    date(2026, 3, 8),
+    date(2026, 3, 29),
+    date(2026, 6, 21),
+    date(2026, 9, 23),
+    date(2026, 10, 25),
+    date(2026, 11, 1),
+    date(2026, 12, 21),
+]
+
+def _minutes(hhmm):
+    h, m = hhmm.split(':')[:2]
+    return int(h) * 60 + int(m)
+
+def compare_times(label, local, remote):
+    """Mismatch descriptions for one fixture's local and Aladhan times"""
+    mismatches = []
+    for prayer, value in local.items():
+        # Aladhan may append a timezone abbreviation, e.g. "05:12 (EST)"
+        expected = remote[prayer].split(' ')[0]
+        diff = abs(_minutes(value) - _minutes(expected))
+        if min(diff, 1440 - diff) > TOLERANCE_MINUTES:
+            mismatches.append(f"{label} {prayer}: local {value}, aladhan {expected}")
+    return mismatches
+
+def fixture_cases():
+    """Every (name, lat, lon, day, method, asr_method) fixture"""
+    for name, lat, lon in FIXTURE_LOCATIONS:
+        for day in FIXTURE_DATES:
+            for method in METHODS:
+                for asr_method in ASR_FACTORS:
+                    yield name, lat, lon, day, method, asr_method
+
+def fixture_label(name, day, method, asr_method):
+    return f"{name} {day} {method}/{asr_method}"
+
+def load_fixtures(path=FIXTURE_FILE):
+    """Recorded fixtures as a list of dicts (see record())"""
+    with open(path) as f:
+        return json.load(f)['fixtures']
+
+def compare_fixture(fixture):
+    """Compare the engine with one recorded fixture, returning mismatch descriptions"""
+    day = date.fromisoformat(fixture['date'])
+    local = calculate_prayer_times(fixture['latitude'], fixture['longitude'], day,
+                                   fixture['method'], fixture['asr_method'])
+    label = fixture_label(fixture['name'], day, fixture['method'], fixture['asr_method'])
+    return compare_times(label, local, fixture['timings'])
+
+def fetch_fixtures():
+    """Aladhan's timings for every fixture case (network access)"""
+    from app import fetch_prayer_times_aladhan
+
+    for name, lat, lon, day, method, asr_method in fixture_cases():
+        timings = fetch_prayer_times_aladhan(lat, lon, datetime(day.year, day.month, day.day), method, asr_method)
+        yield {
+            'name': name, 'latitude': lat, 'longitude': lon, 'date': day.isoformat(),
+            'method': method, 'asr_method': asr_method,
+            'timings': {prayer: timings[prayer] for prayer in ('fajr', 'sunrise', 'dhuhr', 'asr', 'maghrib', 'isha')},
+        }
+
+def record(path):
+    fixtures = list(fetch_fixtures())
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({'recorded': date.today().isoformat(), 'source': 'api.aladhan.com', 'fixtures': fixtures},
+                  f, indent=1)
+        f.write('\n')
+    print(f"💾 {len(fixtures)} fixtures recorded to {path}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check the local engine against Aladhan')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--record', action='store_true', help='Save Aladhan\'s answers to --fixtures')
+    mode.add_argument('--offline', action='store_true', help='Compare with --fixtures instead of the live API')
+    parser.add_argument('--fixtures', default=FIXTURE_FILE)
+    args = parser.parse_args(argv)
+
+    if args.record:
+        record(args.fixtures)
+        return 0
+
+    fixtures = load_fixtures(args.fixtures) if args.offline else fetch_fixtures()
+    mismatches = []
+    checked = 0
+    for fixture in fixtures:
+        mismatches.extend(compare_fixture(fixture))
+        checked += 1
+
+    for line in mismatches:
+        print(line)
+    print(f"{checked} fixtures checked, {len(mismatches)} mismatches")
+    return 1 if mismatches else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,90 @@
+# scripts/grid_error.py - Measure the error of grid-served prayer times (GRID_MODE)
+#
+# Usage: python -m scripts.grid_error [--cell-km 2 5] [--points 200] [--year 2026]
+#
+# For random locations in each latitude band, computes every day of a year
+# at the exact location and as GRID_MODE=snap / interpolate would serve it,
+# with the local engine, and reports per method the largest difference and
+# the share of prayer times that differ at all (times are whole minutes, so
+# a difference of 1 can come from rounding alone). The same UTC offset is
+# used for all points, as the grid only serves from cells in the
+# location's own timezone.
+import argparse
+import random
+import sys
+from datetime import date
+
+from utils.grid import blend, cell_centre, cell_corners
+from utils.prayer_calc import METHODS, PRAYER_NAMES
+from utils.responses import time_to_minutes
+from utils.timetable import calculate_timetable
+
+LAT_BANDS = ((0, 45), (45, 55), (55, 65))
+
+def _diff(a, b):
+    diff = abs(time_to_minutes(a) - time_to_minutes(b))
+    return min(diff, 1440 - diff)
+
+def _timetable(lat, lon, start, days, method, offsets):
+    return calculate_timetable(lat, lon, start, days, method, 'standard', offsets)
+
+def measure(points, start, days, method, cell_km):
+    """
+    Returns:
+        {mode: (max error in minutes, share of times off by any minute)}, or
+        None for modes whose every point was undefined (polar day/night)
+    """
+    errors = {'snap': [0, 0, 0], 'interpolate': [0, 0, 0]}
+    for lat, lon in points:
+        offsets = [round(lon / 15)] * days
+        try:
+            exact = _timetable(lat, lon, start, days, method, offsets)
+            snapped = _timetable(*cell_centre(lat, lon, cell_km), start, days, method, offsets)
+            corners = cell_corners(lat, lon, cell_km)
+            corner_tables = [_timetable(c_lat, c_lon, start, days, method, offsets) for c_lat, c_lon, _ in corners]
+        except ValueError:
+            continue
+        weights = [weight for _, _, weight in corners]
+        for day in range(days):
+            served = {
+                'snap': snapped[day],
+                'interpolate': blend([table[day] for table in corner_tables], weights),
+            }
+            for mode, times in served.items():
+                stats = errors[mode]
+                for name in PRAYER_NAMES:
+                    diff = _diff(times[name], exact[day][name])
+                    stats[0] = max(stats[0], diff)
+                    stats[1] += diff > 0
+                    stats[2] += 1
+    return {mode: (worst, off / total if total else None) for mode, (worst, off, total) in errors.items()}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Error of grid-served prayer times per method')
+    parser.add_argument('--cell-km', type=float, nargs='+', default=[2.0])
+    parser.add_argument('--points', type=int, default=200, help='Random locations per latitude band')
+    parser.add_argument('--year', type=int, default=2026)
+    parser.add_argument('--methods', nargs='+', default=sorted(METHODS), choices=sorted(METHODS))
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    start = date(args.year, 1, 1)
+    days = (date(args.year + 1, 1, 1) - start).days
+    print(f"{'cell':>6} {'|lat|':>7} {'method':>9}   {'snap max':>8} {'off':>6}   {'interp max':>10} {'off':>6}")
+    for cell_km in args.cell_km:
+        for low, high in LAT_BANDS:
+            rng = random.Random(f'{args.seed}-{low}')
+            points = [(rng.choice((-1, 1)) * rng.uniform(low, high), rng.uniform(-180, 180))
+                      for _ in range(args.points)]
+            for method in args.methods:
+                result = measure(points, start, days, method, cell_km)
+                snap_max, snap_off = result['snap']
+                interp_max, interp_off = result['interpolate']
+                if snap_off is None:
+                    continue
+                print(f"{cell_km:>4g}km {low:>3}-{high:<3} {method:>9}   {snap_max:>6} m {snap_off:>6.1%}   "
+                      f"{interp_max:>8} m {interp_off:>6.1%}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
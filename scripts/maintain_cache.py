@@ -0,0 +1,327 @@
+# scripts/maintain_cache.py - Rolling retention and size budget for prayer_time_cache
+#
+# Usage:
+#   python -m scripts.maintain_cache                 # run daily
+#   python -m scripts.maintain_cache --dry-run
+#   python -m scripts.maintain_cache --retention-months 6 --max-rows 50000000
+#
+# prayer_time_cache is partitioned by month of prayer_date (migration 002).
+# Each run:
+#   1. creates the monthly partitions from the retention cutoff to
+#      --future-months ahead, moving rows for those months out of the
+#      default partition;
+#   2. detaches and drops partitions older than --retention-months before
+#      the current month, and deletes default-partition rows older than that;
+#   3. if the cache holds more than --max-rows rows, deletes whole location
+#      cells, least recently used first (prayer_cache_cells, or when the cell
+#      was first written if it was never looked up since), sparing cells used
+#      in the last --min-idle-days days.
+#
+# DDL waits at most LOCK_TIMEOUT for its locks, so requests never queue long
+# behind it. A partition whose lock isn't granted is retried a few times and
+# then skipped with a warning; the next run picks it up.
+import argparse
+import os
+import sys
+import time
+from datetime import date, datetime
+
+from psycopg import errors, sql
+
+from utils.db import get_connection
+
+PARTITION_PREFIX = 'prayer_time_cache_p'
+
+CACHE_RETENTION_MONTHS = int(os.getenv('CACHE_RETENTION_MONTHS', '12'))
+CACHE_FUTURE_MONTHS = int(os.getenv('CACHE_FUTURE_MONTHS', '24'))
+# Row budget for the whole cache; 0 disables eviction
+CACHE_MAX_ROWS = int(os.getenv('CACHE_MAX_ROWS', '0'))
+CACHE_EVICT_MIN_IDLE_DAYS = int(os.getenv('CACHE_EVICT_MIN_IDLE_DAYS', '30'))
+
+# DDL waits at most this long for locks instead of queueing requests behind it
+LOCK_TIMEOUT = '5s'
+LOCK_RETRIES = 3
+LOCK_RETRY_PAUSE_SECONDS = 2
+EVICT_BATCH_CELLS = 1000
+
+LIST_PARTITIONS = """
+    SELECT c.relname AS name, i.inhdetachpending AS detach_pending
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = 'prayer_time_cache'::regclass
+"""
+
+HAS_DEFAULT_PARTITION = """
+    SELECT partdefid <> 0 AS has_default
+    FROM pg_partitioned_table
+    WHERE partrelid = 'prayer_time_cache'::regclass
+"""
+
+MOVE_FROM_DEFAULT = """
+    WITH moved AS (
+        DELETE FROM prayer_time_cache_default
+        WHERE prayer_date >= %s AND prayer_date < %s
+        RETURNING *
+    )
+    INSERT INTO {} SELECT * FROM moved
+"""
+
+# Planner row estimates of all partitions (refreshed by ANALYZE)
+ESTIMATE_ROWS = """
+    SELECT COALESCE(SUM(c.reltuples), 0)::bigint AS estimate
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = 'prayer_time_cache'::regclass
+      AND c.reltuples > 0
+"""
+
+# Least recently used cells whose rows add up to at least %(excess)s
+SELECT_COLD_CELLS = """
+    WITH cells AS (
+        SELECT lat_key, lon_key, COUNT(*) AS row_count, MIN(created_at)::date AS first_written
+        FROM prayer_time_cache
+        GROUP BY lat_key, lon_key
+    ),
+    usage AS (
+        SELECT c.lat_key, c.lon_key, c.row_count, COALESCE(u.hits, 0) AS hits,
+               COALESCE(u.last_used, c.first_written, DATE '-infinity') AS last_used
+        FROM cells c
+        LEFT JOIN prayer_cache_cells u USING (lat_key, lon_key)
+    ),
+    ranked AS (
+        SELECT lat_key, lon_key, row_count,
+               SUM(row_count) OVER (ORDER BY last_used, hits, lat_key, lon_key) AS running
+        FROM usage
+        WHERE last_used < CURRENT_DATE - %(min_idle_days)s::int
+    )
+    SELECT lat_key, lon_key, row_count
+    FROM ranked
+    WHERE running - row_count < %(excess)s
+"""
+
+DELETE_CELLS = """
+    DELETE FROM {} t
+    USING unnest(%s::int[], %s::int[]) AS k(lat_key, lon_key)
+    WHERE t.lat_key = k.lat_key AND t.lon_key = k.lon_key
+"""
+
+def add_months(month, n):
+    """First day of the month n months after month"""
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(month):
+    return f'{PARTITION_PREFIX}{month:%Y_%m}'
+
+def list_partitions(conn, detach_pending=False):
+    """
+    Monthly partitions as {first day of month: table name}
+    detach_pending=True lists only those a DETACH CONCURRENTLY left half done
+    """
+    partitions = {}
+    for row in conn.execute(LIST_PARTITIONS):
+        name = row['name']
+        if name.startswith(PARTITION_PREFIX) and row['detach_pending'] == detach_pending:
+            partitions[datetime.strptime(name[len(PARTITION_PREFIX):], '%Y_%m').date()] = name
+    return partitions
+
+def with_lock_retries(action, label):
+    """
+    Run action(), retrying when a lock isn't granted within LOCK_TIMEOUT
+
+    Returns:
+        action's result, or None if the lock was never granted (skipped)
+    """
+    for attempt in range(1, LOCK_RETRIES + 1):
+        try:
+            return action()
+        except errors.LockNotAvailable:
+            if attempt == LOCK_RETRIES:
+                print(f"⚠️ {label}: lock not granted after {LOCK_RETRIES} attempts, skipped until the next run")
+                return None
+            time.sleep(LOCK_RETRY_PAUSE_SECONDS)
+
+def create_partition(conn, month):
+    """
+    Create and attach the partition for month
+
+    Rows for that month already in the default partition are moved into the
+    new table first (attaching would fail otherwise). ATTACH takes a SHARE
+    UPDATE EXCLUSIVE lock on prayer_time_cache, which lookups and writes
+    don't conflict with, but also an ACCESS EXCLUSIVE lock on
+    prayer_time_cache_default while it scans it for rows of the new range.
+    Queries that touch the default partition (dates without a partition of
+    their own) wait for that; the scan is short when the default partition
+    only holds stray rows. Locks are held until the transaction commits.
+
+    Returns:
+        Number of rows moved from the default partition
+
+    Raises:
+        psycopg.errors.LockNotAvailable: a lock wasn't granted within LOCK_TIMEOUT
+    """
+    name = sql.Identifier(partition_name(month))
+    upper = add_months(month, 1)
+    with conn.transaction():
+        conn.execute(sql.SQL("CREATE TABLE {} (LIKE prayer_time_cache INCLUDING DEFAULTS)").format(name))
+        moved = conn.execute(sql.SQL(MOVE_FROM_DEFAULT).format(name), (month, upper)).rowcount
+        conn.execute(sql.SQL("ALTER TABLE prayer_time_cache ATTACH PARTITION {} FOR VALUES FROM ({}) TO ({})").format(
+            name, sql.Literal(month.isoformat()), sql.Literal(upper.isoformat())))
+    return moved
+
+def ensure_partitions(conn, first_month, last_month, dry_run=False):
+    """
+    Create the missing monthly partitions from first_month to last_month
+
+    Returns:
+        (partitions created, rows moved out of the default partition)
+    """
+    existing = list_partitions(conn)
+    created = moved = 0
+    month = first_month
+    while month <= last_month:
+        if month not in existing:
+            if dry_run:
+                created += 1
+            else:
+                rows = with_lock_retries(lambda: create_partition(conn, month), partition_name(month))
+                if rows is not None:
+                    moved += rows
+                    created += 1
+        month = add_months(month, 1)
+    return created, moved
+
+def drop_partition(conn, name, concurrently):
+    """
+    Detach a partition, then drop it as a standalone table
+
+    DETACH ... CONCURRENTLY only takes SHARE UPDATE EXCLUSIVE on
+    prayer_time_cache, so lookups and writes carry on. PostgreSQL refuses
+    it while a default partition exists; a plain DETACH then takes ACCESS
+    EXCLUSIVE on prayer_time_cache for a moment, bounded by LOCK_TIMEOUT.
+    The DROP afterwards only locks the detached table. Needs autocommit
+    (CONCURRENTLY can't run in a transaction block).
+
+    Raises:
+        psycopg.errors.LockNotAvailable: a lock wasn't granted within LOCK_TIMEOUT
+    """
+    table = sql.Identifier(name)
+    detach = "ALTER TABLE prayer_time_cache DETACH PARTITION {} CONCURRENTLY" if concurrently else \
+        "ALTER TABLE prayer_time_cache DETACH PARTITION {}"
+    conn.execute(sql.SQL(detach).format(table))
+    conn.execute(sql.SQL("DROP TABLE {}").format(table))
+    return True
+
+def finish_pending_detach(conn, name):
+    """Complete a DETACH ... CONCURRENTLY that was interrupted, then drop the table"""
+    table = sql.Identifier(name)
+    conn.execute(sql.SQL("ALTER TABLE prayer_time_cache DETACH PARTITION {} FINALIZE").format(table))
+    conn.execute(sql.SQL("DROP TABLE {}").format(table))
+    return True
+
+def drop_expired(conn, cutoff, dry_run=False):
+    """
+    Drop partitions of months before cutoff and delete older rows from the
+    default partition and usage counts of cells unused since cutoff
+
+    Returns:
+        (partitions dropped, partitions skipped for locks, default-partition rows deleted)
+    """
+    expired = [name for month, name in sorted(list_partitions(conn).items()) if month < cutoff]
+    if dry_run:
+        row = conn.execute("SELECT COUNT(*) AS n FROM prayer_time_cache_default WHERE prayer_date < %s",
+                           (cutoff,)).fetchone()
+        return len(expired), 0, row['n']
+
+    dropped = skipped = 0
+    for name in list_partitions(conn, detach_pending=True).values():
+        if with_lock_retries(lambda: finish_pending_detach(conn, name), name):
+            dropped += 1
+        else:
+            skipped += 1
+
+    concurrently = not conn.execute(HAS_DEFAULT_PARTITION).fetchone()['has_default']
+    for name in expired:
+        if with_lock_retries(lambda: drop_partition(conn, name, concurrently), name):
+            dropped += 1
+        else:
+            skipped += 1
+
+    deleted = conn.execute("DELETE FROM prayer_time_cache_default WHERE prayer_date < %s", (cutoff,)).rowcount
+    conn.execute("DELETE FROM prayer_cache_cells WHERE last_used < %s", (cutoff,))
+    return dropped, skipped, deleted
+
+def evict_cold_cells(conn, max_rows, min_idle_days, dry_run=False):
+    """
+    Delete the least recently used location cells until the cache fits max_rows
+
+    Returns:
+        (estimated rows before, cells evicted, rows deleted)
+    """
+    conn.execute("ANALYZE prayer_time_cache")
+    estimated = conn.execute(ESTIMATE_ROWS).fetchone()['estimate']
+    if estimated <= max_rows:
+        return estimated, 0, 0
+
+    cells = conn.execute(SELECT_COLD_CELLS, {
+        'excess': estimated - max_rows,
+        'min_idle_days': min_idle_days,
+    }).fetchall()
+    if dry_run:
+        return estimated, len(cells), sum(cell['row_count'] for cell in cells)
+
+    deleted = 0
+    for i in range(0, len(cells), EVICT_BATCH_CELLS):
+        batch = cells[i:i + EVICT_BATCH_CELLS]
+        params = ([cell['lat_key'] for cell in batch], [cell['lon_key'] for cell in batch])
+        with conn.transaction():
+            deleted += conn.execute(sql.SQL(DELETE_CELLS).format(sql.Identifier('prayer_time_cache')),
+                                    params).rowcount
+            conn.execute(sql.SQL(DELETE_CELLS).format(sql.Identifier('prayer_cache_cells')), params)
+    return estimated, len(cells), deleted
+
+def _outcome(action, dry_run):
+    return f'would be {action}' if dry_run else action
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Partition upkeep and size budget for prayer_time_cache')
+    parser.add_argument('--retention-months', type=int, default=CACHE_RETENTION_MONTHS,
+                        help=f'Full months kept before the current one (default {CACHE_RETENTION_MONTHS})')
+    parser.add_argument('--future-months', type=int, default=CACHE_FUTURE_MONTHS,
+                        help=f'Months ahead to create partitions for (default {CACHE_FUTURE_MONTHS})')
+    parser.add_argument('--max-rows', type=int, default=CACHE_MAX_ROWS,
+                        help='Row budget, least used cells are evicted beyond it (default: CACHE_MAX_ROWS, 0 = none)')
+    parser.add_argument('--min-idle-days', type=int, default=CACHE_EVICT_MIN_IDLE_DAYS,
+                        help=f'Never evict cells used within this many days (default {CACHE_EVICT_MIN_IDLE_DAYS})')
+    parser.add_argument('--dry-run', action='store_true', help='Report what would change without changing it')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    current_month = date.today().replace(day=1)
+    cutoff = add_months(current_month, -args.retention_months)
+    started = time.perf_counter()
+
+    with get_connection() as conn:
+        conn.autocommit = True
+        conn.execute(f"SET lock_timeout = '{LOCK_TIMEOUT}'")
+
+        created, moved = ensure_partitions(conn, cutoff, add_months(current_month, args.future_months), args.dry_run)
+        print(f"🗂️ {created} partitions {_outcome('created', args.dry_run)}, {moved} rows moved from the default partition")
+
+        dropped, skipped, deleted = drop_expired(conn, cutoff, args.dry_run)
+        print(f"🧹 {dropped} partitions before {cutoff} {_outcome('dropped', args.dry_run)}, {deleted} old default-partition rows"
+              + (f", {skipped} skipped (locks)" if skipped else ''))
+
+        if args.max_rows:
+            estimated, cells, rows = evict_cold_cells(conn, args.max_rows, args.min_idle_days, args.dry_run)
+            print(f"📏 ~{estimated} rows for a budget of {args.max_rows}: "
+                  f"{cells} cells ({rows} rows) {_outcome('evicted', args.dry_run)}")
+            if estimated - rows > args.max_rows:
+                print(f"⚠️ Still over budget: every other cell was used in the last {args.min_idle_days} days")
+
+    print(f"✅ Done in {time.perf_counter() - started:.1f}s")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,227 @@
+# scripts/prewarm_cache.py - Fill prayer_time_cache ahead of peak days
+#
+# Usage:
+#   python -m scripts.prewarm_cache --days 365
+#   python -m scripts.prewarm_cache --sources cities --methods ISNA MWL --asr standard
+#   python -m scripts.prewarm_cache --restart       # ignore the checkpoint
+#
+# Collects locations from user_locations, mosques and a city list (deduplicated
+# by location key), computes their timetables with the local engine in a
+# process pool and COPYs the rows into prayer_time_cache through a staging
+# table. Every committed location is appended to a checkpoint file, so an
+# interrupted run picks up where it stopped when started again with the
+# same arguments.
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from functools import partial
+
+from utils.db import get_connection
+from utils.geo import LOCATION_KEY_SCALE, location_key
+from utils.prayer_calc import ASR_FACTORS, METHODS
+
+DEFAULT_CITIES_FILE = os.path.join(os.path.dirname(__file__), 'prewarm_cities.csv')
+DEFAULT_CHECKPOINT = '.prewarm_checkpoint'
+
+SOURCE_QUERIES = {
+    'user_locations': "SELECT DISTINCT latitude, longitude FROM user_locations",
+    'mosques': "SELECT DISTINCT latitude, longitude FROM mosques",
+}
+
+CACHE_COLUMNS = (
+    'lat_key', 'lon_key', 'latitude', 'longitude', 'calculation_method', 'asr_method', 'prayer_date',
+    'fajr_time', 'sunrise_time', 'dhuhr_time', 'asr_time', 'maghrib_time', 'isha_time',
+)
+
+CREATE_STAGING = """
+    CREATE TEMP TABLE prewarm_staging (
+        lat_key INTEGER, lon_key INTEGER, latitude DECIMAL(10, 8), longitude DECIMAL(11, 8),
+        calculation_method VARCHAR(50), asr_method VARCHAR(20), prayer_date DATE,
+        fajr_time TIME, sunrise_time TIME, dhuhr_time TIME, asr_time TIME,
+        maghrib_time TIME, isha_time TIME
+    ) ON COMMIT DELETE ROWS
+"""
+
+COPY_STAGING = f"COPY prewarm_staging ({', '.join(CACHE_COLUMNS)}) FROM STDIN"
+
+MERGE_STAGING = f"""
+    INSERT INTO prayer_time_cache ({', '.join(CACHE_COLUMNS)})
+    SELECT {', '.join(CACHE_COLUMNS)} FROM prewarm_staging
+    ON CONFLICT (lat_key, lon_key, calculation_method, asr_method, prayer_date)
+    DO UPDATE SET
+        fajr_time = EXCLUDED.fajr_time,
+        sunrise_time = EXCLUDED.sunrise_time,
+        dhuhr_time = EXCLUDED.dhuhr_time,
+        asr_time = EXCLUDED.asr_time,
+        maghrib_time = EXCLUDED.maghrib_time,
+        isha_time = EXCLUDED.isha_time
+"""
+
+def load_cities(path):
+    """Read (latitude, longitude) pairs from a CSV with latitude and longitude columns"""
+    with open(path, newline='') as f:
+        return [(float(row['latitude']), float(row['longitude'])) for row in csv.DictReader(f)]
+
+def collect_locations(sources, cities_file):
+    """Distinct location keys from all sources, in a stable order"""
+    coords = []
+    db_sources = [source for source in sources if source in SOURCE_QUERIES]
+    if db_sources:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                for source in db_sources:
+                    cur.execute(SOURCE_QUERIES[source])
+                    rows = cur.fetchall()
+                    print(f"📍 {source}: {len(rows)} locations")
+                    coords.extend((float(row['latitude']), float(row['longitude'])) for row in rows)
+    if 'cities' in sources:
+        cities = load_cities(cities_file)
+        print(f"📍 cities: {len(cities)} locations")
+        coords.extend(cities)
+
+    return sorted({location_key(lat, lon) for lat, lon in coords})
+
+def compute_location_rows(key, start_date, num_days, methods, asr_methods):
+    """
+    Compute cache rows for one location (runs in a worker process)
+
+    Returns:
+        (key, rows, skipped): COPY rows for every method/Asr school, and how
+        many method/school combinations were undefined (polar day/night)
+    """
+    from utils.timetable import calculate_timetable
+    from utils.timezones import utc_offsets_hours
+
+    lat_key, lon_key = key
+    lat, lon = lat_key / LOCATION_KEY_SCALE, lon_key / LOCATION_KEY_SCALE
+    tz_offsets = utc_offsets_hours(lat, lon, start_date, num_days)
+    dates = [start_date + timedelta(days=i) for i in range(num_days)]
+
+    rows = []
+    skipped = 0
+    for method in methods:
+        for asr_method in asr_methods:
+            try:
+                timetable = calculate_timetable(lat, lon, start_date, num_days, method, asr_method, tz_offsets)
+            except ValueError:
+                skipped += 1
+                continue
+            for day, times in zip(dates, timetable):
+                rows.append((
+                    lat_key, lon_key, lat, lon, method, asr_method, day,
+                    times['fajr'], times['sunrise'], times['dhuhr'],
+                    times['asr'], times['maghrib'], times['isha']
+                ))
+    return key, rows, skipped
+
+class Checkpoint:
+    """Append-only record of finished locations, tied to the run's parameters"""
+
+    def __init__(self, path, params, restart=False):
+        self.path = path
+        self.done = set()
+        header = json.dumps(params, sort_keys=True)
+        if not restart and os.path.exists(path):
+            with open(path) as f:
+                if f.readline().rstrip('\n') == header:
+                    for line in f:
+                        lat_key, lon_key = line.split(',')
+                        self.done.add((int(lat_key), int(lon_key)))
+                else:
+                    print("⚠️ Checkpoint is for different arguments, starting over")
+        if not self.done:
+            with open(path, 'w') as f:
+                f.write(header + '\n')
+
+    def mark(self, keys):
+        with open(self.path, 'a') as f:
+            f.writelines(f'{lat_key},{lon_key}\n' for lat_key, lon_key in keys)
+            f.flush()
+            os.fsync(f.fileno())
+
+def flush(conn, rows):
+    """COPY rows into the staging table and merge them into prayer_time_cache in one transaction"""
+    with conn.transaction():
+        with conn.cursor() as cur:
+            with cur.copy(COPY_STAGING) as copy:
+                for row in rows:
+                    copy.write_row(row)
+            cur.execute(MERGE_STAGING)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Pre-compute prayer_time_cache for popular locations')
+    parser.add_argument('--start', type=lambda s: datetime.strptime(s, '%Y-%m-%d').date(),
+                        default=date.today(), help='First date (YYYY-MM-DD, default today)')
+    parser.add_argument('--days', type=int, default=365, help='Number of days to fill (default 365)')
+    parser.add_argument('--sources', nargs='+', default=['user_locations', 'mosques', 'cities'],
+                        choices=['user_locations', 'mosques', 'cities'])
+    parser.add_argument('--cities-file', default=DEFAULT_CITIES_FILE,
+                        help='CSV with latitude and longitude columns')
+    parser.add_argument('--methods', nargs='+', default=sorted(METHODS), choices=sorted(METHODS))
+    parser.add_argument('--asr', nargs='+', default=sorted(ASR_FACTORS), choices=sorted(ASR_FACTORS))
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Worker processes')
+    parser.add_argument('--batch-rows', type=int, default=50000, help='Rows per COPY/commit')
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT, help='Checkpoint file for resuming')
+    parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    params = {
+        'start': args.start.isoformat(),
+        'days': args.days,
+        'sources': sorted(args.sources),
+        'methods': sorted(args.methods),
+        'asr': sorted(args.asr),
+    }
+
+    locations = collect_locations(args.sources, args.cities_file)
+    checkpoint = Checkpoint(args.checkpoint, params, restart=args.restart)
+    pending = [key for key in locations if key not in checkpoint.done]
+    print(f"🗓️ {args.days} days from {args.start}, {len(args.methods)} methods x {len(args.asr)} Asr schools")
+    print(f"📦 {len(pending)} of {len(locations)} locations to fill ({len(checkpoint.done)} done earlier)")
+    if not pending:
+        return 0
+
+    compute = partial(compute_location_rows, start_date=args.start, num_days=args.days,
+                      methods=args.methods, asr_methods=args.asr)
+    started = time.perf_counter()
+    total_rows = 0
+    total_skipped = 0
+    done = len(locations) - len(pending)
+    batch_rows = []
+    batch_keys = []
+
+    with get_connection() as conn:
+        conn.autocommit = True
+        conn.execute(CREATE_STAGING)
+
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            for i, (key, rows, skipped) in enumerate(pool.map(compute, pending, chunksize=8), start=1):
+                total_skipped += skipped
+                batch_rows.extend(rows)
+                batch_keys.append(key)
+                if len(batch_rows) < args.batch_rows and i < len(pending):
+                    continue
+
+                flush(conn, batch_rows)
+                checkpoint.mark(batch_keys)
+                total_rows += len(batch_rows)
+                done += len(batch_keys)
+                batch_rows, batch_keys = [], []
+                rate = total_rows / (time.perf_counter() - started)
+                print(f"💾 {done}/{len(locations)} locations, {total_rows} rows, {rate:,.0f} rows/s")
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ {total_rows} rows for {len(pending)} locations in {elapsed:.1f}s ({total_rows / elapsed:,.0f} rows/s)")
+    if total_skipped:
+        print(f"⚠️ {total_skipped} location/method combinations skipped (sun never reaches the angle)")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,133 @@
+# scripts/stub_aladhan.py - Local stand-in for api.aladhan.com
+#
+# Serves /v1/timings/DD-MM-YYYY and /v1/calendar/YYYY/MM in Aladhan's
+# response shape, computed with the local engine, with optional latency
+# and injected failures.
+#
+# Usage:
+#   python -m scripts.stub_aladhan --port 8081 --latency-ms 50 --fail-rate 0.1
+#   ALADHAN_BASE_URL=http://127.0.0.1:8081/v1 python app.py
+#
+# tests/test_aladhan_client.py runs utils.aladhan against it.
+import argparse
+import calendar
+import json
+import random
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from utils.aladhan import METHOD_CODES, TIMING_NAMES
+from utils.prayer_calc import calculate_prayer_times
+
+METHOD_NAMES = {code: name for name, code in METHOD_CODES.items()}
+
+class StubAladhanHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        # One handler per connection, however many requests it carries
+        super().setup()
+        with self.server.stats_lock:
+            self.server.connections += 1
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _timings(self, day, lat, lon, method, asr_method, tz_suffix=''):
+        times = calculate_prayer_times(lat, lon, day, method, asr_method)
+        return {
+            'timings': {key: times[name] + tz_suffix for key, name in TIMING_NAMES.items()},
+            'date': {'gregorian': {'date': day.strftime('%d-%m-%Y')}},
+        }
+
+    def do_GET(self):
+        server = self.server
+        with server.stats_lock:
+            server.requests += 1
+            fail = server.fail_next > 0 or (server.fail_rate and random.random() < server.fail_rate)
+            if fail:
+                server.failures += 1
+                server.fail_next = max(0, server.fail_next - 1)
+        if server.latency:
+            time.sleep(server.latency)
+        if fail:
+            self._send(503, {'code': 503, 'status': 'Service Unavailable'})
+            return
+
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        parts = url.path.strip('/').split('/')
+        try:
+            lat = float(query['latitude'][0])
+            lon = float(query['longitude'][0])
+            method = METHOD_NAMES.get(int(query.get('method', ['2'])[0]), 'ISNA')
+            asr_method = 'hanafi' if query.get('school', ['0'])[0] == '1' else 'standard'
+
+            if len(parts) == 3 and parts[:2] == ['v1', 'timings']:
+                d, m, y = (int(p) for p in parts[2].split('-'))
+                data = self._timings(date(y, m, d), lat, lon, method, asr_method)
+            elif len(parts) == 4 and parts[:2] == ['v1', 'calendar']:
+                y, m = int(parts[2]), int(parts[3])
+                data = [
+                    self._timings(date(y, m, d), lat, lon, method, asr_method, ' (STUB)')
+                    for d in range(1, calendar.monthrange(y, m)[1] + 1)
+                ]
+            else:
+                self._send(404, {'code': 404, 'status': 'Not Found', 'data': 'Unknown endpoint'})
+                return
+        except (KeyError, ValueError) as e:
+            self._send(400, {'code': 400, 'status': 'Bad Request', 'data': str(e)})
+            return
+
+        self._send(200, {'code': 200, 'status': 'OK', 'data': data})
+
+def start_stub_server(host='127.0.0.1', port=0, latency_ms=0, fail_rate=0.0):
+    """
+    Start the stub in a background thread
+
+    Returns:
+        The server; its base URL is http://host:server.server_port/v1.
+        Its requests, connections and failures attributes count what it
+        served, and setting fail_next makes that many next requests fail.
+    """
+    server = ThreadingHTTPServer((host, port), StubAladhanHandler)
+    server.daemon_threads = True
+    server.latency = latency_ms / 1000
+    server.fail_rate = fail_rate
+    server.requests = 0
+    server.connections = 0
+    server.failures = 0
+    server.fail_next = 0
+    server.stats_lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in for api.aladhan.com')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency-ms', type=float, default=0, help='Delay added to every response')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='Fraction of requests answered with 503')
+    args = parser.parse_args()
+
+    server = start_stub_server(args.host, args.port, args.latency_ms, args.fail_rate)
+    print(f'🌐 Stub Aladhan API on http://{args.host}:{server.server_port}/v1')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+from datetime import date
+
+import pytest
+
+from scripts.stub_aladhan import start_stub_server
+from utils import aladhan
+from utils.circuit_breaker import CircuitBreaker
+from utils.prayer_calc import calculate_prayer_times
+
+NEW_YORK = (40.7128, -74.0060)
+DAY = date(2026, 3, 8)
+
+@pytest.fixture(scope='module')
+def server():
+    server = start_stub_server()
+    yield server
+    server.shutdown()
+
+@pytest.fixture
+def stub(server, monkeypatch):
+    """The stub with its counters reset, and utils.aladhan pointed at it with a fresh session and breaker"""
+    with server.stats_lock:
+        server.requests = server.connections = server.failures = server.fail_next = 0
+        server.fail_rate = 0.0
+    monkeypatch.setattr(aladhan, 'ALADHAN_BASE_URL', f'http://127.0.0.1:{server.server_port}/v1')
+    monkeypatch.setattr(aladhan, 'ALADHAN_BACKOFF', 0.001)
+    monkeypatch.setattr(aladhan, 'ALADHAN_RETRIES', 3)
+    monkeypatch.setattr(aladhan, '_session', None)
+    monkeypatch.setattr(aladhan, 'breaker', CircuitBreaker(
+        'stub', failure_threshold=2, reset_timeout=60, failure_exceptions=(aladhan.AladhanUnavailable,)))
+    yield server
+    aladhan.get_session().close()
+
+def test_fetch_day_matches_the_engine(stub):
+    assert aladhan.fetch_day(*NEW_YORK, DAY) == calculate_prayer_times(*NEW_YORK, DAY)
+
+def test_requests_reuse_one_keep_alive_connection(stub):
+    for day in range(1, 6):
+        aladhan.fetch_day(*NEW_YORK, date(2026, 3, day))
+    assert stub.requests == 5
+    assert stub.connections == 1
+
+def test_fetch_dates_makes_one_request_per_month(stub):
+    dates = [date(2026, month, day) for month in range(1, 13) for day in (1, 15, 28)]
+    fetched = aladhan.fetch_dates(*NEW_YORK, dates, 'KARACHI')
+    assert all(fetched[d] == calculate_prayer_times(*NEW_YORK, d, 'KARACHI') for d in dates)
+    assert stub.requests == 12
+    assert stub.connections <= aladhan.ALADHAN_MAX_CONCURRENCY
+
+def test_failed_requests_are_retried_on_the_same_connection(stub):
+    stub.fail_next = 2
+    assert aladhan.fetch_day(*NEW_YORK, DAY) == calculate_prayer_times(*NEW_YORK, DAY)
+    assert stub.requests == 3
+    assert stub.connections == 1
+
+def test_gives_up_after_the_last_retry(stub):
+    stub.fail_rate = 1.0
+    with pytest.raises(aladhan.AladhanUnavailable):
+        aladhan.fetch_day(*NEW_YORK, DAY)
+    assert stub.requests == aladhan.ALADHAN_RETRIES + 1
+
+def test_rejected_requests_are_not_retried(stub):
+    with pytest.raises(aladhan.AladhanError) as error:
+        aladhan._get_json('unknown', {'latitude': 0, 'longitude': 0})
+    assert not isinstance(error.value, aladhan.AladhanUnavailable)
+    assert stub.requests == 1
+
+def test_open_circuit_sends_no_request(stub):
+    stub.fail_rate = 1.0
+    for _ in range(2):
+        with pytest.raises(aladhan.AladhanUnavailable):
+            aladhan.fetch_day(*NEW_YORK, DAY)
+    requests = stub.requests
+    with pytest.raises(aladhan.CircuitOpenError):
+        aladhan.fetch_day(*NEW_YORK, DAY)
+    assert stub.requests == requests
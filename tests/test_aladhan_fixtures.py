@@ -0,0 +1,23 @@
+import os
+
+import pytest
+
+from scripts.compare_aladhan import FIXTURE_FILE, compare_fixture, fixture_cases, load_fixtures
+
+pytestmark = pytest.mark.skipif(
+    not os.path.exists(FIXTURE_FILE),
+    reason='no recorded Aladhan fixtures; run python -m scripts.compare_aladhan --record')
+
+@pytest.fixture(scope='module')
+def fixtures():
+    return load_fixtures()
+
+def test_fixtures_cover_every_case(fixtures):
+    recorded = {(f['name'], f['date'], f['method'], f['asr_method']) for f in fixtures}
+    expected = {(name, day.isoformat(), method, asr_method)
+                for name, _, _, day, method, asr_method in fixture_cases()}
+    assert expected <= recorded
+
+def test_engine_matches_aladhan_to_the_minute(fixtures):
+    mismatches = [line for fixture in fixtures for line in compare_fixture(fixture)]
+    assert not mismatches, '\n'.join(mismatches)
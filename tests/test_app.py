@@ -0,0 +1,130 @@
+from datetime import datetime
+
+import pytest
+
+import app as app_module
+from utils import aladhan, grid, http_cache, metrics
+from utils.hijri import RamadanCalendar
+
+SVALBARD = (78.2232, 15.6267)
+LONDON = (51.5074, -0.1278)
+ALADHAN_TIMES = {'fajr': '00:00', 'sunrise': '00:00', 'dhuhr': '12:59', 'asr': '16:58', 'maghrib': '23:59', 'isha': '23:59'}
+
+@pytest.fixture
+def client(monkeypatch):
+    # No database: every lookup misses and writes are dropped
+    monkeypatch.setattr(app_module, 'get_cached_prayer_times', lambda *args: None)
+    monkeypatch.setattr(app_module, 'get_cached_prayer_times_range', lambda lat, lon, dates, *args: ({}, list(dates)))
+    monkeypatch.setattr(app_module, 'cache_prayer_times', lambda *args, **kwargs: None)
+    return app_module.app.test_client()
+
+def test_polar_day_is_asked_from_aladhan(client, monkeypatch):
+    asked = []
+    monkeypatch.setattr(aladhan, 'fetch_day', lambda lat, lon, day, *args: asked.append(day) or ALADHAN_TIMES)
+
+    response = client.post('/api/prayer-times', json={
+        'latitude': SVALBARD[0], 'longitude': SVALBARD[1], 'date': '2026-06-21'})
+    assert response.status_code == 200
+    assert response.get_json()['times'] == ALADHAN_TIMES
+    assert asked == [datetime(2026, 6, 21)]
+
+def test_polar_month_is_asked_from_aladhan(client, monkeypatch):
+    monkeypatch.setattr(aladhan, 'fetch_dates', lambda lat, lon, dates, *args: {d: ALADHAN_TIMES for d in dates})
+
+    response = client.post('/api/monthly-prayers', json={
+        'latitude': SVALBARD[0], 'longitude': SVALBARD[1], 'year': 2026, 'month': 6})
+    assert response.status_code == 200
+    prayers = response.get_json()['prayers']
+    assert len(prayers) == 30 and all(day['times'] == ALADHAN_TIMES for day in prayers)
+
+def test_polar_day_without_upstream_is_a_503(client, monkeypatch):
+    def unavailable(*args):
+        raise aladhan.AladhanUnavailable('down')
+    monkeypatch.setattr(aladhan, 'fetch_day', unavailable)
+    monkeypatch.setattr(app_module, 'get_approximate_prayer_times', lambda *args: {})
+
+    response = client.post('/api/prayer-times', json={
+        'latitude': SVALBARD[0], 'longitude': SVALBARD[1], 'date': '2026-06-22'})
+    assert response.status_code == 503
+
+@pytest.fixture
+def cache_reads(monkeypatch):
+    reads = []
+    def read(lat, lon, first, last, *args):
+        reads.append((first, last))
+        return []
+    monkeypatch.setattr(app_module, 'get_cached_prayer_times_between', read)
+    return reads
+
+def test_export_reads_and_computes_a_chunk_at_a_time(client, cache_reads):
+    response = client.get(f'/api/prayer-times/export?lat={LONDON[0]}&lng={LONDON[1]}'
+                          '&start=2026-01-01&end=2026-04-10', buffered=False)
+    assert response.status_code == 200
+    assert len(cache_reads) == 1  # only the first chunk before the response starts
+
+    rows = response.get_data(as_text=True).splitlines()
+    assert len(rows) == 1 + 100
+    assert len(cache_reads) == 4
+    assert all((last - first).days < 31 for first, last in cache_reads)
+
+def test_export_upstream_failure_before_start_is_a_503(client, cache_reads, monkeypatch):
+    def unavailable(*args):
+        raise aladhan.AladhanUnavailable('down')
+    monkeypatch.setattr(app_module.Config, 'PRAYER_TIMES_SOURCE', 'aladhan')
+    monkeypatch.setattr(aladhan, 'fetch_dates', unavailable)
+
+    response = client.get(f'/api/prayer-times/export?lat={LONDON[0]}&lng={LONDON[1]}&year=2026')
+    assert response.status_code == 503
+
+def test_export_upstream_failure_after_start_finishes_locally(client, cache_reads, monkeypatch):
+    def first_chunk_only(lat, lon, dates, *args):
+        if len(cache_reads) > 1:
+            raise aladhan.AladhanUnavailable('down')
+        return app_module.calculate_dates_locally(lat, lon, dates)
+    monkeypatch.setattr(app_module.Config, 'PRAYER_TIMES_SOURCE', 'aladhan')
+    monkeypatch.setattr(aladhan, 'fetch_dates', first_chunk_only)
+
+    response = client.get(f'/api/prayer-times/export?lat={LONDON[0]}&lng={LONDON[1]}&year=2026')
+    assert response.status_code == 200
+    rows = response.get_data(as_text=True).splitlines()
+    assert len(rows) == 1 + 365 and rows[-1].startswith('2026-12-31,')
+
+def test_export_leaves_polar_days_blank(client, cache_reads):
+    response = client.get(f'/api/prayer-times/export?lat={SVALBARD[0]}&lng={SVALBARD[1]}'
+                          '&start=2026-06-20&end=2026-06-21')
+    assert response.get_data(as_text=True).splitlines()[1:] == ['2026-06-20,,,,,,', '2026-06-21,,,,,,']
+
+def test_non_canonical_get_is_a_short_lived_301(client):
+    response = client.get('/api/prayer-times?lng=-0.12781&lat=51.50741&date=2026-03-01')
+    assert response.status_code == 301
+    assert response.headers['Cache-Control'] == f'public, max-age={http_cache.HTTP_CACHE_REDIRECT_MAX_AGE}'
+
+def test_snapped_redirect_is_private(client, monkeypatch):
+    monkeypatch.setattr(grid, 'GRID_MODE', 'snap')
+    response = client.get(f'/api/prayer-times?lat={LONDON[0]:.4f}&lng={LONDON[1]:.4f}'
+                          '&date=2026-03-01&method=ISNA&asr_method=standard')
+    assert response.status_code == 302
+    assert response.headers['Cache-Control'].startswith('private,')
+
+def test_ramadan_by_hijri_year_reaches_the_second_ramadan_of_2030(client, monkeypatch):
+    calendar = RamadanCalendar()
+    calendar.load([])
+    monkeypatch.setattr(app_module, 'ramadan_calendar', calendar)
+
+    response = client.post('/api/ramadan', json={'latitude': LONDON[0], 'longitude': LONDON[1], 'hijri_year': 1452})
+    body = response.get_json()
+    assert (body['year'], body['hijri_year'], body['start_date']) == (2030, 1452, '2030-12-26')
+
+    response = client.post('/api/ramadan', json={'latitude': LONDON[0], 'longitude': LONDON[1], 'year': 2030})
+    assert response.get_json()['hijri_year'] == 1451
+
+def test_unhandled_exception_is_counted_as_a_500(client, monkeypatch):
+    def broken():
+        raise RuntimeError('bug')
+    monkeypatch.setitem(app_module.app.view_functions, 'get_qibla', broken)
+    monkeypatch.setitem(app_module.app.config, 'PROPAGATE_EXCEPTIONS', True)
+    before = metrics.REQUESTS.value('/api/qibla', 'POST', '500')
+
+    with pytest.raises(RuntimeError):
+        client.post('/api/qibla', json={})
+    assert metrics.REQUESTS.value('/api/qibla', 'POST', '500') == before + 1
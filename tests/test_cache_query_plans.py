@@ -0,0 +1,74 @@
+# EXPLAIN checks for the prayer_time_cache queries, against the database in
+# DATABASE_URL (skipped without one). Sequential and bitmap scans are
+# disabled, so a lookup only passes if idx_prayer_time_cache_key can serve
+# its predicate with an index scan (the planner may still prefer a seq scan
+# on a tiny table). Lookups must also be pruned to a single monthly partition.
+import os
+
+import pytest
+
+from utils.prayer_cache import SELECT_CACHED_DAY, SELECT_CACHED_RANGE, UPSERT_CACHED_DAY, UPSERT_CACHED_ROWS
+
+pytestmark = pytest.mark.skipif(not os.getenv('DATABASE_URL'), reason='DATABASE_URL is not set')
+
+INDEX_NAME = 'idx_prayer_time_cache_key'
+INDEX_SCANS = ('Index Scan', 'Index Only Scan')
+
+SAMPLE_KEY = (407128, -740060, 'ISNA', 'standard')
+SAMPLE_ROW = SAMPLE_KEY[:2] + (40.7128, -74.006) + SAMPLE_KEY[2:] + ('2026-03-01',) + (
+    '05:00', '06:30', '12:00', '15:30', '18:00', '19:30')
+
+# Partition indexes attached to INDEX_NAME
+PARTITION_INDEXES = """
+    SELECT c.relname AS name
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = %s::regclass
+"""
+
+@pytest.fixture(scope='module')
+def cursor():
+    import psycopg
+    from psycopg.rows import dict_row
+
+    with psycopg.connect(os.environ['DATABASE_URL'], row_factory=dict_row) as conn:
+        with conn.cursor() as cur:
+            cur.execute("SET enable_seqscan = off")
+            cur.execute("SET enable_bitmapscan = off")
+            yield cur
+        conn.rollback()
+
+@pytest.fixture(scope='module')
+def index_names(cursor):
+    cursor.execute(PARTITION_INDEXES, (INDEX_NAME,))
+    return {INDEX_NAME} | {row['name'] for row in cursor.fetchall()}
+
+def explain(cursor, query, params):
+    # Plain EXPLAIN only plans the statement, the upserts write nothing
+    cursor.execute("EXPLAIN (FORMAT JSON) " + query, params)
+    return list(_walk(cursor.fetchone()['QUERY PLAN'][0]['Plan']))
+
+def _walk(plan):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from _walk(child)
+
+@pytest.mark.parametrize('query, params', [
+    (SELECT_CACHED_DAY, SAMPLE_KEY + ('2026-03-01',)),
+    (SELECT_CACHED_RANGE, SAMPLE_KEY + ('2026-03-01', '2026-03-31')),
+], ids=['day', 'month'])
+def test_lookup_is_an_index_scan_on_one_partition(cursor, index_names, query, params):
+    nodes = explain(cursor, query, params)
+    scans = [node for node in nodes if node.get('Relation Name', '').startswith('prayer_time_cache')]
+    assert scans, 'prayer_time_cache not scanned'
+    assert all(node['Node Type'] in INDEX_SCANS and node['Index Name'] in index_names for node in scans), scans
+    assert len({node['Relation Name'] for node in scans}) == 1
+
+@pytest.mark.parametrize('query, params', [
+    (UPSERT_CACHED_DAY, SAMPLE_ROW),
+    (UPSERT_CACHED_ROWS, [[value] for value in SAMPLE_ROW]),
+], ids=['upsert', 'batched upsert'])
+def test_upsert_arbiter_is_the_key_index(cursor, index_names, query, params):
+    nodes = explain(cursor, query, params)
+    arbiters = {name for node in nodes for name in node.get('Conflict Arbiter Indexes', [])}
+    assert arbiters & index_names
@@ -0,0 +1,80 @@
+import threading
+import time
+
+import pytest
+
+from utils.cache_writer import WriteBehindQueue
+
+class Table:
+    """write_rows target that records batches, optionally holding them until released"""
+
+    def __init__(self, hold=False):
+        self.batches = []
+        self.writing = threading.Event()
+        self.release = threading.Event()
+        if not hold:
+            self.release.set()
+
+    def write(self, rows):
+        self.writing.set()
+        assert self.release.wait(5)
+        self.batches.append(list(rows))
+
+    @property
+    def rows(self):
+        return [row for batch in self.batches for row in batch]
+
+@pytest.fixture
+def writers():
+    started = []
+    def make(table, **kwargs):
+        writer = WriteBehindQueue(table.write, name='test-writer', **kwargs)
+        started.append((writer, table))
+        return writer
+    yield make
+    for writer, table in started:
+        table.release.set()
+        writer.close()
+
+def test_close_writes_everything_queued(writers):
+    table = Table()
+    writer = writers(table, batch_size=1000, flush_interval=60)
+    for row in range(250):
+        assert writer.put(row)
+    writer.close()
+    assert table.rows == list(range(250))
+    assert writer.stats()['written'] == 250 and writer.stats()['queued'] == 0
+
+def test_rows_are_written_in_batches(writers):
+    table = Table()
+    writer = writers(table, batch_size=100, flush_interval=60)
+    for row in range(250):
+        writer.put(row)
+    writer.close()
+    assert [len(batch) for batch in table.batches] == [100, 100, 50]
+
+def test_full_queue_drops_without_waiting(writers):
+    table = Table(hold=True)
+    writer = writers(table, max_queue=2, batch_size=1)
+    writer.put('written')
+    assert table.writing.wait(5)  # the writer thread is busy with the first row
+    assert writer.put('queued') and writer.put('queued')
+
+    start = time.perf_counter()
+    assert not writer.put('dropped')
+    assert time.perf_counter() - start < 0.01
+    assert writer.stats()['dropped'] == 1
+
+    table.release.set()
+    writer.close()
+    assert table.rows == ['written', 'queued', 'queued']
+
+def test_failed_batches_are_counted_as_dropped():
+    def broken(rows):
+        raise RuntimeError('database down')
+    writer = WriteBehindQueue(broken, batch_size=10, flush_interval=60)
+    for row in range(5):
+        writer.put(row)
+    writer.close()
+    assert writer.stats()['errors'] == 1
+    assert writer.stats()['dropped'] == 5
@@ -0,0 +1,146 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from utils import circuit_breaker
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+class Down(Exception):
+    pass
+
+class Rejected(Exception):
+    pass
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replace the breaker's clock; advance it with clock.now += seconds"""
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(circuit_breaker, 'time', SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker('dependency', failure_threshold=3, reset_timeout=30, failure_exceptions=(Down,))
+
+def fail():
+    raise Down()
+
+def trip(breaker):
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(Down):
+            breaker.call(fail)
+
+def test_consecutive_failures_open_the_circuit(breaker):
+    for _ in range(breaker.failure_threshold - 1):
+        with pytest.raises(Down):
+            breaker.call(fail)
+    assert breaker.state == 'closed'
+    with pytest.raises(Down):
+        breaker.call(fail)
+    assert breaker.state == 'open'
+    assert breaker.stats()['trips'] == 1
+
+def test_success_resets_the_failure_count(breaker):
+    for _ in range(breaker.failure_threshold - 1):
+        with pytest.raises(Down):
+            breaker.call(fail)
+    breaker.call(lambda: 'ok')
+    with pytest.raises(Down):
+        breaker.call(fail)
+    assert breaker.state == 'closed'
+
+def test_other_exceptions_mean_the_dependency_is_up(breaker):
+    def reject():
+        raise Rejected()
+
+    for _ in range(breaker.failure_threshold + 1):
+        with pytest.raises(Rejected):
+            breaker.call(reject)
+    assert breaker.state == 'closed'
+
+def test_open_circuit_fails_fast_without_calling(breaker):
+    trip(breaker)
+    calls = []
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.call(calls.append, 1)
+    assert calls == []
+    assert error.value.retry_after == pytest.approx(30)
+    assert breaker.stats()['rejected'] == 1
+
+def test_successful_trial_closes_the_circuit(breaker, clock):
+    trip(breaker)
+    clock.now += 30
+    assert breaker.call(lambda: 'ok') == 'ok'
+    assert breaker.state == 'closed'
+    assert breaker.stats()['consecutive_failures'] == 0
+
+def test_failed_trial_opens_the_circuit_again(breaker, clock):
+    trip(breaker)
+    clock.now += 30
+    with pytest.raises(Down):
+        breaker.call(fail)
+    assert breaker.state == 'open'
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: 'ok')
+    assert breaker.stats()['trips'] == 2
+
+def test_only_one_trial_at_a_time(breaker, clock):
+    trip(breaker)
+    clock.now += 30
+
+    def trial():
+        assert breaker.state == 'half_open'
+        with pytest.raises(CircuitOpenError):
+            breaker.call(lambda: 'second trial')
+        return 'ok'
+
+    assert breaker.call(trial) == 'ok'
+    assert breaker.state == 'closed'
+
+def test_interrupted_call_is_not_a_success(breaker):
+    def interrupted():
+        raise KeyboardInterrupt()
+
+    for _ in range(breaker.failure_threshold - 1):
+        with pytest.raises(Down):
+            breaker.call(fail)
+    with pytest.raises(KeyboardInterrupt):
+        breaker.call(interrupted)
+    assert breaker.stats()['consecutive_failures'] == breaker.failure_threshold - 1
+    with pytest.raises(Down):
+        breaker.call(fail)
+    assert breaker.state == 'open'
+
+def test_cancelled_async_call_is_not_a_success(breaker):
+    async def scenario():
+        for _ in range(breaker.failure_threshold - 1):
+            with pytest.raises(Down):
+                await breaker.call_async(_fail_async)
+        call = asyncio.ensure_future(breaker.call_async(asyncio.sleep, 10))
+        await asyncio.sleep(0)
+        call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await call
+        assert breaker.stats()['consecutive_failures'] == breaker.failure_threshold - 1
+
+    asyncio.run(scenario())
+
+def test_cancelled_trial_lets_the_next_call_try(breaker, clock):
+    trip(breaker)
+    clock.now += 30
+
+    async def scenario():
+        trial = asyncio.ensure_future(breaker.call_async(asyncio.sleep, 10))
+        await asyncio.sleep(0)
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+        assert breaker.state == 'half_open'
+        assert await breaker.call_async(asyncio.sleep, 0, 'ok') == 'ok'
+        assert breaker.state == 'closed'
+
+    asyncio.run(scenario())
+
+async def _fail_async():
+    raise Down()
@@ -0,0 +1,82 @@
+from datetime import date
+import threading
+import time
+
+import pytest
+
+from utils import hijri
+from utils.hijri import RamadanCalendar
+
+OVERRIDE = {'hijri_year': 1447, 'gregorian_year': 2026, 'start_date': date(2026, 2, 19), 'end_date': date(2026, 3, 20)}
+
+class OverridesTable:
+    """ramadan_dates as seen by RamadanCalendar.refresh; counts the queries"""
+
+    def __init__(self):
+        self.rows = []
+        self.queries = 0
+        self.delay = 0
+
+    def query(self, sql):
+        self.queries += 1
+        time.sleep(self.delay)
+        return list(self.rows)
+
+@pytest.fixture
+def overrides(monkeypatch):
+    table = OverridesTable()
+    monkeypatch.setattr(hijri, 'execute_query', table.query)
+    return table
+
+def test_computed_dates_follow_umm_al_qura(overrides):
+    calendar = RamadanCalendar()
+    assert calendar.dates(2026) == [(1447, date(2026, 2, 18), date(2026, 3, 19))]
+    assert calendar.hijri_dates(1447) == (date(2026, 2, 18), date(2026, 3, 19))
+
+def test_year_with_two_ramadans_returns_both(overrides):
+    calendar = RamadanCalendar()
+    assert calendar.dates(2030) == [
+        (1451, date(2030, 1, 5), date(2030, 2, 3)),
+        (1452, date(2030, 12, 26), date(2031, 1, 23)),
+    ]
+
+def test_uncovered_years_are_empty(overrides):
+    calendar = RamadanCalendar()
+    assert calendar.dates(1800) == []
+    assert calendar.hijri_dates(1600) is None
+
+def test_overrides_replace_their_hijri_year(overrides):
+    overrides.rows = [OVERRIDE]
+    calendar = RamadanCalendar()
+    assert calendar.dates(2026) == [(1447, date(2026, 2, 19), date(2026, 3, 20))]
+    assert calendar.hijri_dates(1448) == (date(2027, 2, 8), date(2027, 3, 8))
+
+def test_failed_refresh_keeps_the_current_overrides(overrides):
+    overrides.rows = [OVERRIDE]
+    calendar = RamadanCalendar()
+    calendar.refresh()
+    calendar.load(None)
+    assert calendar.hijri_dates(1447) == (date(2026, 2, 19), date(2026, 3, 20))
+
+def test_concurrent_first_lookups_load_once(overrides):
+    overrides.delay = 0.2
+    calendar = RamadanCalendar()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(calendar.dates(2026))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert overrides.queries == 1
+    assert len(results) == 8 and all(result == results[0] for result in results)
+
+def test_stale_overrides_refresh_in_the_background(overrides):
+    calendar = RamadanCalendar(refresh_seconds=0)
+    assert calendar.dates(2026)[0][1] == date(2026, 2, 18)
+    overrides.rows = [OVERRIDE]
+    time.sleep(0.01)
+    calendar.dates(2026)
+    deadline = time.monotonic() + 5
+    while calendar.dates(2026)[0][1] != date(2026, 2, 19) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert calendar.dates(2026)[0][1] == date(2026, 2, 19)
@@ -0,0 +1,50 @@
+import time
+
+import pytest
+
+from utils.memory_cache import LRUCache
+
+@pytest.fixture
+def expires_at():
+    return time.time() + 3600
+
+def test_keeps_at_most_maxsize_entries(expires_at):
+    cache = LRUCache(3)
+    for key in range(10):
+        cache.set(key, key, expires_at)
+    assert cache.stats()['size'] == 3
+    assert cache.evictions == 7
+    assert [cache.get(key) for key in range(7, 10)] == [7, 8, 9]
+
+def test_evicts_least_recently_used_first(expires_at):
+    cache = LRUCache(3)
+    for key in 'abc':
+        cache.set(key, key, expires_at)
+    cache.get('a')
+    cache.set('b', 'b2', expires_at)
+    cache.set('d', 'd', expires_at)
+    assert cache.get('c') is None
+    assert [cache.get(key) for key in 'abd'] == ['a', 'b2', 'd']
+
+def test_expired_entries_are_misses(expires_at):
+    cache = LRUCache(3)
+    cache.set('old', 1, time.time() - 1)
+    cache.set('new', 2, expires_at)
+    assert cache.get('old') is None
+    assert cache.get('new') == 2
+    stats = cache.stats()
+    assert (stats['size'], stats['hits'], stats['misses'], stats['expirations']) == (1, 1, 1, 1)
+
+def test_discard_removes_one_entry(expires_at):
+    cache = LRUCache(3)
+    cache.set('a', 1, expires_at)
+    cache.set('b', 2, expires_at)
+    cache.discard('a')
+    cache.discard('missing')
+    assert cache.get('a') is None
+    assert cache.get('b') == 2
+
+def test_zero_size_disables_the_cache(expires_at):
+    cache = LRUCache(0)
+    cache.set('a', 1, expires_at)
+    assert cache.get('a') is None
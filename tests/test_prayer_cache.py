@@ -0,0 +1,70 @@
+from datetime import date
+
+import pytest
+
+from utils import prayer_cache
+from utils.memory_cache import LRUCache
+
+LONDON = (51.5074, -0.1278)
+DAY = '2026-03-01'
+TIMES = {'fajr': '05:09', 'sunrise': '06:49', 'dhuhr': '12:13', 'asr': '15:04', 'maghrib': '17:38', 'isha': '19:12'}
+NEW_TIMES = dict(TIMES, fajr='05:10')
+
+class Writer:
+    def __init__(self):
+        self.rows = []
+
+    def put(self, row, timeout=None):
+        self.rows.append(row)
+        return True
+
+@pytest.fixture
+def cache(monkeypatch):
+    """A fresh L1, no database (every query misses) and writers that keep what they are given"""
+    queries = []
+    monkeypatch.setattr(prayer_cache, '_l1_cache', LRUCache(100))
+    monkeypatch.setattr(prayer_cache, 'execute_query', lambda query, params, **kwargs: queries.append(params))
+    monkeypatch.setattr(prayer_cache, 'CACHE_WRITE_BEHIND', True)
+    monkeypatch.setattr(prayer_cache, 'cache_writer', Writer())
+    monkeypatch.setattr(prayer_cache, 'cell_usage_writer', Writer())
+    prayer_cache._take_cell_hits()
+    return queries
+
+def test_cached_day_is_served_from_memory(cache):
+    prayer_cache.cache_prayer_times(*LONDON, DAY, 'ISNA', 'standard', TIMES)
+    assert prayer_cache.get_cached_prayer_times(*LONDON, DAY, 'ISNA', 'standard') == TIMES
+    assert cache == []
+    assert len(prayer_cache.cache_writer.rows) == 1
+
+def test_writing_a_day_replaces_it_in_memory(cache):
+    prayer_cache.cache_prayer_times(*LONDON, DAY, 'ISNA', 'standard', TIMES)
+    prayer_cache.cache_prayer_times(*LONDON, DAY, 'ISNA', 'standard', NEW_TIMES)
+    assert prayer_cache.get_cached_prayer_times(*LONDON, DAY, 'ISNA', 'standard') == NEW_TIMES
+
+def test_database_only_write_drops_the_day_from_memory(cache):
+    prayer_cache.cache_prayer_times(*LONDON, DAY, 'ISNA', 'standard', TIMES)
+    prayer_cache.cache_prayer_times(*LONDON, DAY, 'ISNA', 'standard', NEW_TIMES, l1=False)
+    assert prayer_cache.get_cached_prayer_times(*LONDON, DAY, 'ISNA', 'standard') is None
+    assert len(cache) == 1  # went on to the database
+
+def test_range_lookup_only_queries_days_missing_from_memory(cache):
+    prayer_cache.cache_prayer_times(*LONDON, DAY, 'ISNA', 'standard', TIMES)
+    dates = [date(2026, 3, day) for day in (1, 2, 3)]
+    found, missing = prayer_cache.get_cached_prayer_times_range(*LONDON, dates, 'ISNA', 'standard')
+    assert found == {dates[0]: TIMES}
+    assert missing == dates[1:]
+    assert cache[0][-2:] == ('2026-03-02', '2026-03-03')
+
+def test_lookups_are_counted_per_cell_and_handed_off_in_one_batch(cache, monkeypatch):
+    monkeypatch.setattr(prayer_cache, 'CACHE_USAGE_FLUSH_SECONDS', 3600)
+    prayer_cache.cache_prayer_times(*LONDON, DAY, 'ISNA', 'standard', TIMES)
+    for _ in range(5):
+        prayer_cache.get_cached_prayer_times(*LONDON, DAY, 'ISNA', 'standard')
+    prayer_cache.get_cached_prayer_times(0.0, 0.0, DAY, 'ISNA', 'standard')
+    assert prayer_cache.cell_usage_writer.rows == []
+
+    monkeypatch.setattr(prayer_cache, 'CACHE_USAGE_FLUSH_SECONDS', 0)
+    prayer_cache.get_cached_prayer_times(*LONDON, DAY, 'ISNA', 'standard')
+    [hits] = prayer_cache.cell_usage_writer.rows
+    london = prayer_cache.location_key(*LONDON)
+    assert hits == {london: 6, prayer_cache.location_key(0.0, 0.0): 1}
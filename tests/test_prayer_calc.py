@@ -0,0 +1,33 @@
+from datetime import date
+
+import pytest
+
+from utils.prayer_calc import calculate_prayer_times
+from utils.timetable import calculate_timetable
+from utils.timezones import utc_offset_hours, utc_offsets_hours
+
+NEW_YORK = (40.7128, -74.0060)
+LONDON = (51.5074, -0.1278)
+
+# Clocks go forward at 02:00 local, so every prayer of the day is on summer time
+@pytest.mark.parametrize('location, day, method, expected', [
+    (NEW_YORK, date(2026, 3, 8), 'ISNA', {'fajr': '06:04', 'dhuhr': '13:07', 'maghrib': '18:55', 'isha': '20:10'}),
+    (LONDON, date(2026, 3, 29), 'MWL', {'fajr': '04:46', 'dhuhr': '13:05', 'maghrib': '19:29', 'isha': '21:19'}),
+])
+def test_dst_start_day_uses_summer_time(location, day, method, expected):
+    times = calculate_prayer_times(*location, day, method)
+    assert {name: times[name] for name in expected} == expected
+
+def test_dst_end_day_uses_standard_time():
+    assert utc_offset_hours(*NEW_YORK, date(2026, 10, 31)) == -4
+    assert utc_offset_hours(*NEW_YORK, date(2026, 11, 1)) == -5
+    assert calculate_prayer_times(*NEW_YORK, date(2026, 11, 1))['dhuhr'] == '11:40'
+
+def test_timetable_matches_single_days_across_dst_change():
+    start = date(2026, 3, 1)
+    timetable = calculate_timetable(*LONDON, start, 60, 'MWL')
+    offsets = utc_offsets_hours(*LONDON, start, 60)
+    assert offsets[27] == 0 and offsets[28] == 1  # 2026-03-29
+    for i in (27, 28, 29):
+        day = date.fromordinal(start.toordinal() + i)
+        assert timetable[i] == calculate_prayer_times(*LONDON, day, 'MWL')
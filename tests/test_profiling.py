@@ -0,0 +1,51 @@
+from flask import Flask
+import pytest
+
+from utils.profiling import PROFILE_HEADER, RequestProfiler
+
+ADMIN_TOKEN = 'secret'
+
+def make_app(mode):
+    app = Flask(__name__)
+    app.config['PROPAGATE_EXCEPTIONS'] = True
+
+    @app.route('/ok')
+    def ok():
+        return 'ok'
+
+    @app.route('/broken')
+    def broken():
+        raise RuntimeError('bug')
+
+    profiler = RequestProfiler(mode=mode, admin_token=ADMIN_TOKEN, sample_interval=0.001)
+    profiler.init_app(app)
+    return app, profiler
+
+@pytest.mark.parametrize('mode', ['cprofile', 'sample'])
+def test_profile_is_stopped_when_the_view_raises(mode):
+    app, profiler = make_app(mode)
+    client = app.test_client()
+
+    with pytest.raises(RuntimeError):
+        client.get('/broken', headers={PROFILE_HEADER: ADMIN_TOKEN})
+    if mode == 'sample':
+        assert profiler._sampler._threads == {}
+
+    response = client.get('/ok', headers={PROFILE_HEADER: ADMIN_TOKEN})
+    assert response.headers['X-Profile-Id']
+    assert dict(profiler._requests) == {'/broken': 1, '/ok': 1}
+
+@pytest.mark.parametrize('mode', ['cprofile', 'sample'])
+def test_profile_id_looks_up_the_request(mode):
+    app, profiler = make_app(mode)
+    client = app.test_client()
+
+    profile_id = client.get('/ok', headers={PROFILE_HEADER: ADMIN_TOKEN}).headers['X-Profile-Id']
+    response = client.get(f'/admin/profile?id={profile_id}', headers={'Authorization': f'Bearer {ADMIN_TOKEN}'})
+    assert response.status_code == 200
+
+def test_unprofiled_requests_get_no_profile_id():
+    app, profiler = make_app('cprofile')
+    response = app.test_client().get('/ok')
+    assert 'X-Profile-Id' not in response.headers
+    assert not profiler._requests
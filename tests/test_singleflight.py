@@ -0,0 +1,103 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from utils import metrics
+from utils.singleflight import AsyncSingleFlight, SingleFlight, export_metrics
+
+CALLERS = 8
+
+def run_concurrently(flight, key, fn):
+    """Call flight.do(key, fn) from CALLERS threads at once; returns each caller's result or exception"""
+    results = [None] * CALLERS
+    barrier = threading.Barrier(CALLERS)
+
+    def caller(i):
+        barrier.wait()
+        try:
+            results[i] = flight.do(key, fn)
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=caller, args=(i,)) for i in range(CALLERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+def test_concurrent_callers_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        # Hold the call open until every caller has joined it
+        while flight.stats()['coalesced_waiters'] < CALLERS - 1:
+            time.sleep(0.001)
+        return 'times'
+
+    assert run_concurrently(flight, 'key', fn) == ['times'] * CALLERS
+    assert len(calls) == 1
+    assert flight.stats() == {'in_flight': 0, 'executions': 1, 'coalesced_waiters': CALLERS - 1, 'errors': 0}
+
+def test_error_reaches_every_waiter():
+    flight = SingleFlight()
+    error = RuntimeError('upstream down')
+
+    def fn():
+        while flight.stats()['coalesced_waiters'] < CALLERS - 1:
+            time.sleep(0.001)
+        raise error
+
+    assert run_concurrently(flight, 'key', fn) == [error] * CALLERS
+    assert flight.stats()['executions'] == 1 and flight.stats()['errors'] == 1
+
+def test_key_is_released_after_an_exception():
+    flight = SingleFlight()
+
+    def fail():
+        raise RuntimeError('failed')
+
+    with pytest.raises(RuntimeError):
+        flight.do('key', fail)
+    assert flight.stats()['in_flight'] == 0
+    assert flight.do('key', lambda: 'retried') == 'retried'
+    assert flight.stats()['executions'] == 2
+
+def test_different_keys_run_separately():
+    flight = SingleFlight()
+    assert [flight.do(key, lambda key=key: key) for key in ('a', 'b')] == ['a', 'b']
+    assert flight.stats()['executions'] == 2 and flight.stats()['coalesced_waiters'] == 0
+
+def test_async_waiter_survives_cancelled_leader():
+    async def scenario():
+        flight = AsyncSingleFlight()
+        release = asyncio.Event()
+
+        async def fn():
+            await release.wait()
+            return 'times'
+
+        leader = asyncio.ensure_future(flight.do('key', fn))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(flight.do('key', fn))
+        await asyncio.sleep(0)
+        leader.cancel()
+        release.set()
+        assert await waiter == 'times'
+        assert flight.stats() == {'in_flight': 0, 'executions': 1, 'coalesced_waiters': 1, 'errors': 0}
+
+    asyncio.run(scenario())
+
+def test_stats_are_exported_as_metrics():
+    flight = SingleFlight()
+    export_metrics(flight, 'test_flight')
+    flight.do('key', lambda: None)
+    rendered = metrics.render()
+    assert '# TYPE test_flight_executions_total counter' in rendered
+    assert 'test_flight_executions_total 1' in rendered
+    assert 'test_flight_coalesced_waiters_total 0' in rendered
+    assert 'test_flight_in_flight 0' in rendered
@@ -0,0 +1,203 @@
+# utils/aladhan.py - HTTP client for api.aladhan.com
+#
+# One shared keep-alive session, whole months per request via the calendar
+# endpoint, a bounded number of concurrent requests and jittered retries.
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date as date_cls
+
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+load_dotenv()
+
+ALADHAN_BASE_URL = os.getenv('ALADHAN_BASE_URL', 'http://api.aladhan.com/v1').rstrip('/')
+ALADHAN_TIMEOUT = float(os.getenv('ALADHAN_TIMEOUT', '10'))
+ALADHAN_MAX_CONCURRENCY = int(os.getenv('ALADHAN_MAX_CONCURRENCY', '4'))
+ALADHAN_RETRIES = int(os.getenv('ALADHAN_RETRIES', '3'))
+ALADHAN_BACKOFF = float(os.getenv('ALADHAN_BACKOFF', '0.5'))  # seconds, doubled per retry
+# Failed requests (after retries) in a row before calls fail fast, and for how long
+ALADHAN_BREAKER_THRESHOLD = int(os.getenv('ALADHAN_BREAKER_THRESHOLD', '3'))
+ALADHAN_BREAKER_RESET_SECONDS = float(os.getenv('ALADHAN_BREAKER_RESET_SECONDS', '30'))
+
+# Method mapping to Aladhan API codes
+METHOD_CODES = {
+    'ISNA': 2,
+    'MWL': 3,
+    'EGYPTIAN': 5,
+    'KARACHI': 1,
+    'MAKKAH': 4,
+    'TEHRAN': 7
+}
+
+# Aladhan timing name -> our prayer name
+TIMING_NAMES = {
+    'Fajr': 'fajr',
+    'Sunrise': 'sunrise',
+    'Dhuhr': 'dhuhr',
+    'Asr': 'asr',
+    'Maghrib': 'maghrib',
+    'Isha': 'isha',
+}
+
+# Responses worth retrying: rate limiting and server-side errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class AladhanError(Exception):
+    """The Aladhan API could not be reached or returned an error"""
+
+class AladhanUnavailable(AladhanError):
+    """The Aladhan API is down, timing out or overloaded"""
+
+breaker = CircuitBreaker(
+    'Aladhan API',
+    failure_threshold=ALADHAN_BREAKER_THRESHOLD,
+    reset_timeout=ALADHAN_BREAKER_RESET_SECONDS,
+    failure_exceptions=(AladhanUnavailable,)
+)
+
+# Errors meaning "no upstream answer right now", as opposed to a rejected request
+UPSTREAM_ERRORS = (AladhanUnavailable, CircuitOpenError)
+
+_session = None
+_session_lock = threading.Lock()
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_session():
+    """Get the shared keep-alive session, creating it on first use"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                # Enough pooled connections for every concurrent fetch
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(ALADHAN_MAX_CONCURRENCY, 10))
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _session = session
+    return _session
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=ALADHAN_MAX_CONCURRENCY, thread_name_prefix='aladhan')
+    return _executor
+
+def _backoff(attempt):
+    """Full jitter: sleep a random time up to ALADHAN_BACKOFF * 2^attempt"""
+    time.sleep(random.uniform(0, ALADHAN_BACKOFF * (2 ** attempt)))
+
+def _get_json(path, params):
+    """
+    GET an Aladhan endpoint and return its 'data' payload
+
+    Retries connection errors, timeouts and RETRY_STATUSES responses.
+    Goes through the circuit breaker, so while the API is down this fails
+    immediately instead of waiting on timeouts.
+
+    Raises:
+        CircuitOpenError: if the circuit is open
+        AladhanUnavailable: if all attempts fail
+        AladhanError: if the API rejects the request
+    """
+    return breaker.call(_get_json_with_retries, f'{ALADHAN_BASE_URL}/{path}', params)
+
+def _get_json_with_retries(url, params):
+    last_error = None
+    for attempt in range(ALADHAN_RETRIES + 1):
+        if attempt:
+            _backoff(attempt - 1)
+        try:
+            response = get_session().get(url, params=params, timeout=ALADHAN_TIMEOUT)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            last_error = AladhanUnavailable(f'Request to {url} failed: {e}')
+            continue
+
+        if response.status_code in RETRY_STATUSES:
+            last_error = AladhanUnavailable(f'HTTP error: {response.status_code}')
+            continue
+        if response.status_code != 200:
+            raise AladhanError(f'HTTP error: {response.status_code}')
+
+        data = response.json()
+        if data.get('code') != 200:
+            raise AladhanError(f"Aladhan API error: {data.get('data', 'Unknown error')}")
+        return data['data']
+
+    raise last_error
+
+def _request_params(lat, lon, method, asr_method):
+    return {
+        'latitude': lat,
+        'longitude': lon,
+        'method': METHOD_CODES.get(method, 2),
+        # School mapping (0 = Standard Shafi, 1 = Hanafi)
+        'school': 1 if asr_method == 'hanafi' else 0,
+    }
+
+def _parse_timings(timings):
+    """Aladhan timings -> times dict; the calendar endpoint appends ' (TZ)' to each time"""
+    return {name: timings[key].split(' ')[0] for key, name in TIMING_NAMES.items()}
+
+def fetch_day(lat, lon, date, method='ISNA', asr_method='standard'):
+    """
+    Fetch prayer times for one day
+
+    Returns:
+        Dict with fajr, sunrise, dhuhr, asr, maghrib and isha as 'HH:MM'
+    """
+    data = _get_json(f"timings/{date.strftime('%d-%m-%Y')}", _request_params(lat, lon, method, asr_method))
+    return _parse_timings(data['timings'])
+
+def fetch_month(lat, lon, year, month, method='ISNA', asr_method='standard'):
+    """
+    Fetch prayer times for a whole month in one request
+
+    Returns:
+        Dict of date -> times dict for every day of the month
+    """
+    data = _get_json(f'calendar/{year}/{month}', _request_params(lat, lon, method, asr_method))
+    month_times = {}
+    for day in data:
+        d, m, y = (int(part) for part in day['date']['gregorian']['date'].split('-'))
+        month_times[date_cls(y, m, d)] = _parse_timings(day['timings'])
+    return month_times
+
+def fetch_dates(lat, lon, dates, method='ISNA', asr_method='standard'):
+    """
+    Fetch prayer times for any set of dates of one location
+
+    Makes one calendar request per distinct month, at most
+    ALADHAN_MAX_CONCURRENCY of them at a time.
+
+    Returns:
+        Dict of date -> times dict, keyed like the input dates
+    """
+    months = sorted({(d.year, d.month) for d in dates})
+    if len(months) == 1:
+        results = [fetch_month(lat, lon, *months[0], method, asr_method)]
+    else:
+        executor = _get_executor()
+        futures = [executor.submit(fetch_month, lat, lon, y, m, method, asr_method) for y, m in months]
+        results = [future.result() for future in futures]
+
+    by_day = {}
+    for month_times in results:
+        by_day.update(month_times)
+
+    times = {}
+    for d in dates:
+        key = date_cls(d.year, d.month, d.day)
+        if key not in by_day:
+            raise AladhanError(f"Calendar response is missing {key.strftime('%Y-%m-%d')}")
+        times[d] = by_day[key]
+    return times
@@ -0,0 +1,111 @@
+# utils/aladhan_async.py - asyncio client for api.aladhan.com (async app only)
+#
+# Same endpoints, retries, concurrency limit and circuit breaker as
+# utils/aladhan.py, on one shared httpx.AsyncClient. httpx is only needed
+# for the async app (requirements-async.txt).
+import asyncio
+import random
+from datetime import date as date_cls
+
+from utils.aladhan import (
+    ALADHAN_BACKOFF, ALADHAN_BASE_URL, ALADHAN_MAX_CONCURRENCY, ALADHAN_RETRIES, ALADHAN_TIMEOUT,
+    RETRY_STATUSES, AladhanError, AladhanUnavailable, _parse_timings, _request_params, breaker
+)
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+_client = None
+_semaphore = None
+
+def get_client():
+    """Get the shared keep-alive client, creating it on first use (inside the event loop)"""
+    global _client, _semaphore
+    if _client is None:
+        if httpx is None:
+            raise RuntimeError('httpx is required for PRAYER_TIMES_SOURCE=aladhan in the async app')
+        _client = httpx.AsyncClient(
+            timeout=ALADHAN_TIMEOUT,
+            limits=httpx.Limits(max_connections=max(ALADHAN_MAX_CONCURRENCY, 10),
+                                max_keepalive_connections=max(ALADHAN_MAX_CONCURRENCY, 10)),
+        )
+        # Bounds in-flight requests across all callers, like the sync executor
+        _semaphore = asyncio.Semaphore(ALADHAN_MAX_CONCURRENCY)
+    return _client
+
+async def close_client():
+    global _client, _semaphore
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        _semaphore = None
+
+async def _get_json(path, params):
+    """Async utils.aladhan._get_json: retries, then the circuit breaker"""
+    return await breaker.call_async(_get_json_with_retries, f'{ALADHAN_BASE_URL}/{path}', params)
+
+async def _get_json_with_retries(url, params):
+    client = get_client()
+    last_error = None
+    for attempt in range(ALADHAN_RETRIES + 1):
+        if attempt:
+            # Full jitter, as in the sync client
+            await asyncio.sleep(random.uniform(0, ALADHAN_BACKOFF * (2 ** (attempt - 1))))
+        try:
+            async with _semaphore:
+                response = await client.get(url, params=params)
+        except (httpx.TransportError, httpx.TimeoutException) as e:
+            last_error = AladhanUnavailable(f'Request to {url} failed: {e}')
+            continue
+
+        if response.status_code in RETRY_STATUSES:
+            last_error = AladhanUnavailable(f'HTTP error: {response.status_code}')
+            continue
+        if response.status_code != 200:
+            raise AladhanError(f'HTTP error: {response.status_code}')
+
+        data = response.json()
+        if data.get('code') != 200:
+            raise AladhanError(f"Aladhan API error: {data.get('data', 'Unknown error')}")
+        return data['data']
+
+    raise last_error
+
+async def fetch_day(lat, lon, date, method='ISNA', asr_method='standard'):
+    """Fetch prayer times for one day"""
+    data = await _get_json(f"timings/{date.strftime('%d-%m-%Y')}", _request_params(lat, lon, method, asr_method))
+    return _parse_timings(data['timings'])
+
+async def fetch_month(lat, lon, year, month, method='ISNA', asr_method='standard'):
+    """Fetch prayer times for a whole month in one request"""
+    data = await _get_json(f'calendar/{year}/{month}', _request_params(lat, lon, method, asr_method))
+    month_times = {}
+    for day in data:
+        d, m, y = (int(part) for part in day['date']['gregorian']['date'].split('-'))
+        month_times[date_cls(y, m, d)] = _parse_timings(day['timings'])
+    return month_times
+
+async def fetch_dates(lat, lon, dates, method='ISNA', asr_method='standard'):
+    """
+    Fetch prayer times for any set of dates of one location, one calendar
+    request per distinct month, concurrently
+
+    Returns:
+        Dict of date -> times dict, keyed like the input dates
+    """
+    months = sorted({(d.year, d.month) for d in dates})
+    results = await asyncio.gather(*(fetch_month(lat, lon, y, m, method, asr_method) for y, m in months))
+
+    by_day = {}
+    for month_times in results:
+        by_day.update(month_times)
+
+    times = {}
+    for d in dates:
+        key = date_cls(d.year, d.month, d.day)
+        if key not in by_day:
+            raise AladhanError(f"Calendar response is missing {key.strftime('%Y-%m-%d')}")
+        times[d] = by_day[key]
+    return times
@@ -0,0 +1,102 @@
+# utils/async_db.py - asyncio counterpart of utils/db.py for the async app
+#
+# Same connection settings and pool sizes (DB_*, DB_POOL_*), but an
+# AsyncConnectionPool, so a request waiting on PostgreSQL yields the event
+# loop instead of blocking a worker thread. The pool belongs to the event
+# loop that opened it: open_pool()/close_pool() run at server start/stop.
+import logging
+import time
+import weakref
+
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+
+from utils import metrics
+from utils.db import POOL_CONFIG, get_conninfo
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+
+# When each pooled connection was last returned, for the idle health check
+_last_used = weakref.WeakKeyDictionary()
+
+async def _check_connection(conn):
+    """Health-check a connection on checkout if it sat idle long enough to have gone stale"""
+    last_used = _last_used.get(conn)
+    if last_used is None or time.monotonic() - last_used > POOL_CONFIG['check_after']:
+        await AsyncConnectionPool.check_connection(conn)
+
+async def open_pool():
+    """Create and open the pool on the running event loop"""
+    global _pool
+    if _pool is None:
+        _pool = AsyncConnectionPool(
+            get_conninfo(),
+            min_size=POOL_CONFIG['min_size'],
+            max_size=POOL_CONFIG['max_size'],
+            max_idle=POOL_CONFIG['max_idle'],
+            timeout=POOL_CONFIG['timeout'],
+            kwargs={'row_factory': dict_row, 'autocommit': True},
+            check=_check_connection,
+            name='worldwide_salah_async',
+            open=False,
+        )
+        # Don't wait for min_size connections: the app must start (and serve
+        # computed times) while the database is down
+        await _pool.open(wait=False)
+    return _pool
+
+async def close_pool():
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+def get_pool_stats():
+    """Size and usage of the async pool"""
+    if _pool is None:
+        return {'pool_size': 0, 'in_use': 0, 'waiting': 0}
+    pool_stats = _pool.get_stats()
+    return {
+        'pool_min': pool_stats.get('pool_min'),
+        'pool_max': pool_stats.get('pool_max'),
+        'pool_size': pool_stats.get('pool_size', 0),
+        'available': pool_stats.get('pool_available', 0),
+        'in_use': pool_stats.get('pool_size', 0) - pool_stats.get('pool_available', 0),
+        'waiting': pool_stats.get('requests_waiting', 0),
+        'requests_total': pool_stats.get('requests_num', 0),
+        'requests_errors': pool_stats.get('requests_errors', 0),
+    }
+
+async def execute_query(query, params=None, fetch_one=False):
+    """
+    Execute a database query (see utils.db.execute_query)
+
+    Returns:
+        Query results as list of dicts (or single dict if fetch_one=True)
+    """
+    try:
+        with metrics.phase('db'):
+            pool = await open_pool()
+            async with pool.connection() as conn:
+                try:
+                    async with conn.cursor() as cur:
+                        await cur.execute(query, params)
+                        if cur.description:
+                            if fetch_one:
+                                result = await cur.fetchone()
+                                result = dict(result) if result else None
+                            else:
+                                result = [dict(row) for row in await cur.fetchall()]
+                        else:
+                            result = None
+                finally:
+                    _last_used[conn] = time.monotonic()
+        metrics.record_db_query(ok=True)
+        return result
+
+    except Exception as e:
+        metrics.record_db_query(ok=False)
+        logger.error("Database error: %s", e)
+        raise
@@ -0,0 +1,113 @@
+# utils/cache_writer.py - Write-behind batching for cache writes
+import atexit
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class WriteBehindQueue:
+    """
+    Queue rows and write them in batches from a background thread
+
+    A batch is written when batch_size rows are waiting or flush_interval
+    seconds after its first row arrived, whichever comes first. The queue is
+    bounded: when it is full, put() drops the row (counted in stats) rather
+    than hold up the request, unless put_timeout gives it time to wait.
+
+    Args:
+        write_rows: Called with a list of rows; exceptions are logged and the batch is dropped
+        name: Thread name, also used in log messages
+    """
+
+    def __init__(self, write_rows, name='cache-writer', max_queue=10000, batch_size=500,
+                 flush_interval=1.0, put_timeout=0):
+        self._write_rows = write_rows
+        self.name = name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._stats_lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.errors = 0
+        self.last_flush_ms = 0.0
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                    self._thread.start()
+                    atexit.register(self.close)
+
+    def put(self, row, timeout=None):
+        """
+        Queue a row; returns False if it was dropped because the queue stayed full
+        timeout overrides put_timeout (0 never waits)
+        """
+        self._ensure_started()
+        try:
+            self._queue.put(row, timeout=self.put_timeout if timeout is None else timeout)
+            return True
+        except queue.Full:
+            with self._stats_lock:
+                self.dropped += 1
+            return False
+
+    def _flush(self, batch):
+        start = time.perf_counter()
+        try:
+            self._write_rows(batch)
+        except Exception as e:
+            logger.warning("%s: failed to write %d rows: %s", self.name, len(batch), e)
+            with self._stats_lock:
+                self.errors += 1
+                self.dropped += len(batch)
+            return
+        with self._stats_lock:
+            self.flushes += 1
+            self.written += len(batch)
+            self.last_flush_ms = round((time.perf_counter() - start) * 1000, 3)
+
+    def _run(self):
+        while not (self._stopping.is_set() and self._queue.empty()):
+            try:
+                batch = [self._queue.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+
+            # Collect more rows until the batch is full or has waited long enough
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if self._stopping.is_set():
+                    remaining = 0
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._flush(batch)
+
+    def close(self, timeout=10):
+        """Write everything still queued and stop the writer thread"""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'queued': self._queue.qsize(),
+                'written': self.written,
+                'dropped': self.dropped,
+                'flushes': self.flushes,
+                'errors': self.errors,
+                'last_flush_ms': self.last_flush_ms,
+            }
@@ -0,0 +1,129 @@
+# utils/circuit_breaker.py - Fail fast while a dependency is down
+import threading
+import time
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit is open"""
+
+    def __init__(self, name, retry_after):
+        super().__init__(f'{name} is unavailable, retry in {retry_after:.0f}s')
+        self.name = name
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    """
+    Stop calling a dependency after consecutive failures
+
+    closed: calls go through; failure_threshold failures in a row open the circuit.
+    open: calls raise CircuitOpenError without running for reset_timeout seconds.
+    half_open: one trial call goes through (others still fail fast); success
+    closes the circuit, failure opens it again.
+
+    Only exceptions in failure_exceptions count as failures. Anything else
+    (e.g. the dependency rejecting bad input) means it is up.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0, failure_exceptions=(Exception,)):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failure_exceptions = failure_exceptions
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self.rejected = 0
+        self.trips = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+
+    def _before_call(self):
+        """Let a call through or raise; returns True if it is the half-open trial"""
+        with self._lock:
+            if self._state == CLOSED:
+                return False
+            if self._state == OPEN:
+                remaining = self._opened_at + self.reset_timeout - time.monotonic()
+                if remaining > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, remaining)
+                self._state = HALF_OPEN
+            if self._trial_running:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, self.reset_timeout)
+            self._trial_running = True
+            return True
+
+    def _after_call(self, trial, failed):
+        with self._lock:
+            if trial:
+                self._trial_running = False
+            if not failed:
+                if trial or self._state == CLOSED:
+                    self._state = CLOSED
+                    self._failures = 0
+                return
+            self._failures += 1
+            if trial or (self._state == CLOSED and self._failures >= self.failure_threshold):
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self.trips += 1
+
+    def _abandon_call(self, trial):
+        """The call was interrupted (cancelled, KeyboardInterrupt...) before the dependency answered"""
+        if trial:
+            with self._lock:
+                self._trial_running = False
+
+    def call(self, fn, *args, **kwargs):
+        """Run fn through the breaker, raising CircuitOpenError if the circuit is open"""
+        trial = self._before_call()
+        try:
+            result = fn(*args, **kwargs)
+        except self.failure_exceptions:
+            self._after_call(trial, failed=True)
+            raise
+        except Exception:
+            self._after_call(trial, failed=False)
+            raise
+        except BaseException:
+            # Says nothing about the dependency: leave state and failures as they are
+            self._abandon_call(trial)
+            raise
+        self._after_call(trial, failed=False)
+        return result
+
+    async def call_async(self, fn, *args, **kwargs):
+        """call() for a coroutine function"""
+        trial = self._before_call()
+        try:
+            result = await fn(*args, **kwargs)
+        except self.failure_exceptions:
+            self._after_call(trial, failed=True)
+            raise
+        except Exception:
+            self._after_call(trial, failed=False)
+            raise
+        except BaseException:
+            # Says nothing about the dependency: leave state and failures as they are
+            self._abandon_call(trial)
+            raise
+        self._after_call(trial, failed=False)
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                'state': self._state,
+                'consecutive_failures': self._failures,
+                'trips': self.trips,
+                'rejected': self.rejected,
+            }
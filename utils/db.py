@@ -1,11 +1,24 @@
 # utils/db.py - For psycopg3
 import psycopg
 from psycopg.rows import dict_row
+from psycopg_pool import ConnectionPool
+from contextlib import contextmanager
+from contextvars import ContextVar
+import atexit
+import bisect
+import logging
 import os
+import threading
+import time
+import weakref
 from dotenv import load_dotenv
 
+from utils import metrics
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Database connection parameters
 DB_CONFIG = {
     'dbname': os.getenv('DB_NAME', 'worldwide_salah'),
@@ -15,43 +28,224 @@ DB_CONFIG = {
     'port': os.getenv('DB_PORT', '5432')
 }
 
+# Connection pool parameters
+POOL_CONFIG = {
+    'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '1')),
+    'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+    'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', '300')),  # seconds before idle connections are closed
+    'timeout': float(os.getenv('DB_POOL_TIMEOUT', '5')),  # seconds to wait for a free connection
+    'check_after': float(os.getenv('DB_POOL_CHECK_AFTER', '30')),  # health-check connections idle this long
+}
+
+# Upper bounds (ms) of the pool wait-time histogram buckets
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float('inf'))
+
+_pool = None
+_pool_lock = threading.Lock()
+_wait_counts = [0] * len(WAIT_BUCKETS_MS)
+_wait_total_ms = 0.0
+_stats_lock = threading.Lock()
+
+# When each pooled connection was last returned, for the idle health check
+_last_used = weakref.WeakKeyDictionary()
+
+# Connection scope of the current request/thread, shared by nested queries
+_connection_scope = ContextVar('connection_scope', default=None)
+
+def get_conninfo():
+    """Build the libpq connection string"""
+    return f"dbname={DB_CONFIG['dbname']} user={DB_CONFIG['user']} password={DB_CONFIG['password']} host={DB_CONFIG['host']} port={DB_CONFIG['port']}"
+
 def get_connection():
-    """Get database connection"""
-    conn_string = f"dbname={DB_CONFIG['dbname']} user={DB_CONFIG['user']} password={DB_CONFIG['password']} host={DB_CONFIG['host']} port={DB_CONFIG['port']}"
-    return psycopg.connect(conn_string, row_factory=dict_row)
+    """Get a new, unpooled database connection"""
+    return psycopg.connect(get_conninfo(), row_factory=dict_row)
+
+def _check_connection(conn):
+    """Health-check a connection on checkout if it sat idle long enough to have gone stale"""
+    last_used = _last_used.get(conn)
+    if last_used is None or time.monotonic() - last_used > POOL_CONFIG['check_after']:
+        ConnectionPool.check_connection(conn)
+
+def get_pool():
+    """Get the process-wide connection pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    get_conninfo(),
+                    min_size=POOL_CONFIG['min_size'],
+                    max_size=POOL_CONFIG['max_size'],
+                    max_idle=POOL_CONFIG['max_idle'],
+                    timeout=POOL_CONFIG['timeout'],
+                    # Every statement commits on its own, like a fresh connection did
+                    kwargs={'row_factory': dict_row, 'autocommit': True},
+                    check=_check_connection,
+                    name='worldwide_salah',
+                    open=True,
+                )
+    return _pool
+
+def close_pool():
+    """Close the connection pool (called at interpreter exit)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+atexit.register(close_pool)
+
+def _record_wait(wait_ms):
+    global _wait_total_ms
+    with _stats_lock:
+        _wait_counts[bisect.bisect_left(WAIT_BUCKETS_MS, wait_ms)] += 1
+        _wait_total_ms += wait_ms
+
+@contextmanager
+def _checkout():
+    """Check a connection out of the pool, recording how long it took"""
+    start = time.perf_counter()
+    with get_pool().connection() as conn:
+        _record_wait((time.perf_counter() - start) * 1000)
+        try:
+            yield conn
+        finally:
+            _last_used[conn] = time.monotonic()
+
+class _ConnectionScope:
+    """Lazily borrows one pooled connection and hands it to every query in the scope"""
+
+    def __init__(self):
+        self._checkout = None
+        self._conn = None
+        self._error = None
+
+    def get_connection(self):
+        if self._error is not None:
+            # Don't wait for the pool again after it already timed out
+            raise self._error
+        if self._conn is None:
+            self._checkout = _checkout()
+            try:
+                self._conn = self._checkout.__enter__()
+            except Exception as e:
+                self._checkout = None
+                self._error = e
+                raise
+        return self._conn
+
+    def release(self, exc_type=None, exc=None, tb=None):
+        if self._checkout is not None:
+            self._checkout.__exit__(exc_type, exc, tb)
+            self._checkout = None
+            self._conn = None
+
+@contextmanager
+def connection_scope():
+    """
+    Reuse one pooled connection for all queries in a block
+
+    The connection is only checked out when the first query runs, so a
+    block that ends up making no queries costs nothing. Nested scopes
+    share the outer connection.
+    """
+    if _connection_scope.get() is not None:
+        yield
+        return
+
+    scope = _ConnectionScope()
+    token = _connection_scope.set(scope)
+    try:
+        yield
+    except BaseException as e:
+        _connection_scope.reset(token)
+        scope.release(type(e), e, e.__traceback__)
+        raise
+    else:
+        _connection_scope.reset(token)
+        scope.release()
+
+def get_pool_stats():
+    """
+    Get connection pool statistics
+
+    Returns:
+        Dict with pool size, connections in use, waiting requests and a
+        cumulative histogram of how long callers waited for a connection
+    """
+    with _stats_lock:
+        counts = list(_wait_counts)
+        total_ms = _wait_total_ms
+
+    stats = {'wait_ms_count': sum(counts), 'wait_ms_sum': round(total_ms, 3)}
+    cumulative = 0
+    stats['wait_ms_buckets'] = {}
+    for bound, count in zip(WAIT_BUCKETS_MS, counts):
+        cumulative += count
+        stats['wait_ms_buckets']['+Inf' if bound == float('inf') else str(bound)] = cumulative
+
+    if _pool is None:
+        stats.update({'pool_size': 0, 'in_use': 0, 'waiting': 0})
+        return stats
+
+    pool_stats = _pool.get_stats()
+    stats.update({
+        'pool_min': pool_stats.get('pool_min'),
+        'pool_max': pool_stats.get('pool_max'),
+        'pool_size': pool_stats.get('pool_size', 0),
+        'available': pool_stats.get('pool_available', 0),
+        'in_use': pool_stats.get('pool_size', 0) - pool_stats.get('pool_available', 0),
+        'waiting': pool_stats.get('requests_waiting', 0),
+        'requests_total': pool_stats.get('requests_num', 0),
+        'requests_errors': pool_stats.get('requests_errors', 0),
+        'connections_lost': pool_stats.get('connections_lost', 0),
+    })
+    return stats
+
+def _run_query(conn, query, params, fetch_one):
+    with conn.cursor() as cur:
+        cur.execute(query, params)
+
+        # If it's a SELECT query
+        if cur.description:
+            if fetch_one:
+                result = cur.fetchone()
+                return dict(result) if result else None
+            else:
+                results = cur.fetchall()
+                return [dict(row) for row in results]
+
+        # For INSERT/UPDATE/DELETE
+        conn.commit()
+        return None
 
 def execute_query(query, params=None, fetch_one=False):
     """
     Execute a database query
-    
+
     Args:
         query: SQL query string
         params: Query parameters (tuple or dict)
         fetch_one: If True, return single row; else return all rows
-    
+
     Returns:
         Query results as list of dicts (or single dict if fetch_one=True)
     """
     try:
-        with get_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute(query, params)
-                
-                # If it's a SELECT query
-                if cur.description:
-                    if fetch_one:
-                        result = cur.fetchone()
-                        return dict(result) if result else None
-                    else:
-                        results = cur.fetchall()
-                        return [dict(row) for row in results]
-                
-                # For INSERT/UPDATE/DELETE
-                conn.commit()
-                return None
-                
+        with metrics.phase('db'):
+            scope = _connection_scope.get()
+            if scope is not None:
+                result = _run_query(scope.get_connection(), query, params, fetch_one)
+            else:
+                with _checkout() as conn:
+                    result = _run_query(conn, query, params, fetch_one)
+        metrics.record_db_query(ok=True)
+        return result
+
     except Exception as e:
-        print(f"❌ Database error: {e}")
+        metrics.record_db_query(ok=False)
+        logger.error("Database error: %s", e)
         raise
 
 def test_connection():
@@ -61,11 +255,13 @@ def test_connection():
             with conn.cursor() as cur:
                 cur.execute("SELECT 1")
                 result = cur.fetchone()
-                print(f"✅ Database connection successful: {result}")
+                logger.info("Database connection successful: %s", result)
                 return True
     except Exception as e:
-        print(f"❌ Database connection failed: {e}")
+        logger.error("Database connection failed: %s", e)
         return False
 
 if __name__ == '__main__':
-    test_connection()
\ No newline at end of file
+    from utils.logging_config import configure_logging
+    configure_logging()
+    test_connection()
@@ -0,0 +1,138 @@
+# utils/export.py - Streaming timetable export (CSV and iCalendar)
+#
+# The range is produced a chunk of EXPORT_CHUNK_DAYS days at a time: each
+# chunk reads its cached days with one short range query and computes the
+# gaps, so memory stays flat whatever the range and no database connection
+# is held while a client reads. The caller computes the first chunk before
+# the response starts, so an upstream failure there is reported as an error.
+# Days whose times are undefined (polar day/night) are exported blank.
+import csv
+import io
+import os
+from datetime import datetime, timedelta, timezone
+
+from utils.geo import location_key
+from utils.prayer_calc import PRAYER_NAMES, UndefinedTimeError
+from utils.timezones import utc_offsets_hours
+
+EXPORT_CHUNK_DAYS = int(os.getenv('EXPORT_CHUNK_DAYS', '31'))
+
+# Prayers that become calendar events (sunrise only ends the Fajr window)
+ICS_PRAYERS = ('fajr', 'dhuhr', 'asr', 'maghrib', 'isha')
+ICS_EVENT_MINUTES = 15
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ics': 'text/calendar',
+}
+
+def _dates(first, last):
+    return [first + timedelta(days=i) for i in range((last - first).days + 1)]
+
+def iter_chunks(first, last, read_cached, compute):
+    """
+    Timetable of a date range, one chunk of EXPORT_CHUNK_DAYS days at a time
+
+    Args:
+        first, last: Date range (inclusive)
+        read_cached: fn(first, last) -> iterable of (date, times) cached
+            in that range
+        compute: fn(list of dates, started) -> dict of date -> times;
+            started is True once a chunk has been yielded (the response
+            has begun)
+
+    Yields:
+        Lists of (date, times) covering first to last in date order; times
+        is None for days compute cannot calculate (polar day/night)
+    """
+    start = first
+    while start <= last:
+        end = min(last, start + timedelta(days=EXPORT_CHUNK_DAYS - 1))
+        times_by_date = dict(read_cached(start, end))
+        missing = [date for date in _dates(start, end) if date not in times_by_date]
+        if missing:
+            started = start > first
+            times_by_date.update(_computed(missing, lambda dates: compute(dates, started)))
+        yield [(date, times_by_date[date]) for date in _dates(start, end)]
+        start = end + timedelta(days=1)
+
+def _computed(dates, compute):
+    try:
+        return compute(dates)
+    except UndefinedTimeError:
+        # Some day is undefined; compute day by day to find which
+        computed = {}
+        for date in dates:
+            try:
+                computed.update(compute([date]))
+            except UndefinedTimeError:
+                computed[date] = None
+        return computed
+
+# ============= CSV =============
+
+def csv_stream(chunks):
+    """
+    Yield CSV text: a header, then one row per day (blank times when undefined)
+
+    Args:
+        chunks: Lists of (date, times), as yielded by iter_chunks
+    """
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator='\r\n')
+    writer.writerow(('date',) + PRAYER_NAMES)
+    for chunk in chunks:
+        for date, times in chunk:
+            writer.writerow([date.strftime('%Y-%m-%d')] + [times[name] if times else '' for name in PRAYER_NAMES])
+        yield out.getvalue()
+        out.seek(0)
+        out.truncate()
+
+# ============= ICALENDAR =============
+
+def _ics_escape(text):
+    return text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+def ics_stream(chunks, lat, lon, method, asr_method, name):
+    """
+    Yield an iCalendar (RFC 5545) feed with one event per prayer per day
+    (chunks as yielded by iter_chunks)
+
+    Event times are converted to UTC with the location's offset on each
+    day, so the feed needs no VTIMEZONE and shows correctly in any zone.
+    """
+    lat_key, lon_key = location_key(lat, lon)
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    yield '\r\n'.join((
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//Worldwide Salah//Prayer Times//EN',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_ics_escape(name)}',
+    )) + '\r\n'
+
+    for chunk in chunks:
+        offsets = utc_offsets_hours(lat, lon, chunk[0][0], (chunk[-1][0] - chunk[0][0]).days + 1)
+        lines = []
+        for date, times in chunk:
+            if times is None:
+                continue
+            offset = timedelta(hours=offsets[(date - chunk[0][0]).days])
+            midnight = datetime(date.year, date.month, date.day)
+            for prayer in ICS_PRAYERS:
+                hours, minutes = times[prayer].split(':')
+                start = midnight + timedelta(hours=int(hours), minutes=int(minutes)) - offset
+                lines += [
+                    'BEGIN:VEVENT',
+                    f'UID:{date:%Y%m%d}-{prayer}-{lat_key}-{lon_key}-{method}-{asr_method}@worldwide-salah',
+                    f'DTSTAMP:{stamp}',
+                    f'DTSTART:{start:%Y%m%dT%H%M00Z}',
+                    f'DURATION:PT{ICS_EVENT_MINUTES}M',
+                    f'SUMMARY:{prayer.capitalize()}',
+                    'TRANSP:TRANSPARENT',
+                    'END:VEVENT',
+                ]
+        yield '\r\n'.join(lines) + '\r\n'
+
+    yield 'END:VCALENDAR\r\n'
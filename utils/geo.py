@@ -0,0 +1,52 @@
+# utils/geo.py - Coordinate helpers shared by the cache and mosque queries
+import math
+
+# prayer_time_cache stores coordinates as integers at 4 decimal places (~11 m)
+LOCATION_KEY_SCALE = 10000
+
+def location_key(lat, lon):
+    """
+    Quantize coordinates to the integer cache key (lat_key, lon_key)
+
+    40.71284, -74.00601 -> (407128, -740060)
+    """
+    return int(round(lat * LOCATION_KEY_SCALE)), int(round(lon * LOCATION_KEY_SCALE))
+
+EARTH_RADIUS_KM = 6371.0
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points in km"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+def bounding_box(lat, lon, radius_km):
+    """
+    Lat/lon box that contains every point within radius_km of (lat, lon)
+
+    Returns:
+        (min_lat, max_lat, lon_ranges) where lon_ranges is a list of one
+        (min_lon, max_lon) pair, or two when the box crosses the antimeridian
+    """
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat = lat - dlat
+    max_lat = lat + dlat
+
+    # Near a pole the circle covers every longitude
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90.0), min(max_lat, 90.0), [(-180.0, 180.0)]
+
+    # Widest longitude span of the circle, reached at the tangent latitude
+    dlon = math.degrees(math.asin(min(1.0, math.sin(radius_km / EARTH_RADIUS_KM) / math.cos(math.radians(lat)))))
+    min_lon = lon - dlon
+    max_lon = lon + dlon
+
+    if dlon >= 180:
+        return min_lat, max_lat, [(-180.0, 180.0)]
+    if min_lon < -180:
+        return min_lat, max_lat, [(min_lon + 360, 180.0), (-180.0, max_lon)]
+    if max_lon > 180:
+        return min_lat, max_lat, [(min_lon, 180.0), (-180.0, max_lon - 360)]
+    return min_lat, max_lat, [(min_lon, max_lon)]
@@ -0,0 +1,131 @@
+# utils/grid.py - Serve prayer times from a grid of shared location cells
+#
+# The cache is keyed on 4-decimal coordinates (~11 m), so neighbours rarely
+# share rows. Prayer times change by only seconds per km, so with GRID_MODE
+# set, requests are served from cells of about GRID_CELL_KM x GRID_CELL_KM:
+#
+#   snap         times of the centre of the cell containing the location
+#   interpolate  bilinear blend of the four cell centres around it
+#
+# Cells are GRID_CELL_KM high everywhere; each row of cells is split into as
+# many GRID_CELL_KM-wide cells as fit around that latitude, so cells keep
+# their size in km towards the poles. Locations beyond GRID_MAX_LATITUDE,
+# or whose cell centres lie in another timezone, are served exactly.
+# Measured errors per method: python -m scripts.grid_error (see the README).
+import math
+import os
+
+from utils.geo import EARTH_RADIUS_KM
+from utils.responses import time_to_minutes
+from utils.timezones import timezone_names
+
+GRID_MODE = os.getenv('GRID_MODE', 'off').lower()
+GRID_MODES = ('off', 'snap', 'interpolate')
+GRID_CELL_KM = float(os.getenv('GRID_CELL_KM', '2'))
+# Further from the equator, high-latitude rules make Fajr/Isha too sensitive to position
+GRID_MAX_LATITUDE = float(os.getenv('GRID_MAX_LATITUDE', '65'))
+
+KM_PER_DEGREE = EARTH_RADIUS_KM * math.pi / 180
+
+if GRID_MODE not in GRID_MODES:
+    raise ValueError(f"GRID_MODE must be one of {', '.join(GRID_MODES)}, not {GRID_MODE!r}")
+
+def _rows(cell_km):
+    """Number of cell rows from pole to pole (a whole number, so rows tile exactly)"""
+    return max(1, round(180 * KM_PER_DEGREE / cell_km))
+
+def _row_cells(row_lat, cell_km):
+    """Number of cells in the row centred on row_lat (a whole number, so rows wrap at ±180)"""
+    return max(1, math.floor(360 * KM_PER_DEGREE * math.cos(math.radians(row_lat)) / cell_km))
+
+def _row_centre(row, rows):
+    return -90 + (row + 0.5) * 180 / rows
+
+def _cell_lon_centre(cell, cells):
+    return -180 + (cell % cells + 0.5) * 360 / cells
+
+def cell_centre(lat, lon, cell_km=None):
+    """Centre (lat, lon) of the grid cell containing a location"""
+    cell_km = cell_km or GRID_CELL_KM
+    rows = _rows(cell_km)
+    row = min(rows - 1, max(0, math.floor((lat + 90) * rows / 180)))
+    row_lat = _row_centre(row, rows)
+    cells = _row_cells(row_lat, cell_km)
+    return row_lat, _cell_lon_centre(math.floor((lon + 180) * cells / 360), cells)
+
+def cell_corners(lat, lon, cell_km=None):
+    """
+    Cell centres around a location with their bilinear weights
+
+    Returns:
+        List of (lat, lon, weight) with weight > 0, weights summing to 1
+    """
+    cell_km = cell_km or GRID_CELL_KM
+    rows = _rows(cell_km)
+    # Position in row-centre units: row r's centre is at r
+    position = min(rows - 1, max(0, (lat + 90) * rows / 180 - 0.5))
+    row_below = min(rows - 2, math.floor(position)) if rows > 1 else 0
+    t = position - row_below
+
+    weights = {}
+    for row, row_weight in ((row_below, 1 - t), (row_below + 1, t)):
+        if row_weight <= 0 or row >= rows:
+            continue
+        row_lat = _row_centre(row, rows)
+        cells = _row_cells(row_lat, cell_km)
+        lon_position = (lon + 180) * cells / 360 - 0.5
+        cell_left = math.floor(lon_position)
+        u = lon_position - cell_left
+        for cell, cell_weight in ((cell_left, 1 - u), (cell_left + 1, u)):
+            if cell_weight > 0:
+                point = (row_lat, _cell_lon_centre(cell, cells))
+                weights[point] = weights.get(point, 0) + row_weight * cell_weight
+    return [(point_lat, point_lon, weight) for (point_lat, point_lon), weight in weights.items()]
+
+def _zones(points):
+    """Timezone of each (lat, lon), or its nautical offset at sea (as the engine uses)"""
+    names = timezone_names([(round(lat, 4), round(lon, 4)) for lat, lon in points])
+    return [name or round(lon / 15) for name, (_, lon) in zip(names, points)]
+
+def cache_points(lat, lon):
+    """
+    Locations whose times serve a request for (lat, lon) under GRID_MODE
+
+    Returns:
+        List of (lat, lon, weight): the location itself when the grid is off,
+        beyond GRID_MAX_LATITUDE or a cell centre is in another timezone,
+        else the cell centre (snap) or the centres around it (interpolate)
+    """
+    if GRID_MODE == 'off' or abs(lat) > GRID_MAX_LATITUDE:
+        return [(lat, lon, 1.0)]
+
+    points = [(*cell_centre(lat, lon), 1.0)] if GRID_MODE == 'snap' else cell_corners(lat, lon)
+    zone, *point_zones = _zones([(lat, lon)] + [(point_lat, point_lon) for point_lat, point_lon, _ in points])
+    if any(point_zone != zone for point_zone in point_zones):
+        return [(lat, lon, 1.0)]
+    return points
+
+def blend(times_list, weights):
+    """
+    Weighted average of times dicts ('HH:MM'), rounded to the minute
+
+    Times are aligned to the first dict's before averaging, so a prayer
+    falling either side of midnight (23:58 and 00:02) averages to 00:00.
+    """
+    blended = {}
+    for name, value in times_list[0].items():
+        reference = time_to_minutes(value)
+        total = 0.0
+        for times, weight in zip(times_list, weights):
+            minutes = time_to_minutes(times[name])
+            minutes += 1440 * round((reference - minutes) / 1440)
+            total += weight * minutes
+        minutes = math.floor(total + 0.5) % 1440
+        blended[name] = f'{minutes // 60:02d}:{minutes % 60:02d}'
+    return blended
+
+def describe():
+    """Grid settings that change served times ('' when off), for HTTP cache validators"""
+    if GRID_MODE == 'off':
+        return ''
+    return f'{GRID_MODE}:{GRID_CELL_KM:g}km:{GRID_MAX_LATITUDE:g}'
@@ -0,0 +1,145 @@
+# utils/hijri.py - Ramadan dates from the Hijri calendar, with database overrides
+#
+# Ramadan of every Hijri year hijri-converter covers (Umm al-Qura, 1343-1500
+# AH, i.e. 1924-2077) is computed once on first use and kept in memory.
+# Rows of the ramadan_dates table override the computed dates of their
+# Hijri year, e.g. to follow a moon sighting. They are read once, then
+# refreshed in the background every RAMADAN_OVERRIDES_REFRESH_SECONDS, so
+# requests never wait on the database.
+from datetime import date, timedelta
+import logging
+import os
+import threading
+import time
+
+from utils.db import execute_query
+
+logger = logging.getLogger(__name__)
+
+RAMADAN_OVERRIDES_REFRESH_SECONDS = float(os.getenv('RAMADAN_OVERRIDES_REFRESH_SECONDS', '3600'))
+
+RAMADAN = 9
+
+RAMADAN_OVERRIDES_QUERY = """
+    SELECT hijri_year, gregorian_year, start_date, end_date
+    FROM ramadan_dates
+"""
+
+def _to_date(gregorian):
+    return date(gregorian.year, gregorian.month, gregorian.day)
+
+def compute_ramadans():
+    """
+    Ramadan of every Hijri year hijri-converter covers
+
+    Returns:
+        Dict of hijri_year -> (start_date, end_date), end_date being the
+        day before 1 Shawwal
+    """
+    from hijri_converter import Hijri, ummalqura
+
+    (first_year, _, _), (last_year, _, _) = ummalqura.HIJRI_RANGE
+    ramadans = {}
+    for hijri_year in range(first_year, last_year + 1):
+        start = _to_date(Hijri(hijri_year, RAMADAN, 1).to_gregorian())
+        end = _to_date(Hijri(hijri_year, RAMADAN + 1, 1).to_gregorian()) - timedelta(days=1)
+        ramadans[hijri_year] = (start, end)
+    return ramadans
+
+class RamadanCalendar:
+    """
+    Ramadan start and end by Hijri year, and by the Gregorian year it begins in
+
+    Lookups read immutable dicts, which refreshes replace as a whole.
+    """
+
+    def __init__(self, refresh_seconds=RAMADAN_OVERRIDES_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._computed = None
+        # (gregorian_year -> [hijri_year, ...], hijri_year -> (start_date, end_date))
+        self._tables = None
+        self._checked_at = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self._first_load_lock = threading.Lock()
+
+    def _rebuild(self, rows):
+        """Rebuild the tables with ramadan_dates rows overriding the computed dates"""
+        with self._lock:
+            if self._computed is None:
+                self._computed = compute_ramadans()
+            by_hijri_year = dict(self._computed)
+            for row in rows:
+                by_hijri_year[row['hijri_year']] = (row['start_date'], row['end_date'])
+
+            # A Gregorian year can hold the start of two Ramadans (e.g. 2030)
+            by_year = {}
+            for hijri_year in sorted(by_hijri_year):
+                by_year.setdefault(by_hijri_year[hijri_year][0].year, []).append(hijri_year)
+            self._tables = (by_year, by_hijri_year)
+        logger.info("Ramadan calendar loaded: %d years, %d overrides", len(by_hijri_year), len(rows))
+
+    def load(self, rows):
+        """
+        Use ramadan_dates rows fetched by the caller (None if the query
+        failed: keep the current overrides, or none, until the next refresh)
+        """
+        with self._lock:
+            self._checked_at = time.monotonic()
+            self._refreshing = False
+        if rows is not None:
+            self._rebuild(rows)
+        elif self._tables is None:
+            self._rebuild([])
+
+    def refresh(self):
+        """Reload the overrides from the database"""
+        try:
+            rows = execute_query(RAMADAN_OVERRIDES_QUERY)
+        except Exception as e:
+            logger.warning("Could not load Ramadan date overrides: %s", e)
+            rows = None
+        self.load(rows)
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self.refresh, name='ramadan-overrides', daemon=True).start()
+
+    def _current_tables(self):
+        """
+        Load the tables on first use (one caller queries, the others wait for
+        it); afterwards stale overrides are refreshed in the background while
+        the current tables answer
+        """
+        if self._tables is None:
+            with self._first_load_lock:
+                if self._tables is None:
+                    self.refresh()
+        elif time.monotonic() - self._checked_at > self.refresh_seconds:
+            self._refresh_in_background()
+        return self._tables
+
+    def dates(self, year):
+        """
+        Every Ramadan beginning in a Gregorian year
+
+        Returns:
+            List of (hijri_year, start_date, end_date) in date order; empty
+            if the year is not covered
+        """
+        by_year, by_hijri_year = self._current_tables()
+        return [(hijri_year, *by_hijri_year[hijri_year]) for hijri_year in by_year.get(year, [])]
+
+    def hijri_dates(self, hijri_year):
+        """
+        Ramadan of a Hijri year
+
+        Returns:
+            (start_date, end_date), or None if the year is not covered
+        """
+        return self._current_tables()[1].get(hijri_year)
+
+ramadan_calendar = RamadanCalendar()
@@ -0,0 +1,107 @@
+# utils/http_cache.py - HTTP caching for the GET prayer time endpoints
+#
+# A GET response is a pure function of its (canonical) URL, the prayer time
+# source and HTTP_CACHE_VERSION, so its strong ETag can be computed from the
+# request alone and If-None-Match answered with 304 before any cache lookup.
+# Bump HTTP_CACHE_VERSION whenever a deploy changes computed times, so
+# clients and CDNs stop revalidating against old ETags.
+import hashlib
+import os
+from datetime import date
+from urllib.parse import urlencode
+
+from flask import Response, redirect
+
+from utils.geo import LOCATION_KEY_SCALE, location_key
+from utils.prayer_calc import ASR_FACTORS, METHODS
+from utils.responses import etag_variants
+
+HTTP_CACHE_VERSION = os.getenv('HTTP_CACHE_VERSION', '2')
+# Responses for today and later dates
+HTTP_CACHE_MAX_AGE = int(os.getenv('HTTP_CACHE_MAX_AGE', str(30 * 86400)))
+# Responses that only cover past dates
+HTTP_CACHE_PAST_MAX_AGE = int(os.getenv('HTTP_CACHE_PAST_MAX_AGE', str(365 * 86400)))
+# Redirects to the canonical URL; short, since redirects carry no validator
+HTTP_CACHE_REDIRECT_MAX_AGE = int(os.getenv('HTTP_CACHE_REDIRECT_MAX_AGE', '3600'))
+
+def canonical_coordinates(lat, lon):
+    """
+    Round coordinates to the cache key precision (4 decimals)
+
+    Returns:
+        (lat, lon) as floats and their fixed-width strings, e.g. '21.4225'
+    """
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError('Coordinates out of range')
+    lat_key, lon_key = location_key(lat, lon)
+    lat, lon = lat_key / LOCATION_KEY_SCALE, lon_key / LOCATION_KEY_SCALE
+    return lat, lon, f'{lat:.4f}', f'{lon:.4f}'
+
+def canonical_method(method, asr_method):
+    """Normalize case and reject unknown methods (they would silently fall back to ISNA)"""
+    method = (method or 'ISNA').upper()
+    asr_method = (asr_method or 'standard').lower()
+    if method not in METHODS:
+        raise ValueError(f'Unknown method {method!r}')
+    if asr_method not in ASR_FACTORS:
+        raise ValueError(f'Unknown asr_method {asr_method!r}')
+    return method, asr_method
+
+def canonical_query(params):
+    """Query string with params in the given order, e.g. lat=..&lng=..&date=.."""
+    return urlencode(params)
+
+def redirect_if_not_canonical(path, query_string, params, shared=True):
+    """
+    Redirect to the canonical URL if the request used another spelling
+    (more decimals, other order, omitted defaults), so caches key every
+    location/date/method on a single URL
+
+    Args:
+        shared: False when the canonical URL depends on server settings
+            (the grid cell under GRID_MODE=snap); the redirect is then
+            temporary and private, so no CDN keeps it after they change
+
+    Returns:
+        Redirect response, or None if the request is already canonical
+    """
+    canonical = canonical_query(params)
+    if query_string == canonical:
+        return None
+    if shared:
+        response = redirect(f'{path}?{canonical}', code=301)
+        response.headers['Cache-Control'] = f'public, max-age={HTTP_CACHE_REDIRECT_MAX_AGE}'
+    else:
+        response = redirect(f'{path}?{canonical}', code=302)
+        response.headers['Cache-Control'] = f'private, max-age={HTTP_CACHE_REDIRECT_MAX_AGE}'
+    return response
+
+def make_etag(source, path, query, variant=''):
+    """Strong ETag for a canonical URL (variant: representation chosen by request headers)"""
+    digest = hashlib.sha256(f'{HTTP_CACHE_VERSION}|{source}|{path}?{query}|{variant}'.encode()).hexdigest()
+    return digest[:32]
+
+def cache_control(last_date, today=None):
+    """Cache-Control for a response covering dates up to last_date"""
+    if last_date < (today or date.today()):
+        return f'public, max-age={HTTP_CACHE_PAST_MAX_AGE}, immutable'
+    return f'public, max-age={HTTP_CACHE_MAX_AGE}'
+
+def not_modified_response(request, etag, cache_control_value):
+    """
+    304 if If-None-Match matches etag or one of its compressed variants
+
+    Returns:
+        Response, or None if the full response has to be sent
+    """
+    for candidate in etag_variants(etag):
+        if request.if_none_match.contains_weak(candidate):
+            response = Response(status=304)
+            response.vary.add('Accept-Encoding')
+            return set_cache_headers(response, candidate, cache_control_value)
+    return None
+
+def set_cache_headers(response, etag, cache_control_value):
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control_value
+    return response
@@ -0,0 +1,46 @@
+# utils/logging_config.py - Leveled, optionally JSON, logging for the app
+#
+# Modules log through logging.getLogger(__name__) with %-style arguments,
+# so messages below LOG_LEVEL are dropped before any formatting happens.
+import json
+import logging
+import os
+import sys
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text').lower()  # 'text' or 'json'
+
+# Attributes every LogRecord has; anything else was passed via extra=
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the message, level, logger and any extra= fields"""
+
+    def format(self, record):
+        entry = {
+            'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+def configure_logging(level=None, fmt=None):
+    """Install a stderr handler on the root logger (idempotent)"""
+    root = logging.getLogger()
+    root.setLevel(level or LOG_LEVEL)
+    if any(getattr(handler, '_salah_handler', False) for handler in root.handlers):
+        return
+
+    handler = logging.StreamHandler(sys.stderr)
+    handler._salah_handler = True
+    if (fmt or LOG_FORMAT) == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    root.addHandler(handler)
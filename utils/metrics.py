@@ -0,0 +1,231 @@
+# utils/metrics.py - Request metrics in the Prometheus text format
+#
+# Minimal counters and histograms (no client library needed) plus a
+# per-request breakdown of where the time went. Code on the request path
+# wraps work in phase('db'), phase('compute') or phase('serialize'); the
+# app records the totals per endpoint when the request finishes.
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Latency buckets in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float('inf'))
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, float('inf'))
+
+PHASES = ('db', 'compute', 'serialize')
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues):
+        with self._lock:
+            return self._values.get(labelvalues, 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for labelvalues, value in items:
+            yield f'{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}'
+
+class Histogram:
+    """Cumulative histogram with optional labels"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labelvalues -> [bucket counts, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * len(self.buckets), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def samples(self):
+        with self._lock:
+            items = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._series.items())
+        for labelvalues, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, labelvalues, [('le', _format_value(bound))])
+                yield f'{self.name}_bucket{labels} {cumulative}'
+            labels = _format_labels(self.labelnames, labelvalues)
+            yield f'{self.name}_sum{labels} {_format_value(round(total, 6))}'
+            yield f'{self.name}_count{labels} {cumulative}'
+
+class Gauge:
+    """Value read from a callback at scrape time; the callback returns a number or {labelvalues: number}"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, callback, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+
+    def samples(self):
+        values = self.callback()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for labelvalues, value in sorted(values.items()):
+            if value is not None:
+                yield f'{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}'
+
+class CallbackCounter(Gauge):
+    """Counter kept elsewhere (e.g. in a stats dict), read from a callback at scrape time"""
+
+    kind = 'counter'
+
+_registry = []
+_registry_lock = threading.Lock()
+
+def _register(metric):
+    with _registry_lock:
+        _registry.append(metric)
+    return metric
+
+def counter(name, documentation, labelnames=()):
+    return _register(Counter(name, documentation, labelnames))
+
+def histogram(name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+    return _register(Histogram(name, documentation, labelnames, buckets))
+
+def gauge(name, documentation, callback, labelnames=()):
+    return _register(Gauge(name, documentation, callback, labelnames))
+
+def callback_counter(name, documentation, callback, labelnames=()):
+    return _register(CallbackCounter(name, documentation, callback, labelnames))
+
+def render():
+    """All registered metrics in the Prometheus text exposition format"""
+    with _registry_lock:
+        metrics = list(_registry)
+    lines = []
+    for metric in metrics:
+        try:
+            samples = list(metric.samples())
+        except Exception:
+            # A broken gauge callback shouldn't take down the whole scrape
+            continue
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        lines.extend(samples)
+    return '\n'.join(lines) + '\n'
+
+# ============= REQUEST METRICS =============
+
+REQUEST_LATENCY = histogram(
+    'salah_http_request_duration_seconds', 'Time to handle a request', ('endpoint', 'method'))
+REQUEST_PHASE_LATENCY = histogram(
+    'salah_http_request_phase_seconds', 'Time spent per request in db, compute and serialize',
+    ('endpoint', 'phase'))
+REQUESTS = counter(
+    'salah_http_requests_total', 'Requests handled', ('endpoint', 'method', 'status'))
+REQUEST_ERRORS = counter(
+    'salah_http_request_errors_total', 'Requests answered with a 4xx/5xx status', ('endpoint', 'status'))
+DB_QUERIES_PER_REQUEST = histogram(
+    'salah_db_queries_per_request', 'Database queries made by one request', ('endpoint',), COUNT_BUCKETS)
+DB_QUERIES = counter('salah_db_queries_total', 'Database queries executed', ('outcome',))
+CACHE_LOOKUPS = counter(
+    'salah_prayer_cache_lookups_total', 'Prayer time cache lookups per day', ('layer', 'result'))
+
+class _RequestMetrics:
+    __slots__ = ('start', 'phases', 'db_queries')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.db_queries = 0
+
+_current = ContextVar('request_metrics', default=None)
+
+def start_request():
+    """Begin collecting phase times for the current request; returns a token for finish_request"""
+    return _current.set(_RequestMetrics())
+
+def finish_request(token, endpoint, method, status):
+    """Record the current request's latency, phase times, query count and status"""
+    current = _current.get()
+    _current.reset(token)
+    if current is None:
+        return
+
+    REQUEST_LATENCY.observe(time.perf_counter() - current.start, endpoint, method)
+    for name, seconds in current.phases.items():
+        REQUEST_PHASE_LATENCY.observe(seconds, endpoint, name)
+    DB_QUERIES_PER_REQUEST.observe(current.db_queries, endpoint)
+    REQUESTS.inc(endpoint, method, str(status))
+    if status >= 400:
+        REQUEST_ERRORS.inc(endpoint, str(status))
+
+@contextmanager
+def phase(name):
+    """Add the time spent in the block to the current request's phase total"""
+    current = _current.get()
+    if current is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        current.phases[name] += time.perf_counter() - start
+
+def record_db_query(ok=True):
+    DB_QUERIES.inc('ok' if ok else 'error')
+    current = _current.get()
+    if current is not None:
+        current.db_queries += 1
+
+def record_cache_lookup(layer, hit, days=1):
+    if days:
+        CACHE_LOOKUPS.inc(layer, 'hit' if hit else 'miss', amount=days)
+
+def cache_hit_ratio():
+    """Share of prayer time day lookups served from either cache layer"""
+    hits = CACHE_LOOKUPS.value('l1', 'hit') + CACHE_LOOKUPS.value('db', 'hit')
+    # Every L1 miss goes on to the database, so requests = L1 hits + L1 misses
+    total = CACHE_LOOKUPS.value('l1', 'hit') + CACHE_LOOKUPS.value('l1', 'miss')
+    return round(hits / total, 4) if total else None
+
+gauge('salah_prayer_cache_hit_ratio', 'Share of prayer time lookups served from cache', cache_hit_ratio)
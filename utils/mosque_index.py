@@ -0,0 +1,307 @@
+# utils/mosque_index.py - In-process spatial index over verified mosques
+#
+# Mosques are bucketed into a fixed lat/lon grid and stored column-wise in
+# NumPy arrays sorted by grid cell. The cells of one latitude row are
+# contiguous in that order, so a radius query is one searchsorted per
+# latitude row of the bounding box plus a vectorized haversine over the
+# candidates. No database round trip is needed.
+#
+# Changed rows are pulled incrementally using mosques.updated_at: replaced
+# rows are masked out of the sorted arrays and their new versions go into a
+# small unsorted delta that queries scan directly. The delta is merged back
+# into the sorted arrays once it grows past a threshold.
+from datetime import datetime
+import logging
+import math
+import os
+import threading
+import time
+
+import numpy as np
+
+from utils.db import execute_query
+from utils.geo import EARTH_RADIUS_KM, bounding_box
+
+logger = logging.getLogger(__name__)
+
+# Grid cell size in degrees (0.1 deg is ~11 km of latitude)
+CELL_DEGREES = float(os.getenv('MOSQUE_INDEX_CELL_DEGREES', '0.1'))
+# Seconds between incremental refreshes
+REFRESH_SECONDS = float(os.getenv('MOSQUE_INDEX_REFRESH_SECONDS', '60'))
+# Seconds between full reloads (the only way to notice hard-deleted rows)
+FULL_RELOAD_SECONDS = float(os.getenv('MOSQUE_INDEX_FULL_RELOAD_SECONDS', '21600'))
+# The delta is merged into the sorted arrays once it has this many rows
+MAX_DELTA_ROWS = int(os.getenv('MOSQUE_INDEX_MAX_DELTA_ROWS', '1000'))
+
+# Payload columns returned for each mosque, as in the SQL query
+PAYLOAD_COLUMNS = ('mosque_id', 'name', 'address', 'city', 'country',
+                   'latitude', 'longitude', 'phone', 'website')
+
+_LOAD_QUERY = """
+    SELECT mosque_id, name, address, city, country,
+           latitude, longitude, phone, website, verified, updated_at
+    FROM mosques
+    {where}
+"""
+
+_N_LAT_CELLS = int(math.ceil(180 / CELL_DEGREES))
+_N_LON_CELLS = int(math.ceil(360 / CELL_DEGREES))
+
+def _cell_rows(lat):
+    return np.minimum(((np.asarray(lat) + 90) / CELL_DEGREES).astype(np.int64), _N_LAT_CELLS - 1)
+
+def _cell_cols(lon):
+    return np.minimum(((np.asarray(lon) + 180) / CELL_DEGREES).astype(np.int64), _N_LON_CELLS - 1)
+
+def _haversine_km(lat, lon, lats, lons):
+    """Vectorized great-circle distance from one point to arrays of points"""
+    phi1 = math.radians(lat)
+    phi2 = np.radians(lats)
+    a = (np.sin((phi2 - phi1) / 2) ** 2 +
+         math.cos(phi1) * np.cos(phi2) * np.sin(np.radians(lons - lon) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+class _Columns:
+    """Column-wise storage for a set of mosques"""
+
+    def __init__(self, rows):
+        self.ids = np.array([r['mosque_id'] for r in rows], dtype=np.int64)
+        self.lat = np.array([float(r['latitude']) for r in rows], dtype=np.float64)
+        self.lon = np.array([float(r['longitude']) for r in rows], dtype=np.float64)
+        self.updated = np.array([r['updated_at'].timestamp() if r['updated_at'] else 0.0 for r in rows],
+                                dtype=np.float64)
+        self.payload = {name: np.array([r[name] for r in rows] + [None], dtype=object)[:-1]
+                        for name in PAYLOAD_COLUMNS}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def take(self, positions):
+        taken = _Columns([])
+        taken.ids = self.ids[positions]
+        taken.lat = self.lat[positions]
+        taken.lon = self.lon[positions]
+        taken.updated = self.updated[positions]
+        taken.payload = {name: values[positions] for name, values in self.payload.items()}
+        return taken
+
+    @staticmethod
+    def concat(parts):
+        merged = _Columns([])
+        merged.ids = np.concatenate([p.ids for p in parts])
+        merged.lat = np.concatenate([p.lat for p in parts])
+        merged.lon = np.concatenate([p.lon for p in parts])
+        merged.updated = np.concatenate([p.updated for p in parts])
+        merged.payload = {name: np.concatenate([p.payload[name] for p in parts]) for name in PAYLOAD_COLUMNS}
+        return merged
+
+class _Snapshot:
+    """
+    Immutable view of the index; refreshes build a new snapshot and swap it in
+
+    main: columns sorted by grid cell, with a live mask for replaced rows
+    delta: small unsorted columns holding rows changed since the last merge
+    """
+
+    def __init__(self, main, live=None, delta=None):
+        order = np.argsort(_cell_rows(main.lat) * _N_LON_CELLS + _cell_cols(main.lon), kind='stable')
+        self.main = main.take(order)
+        self.cells = _cell_rows(self.main.lat) * _N_LON_CELLS + _cell_cols(self.main.lon)
+        self.live = np.ones(len(self.main), dtype=bool) if live is None else live[order]
+        self.delta = delta if delta is not None else _Columns([])
+        # Sorted ids for locating rows of main without a per-mosque dict
+        self.id_order = np.argsort(self.main.ids, kind='stable')
+        self.sorted_ids = self.main.ids[self.id_order]
+
+    def with_changes(self, changed):
+        """New snapshot with changed rows (verified or not) applied"""
+        live = self.live.copy()
+        # Replace delta rows for changed ids, then append the new verified versions
+        keep = ~np.isin(self.delta.ids, changed.ids)
+        positions = np.searchsorted(self.sorted_ids, changed.ids)
+        positions = np.minimum(positions, max(len(self.sorted_ids) - 1, 0))
+        if len(self.sorted_ids):
+            found = self.sorted_ids[positions] == changed.ids
+            live[self.id_order[positions[found]]] = False
+
+        verified = np.array(changed.verified, dtype=bool)
+        delta = _Columns.concat([self.delta.take(np.flatnonzero(keep)),
+                                 changed.take(np.flatnonzero(verified))])
+
+        if len(delta) > MAX_DELTA_ROWS:
+            # Merge the delta into the sorted arrays
+            merged = _Columns.concat([self.main.take(np.flatnonzero(live)), delta])
+            return _Snapshot(merged)
+
+        snapshot = _Snapshot.__new__(_Snapshot)
+        snapshot.main = self.main
+        snapshot.cells = self.cells
+        snapshot.live = live
+        snapshot.delta = delta
+        snapshot.id_order = self.id_order
+        snapshot.sorted_ids = self.sorted_ids
+        return snapshot
+
+    def __len__(self):
+        return int(self.live.sum()) + len(self.delta)
+
+    def within(self, lat, lon, radius_km, limit=None):
+        """(payload columns, distances) of mosques within radius_km, nearest first"""
+        min_lat, max_lat, lon_ranges = bounding_box(lat, lon, radius_km)
+        row_lo, row_hi = _cell_rows([min_lat, max_lat])
+
+        slices = []
+        for row in range(int(row_lo), int(row_hi) + 1):
+            for min_lon, max_lon in lon_ranges:
+                col_lo, col_hi = _cell_cols([min_lon, max_lon])
+                start = np.searchsorted(self.cells, row * _N_LON_CELLS + col_lo, side='left')
+                end = np.searchsorted(self.cells, row * _N_LON_CELLS + col_hi, side='right')
+                if end > start:
+                    slices.append(np.arange(start, end))
+
+        candidates = np.concatenate(slices) if slices else np.empty(0, dtype=np.intp)
+        candidates = candidates[self.live[candidates]]
+        n_main = len(candidates)
+
+        # Distances for main candidates followed by every delta row
+        lats = np.concatenate([self.main.lat[candidates], self.delta.lat])
+        lons = np.concatenate([self.main.lon[candidates], self.delta.lon])
+        distances = _haversine_km(lat, lon, lats, lons)
+        inside = np.flatnonzero(distances < radius_km)
+        order = inside[np.argsort(distances[inside], kind='stable')][:limit]
+
+        # Only gather payload for the rows being returned
+        from_main = order < n_main
+        main_pos = candidates[order[from_main]]
+        delta_pos = order[~from_main] - n_main
+        payload = {}
+        for name in PAYLOAD_COLUMNS:
+            values = np.empty(len(order), dtype=object)
+            values[from_main] = self.main.payload[name][main_pos]
+            values[~from_main] = self.delta.payload[name][delta_pos]
+            payload[name] = values
+        return payload, distances[order]
+
+class MosqueIndex:
+    """
+    Spatial index over verified mosques, kept in sync with the mosques table
+
+    Queries read an immutable snapshot, so they never block on a refresh.
+    """
+
+    def __init__(self):
+        self._snapshot = None
+        self._watermark = None
+        self._last_full_load = 0.0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def ready(self):
+        return self._snapshot is not None
+
+    def load(self):
+        """(Re)build the whole index from the verified rows of mosques"""
+        rows = execute_query(_LOAD_QUERY.format(where='WHERE verified = TRUE'))
+        all_rows = _Columns(rows)
+        with self._lock:
+            self._snapshot = _Snapshot(all_rows)
+            self._watermark = max((r['updated_at'] for r in rows if r['updated_at']), default=datetime.min)
+            self._last_full_load = time.monotonic()
+        logger.info("Mosque index loaded: %d mosques", len(all_rows))
+
+    def refresh(self):
+        """Apply rows inserted or updated since the last load/refresh"""
+        if not self.ready or time.monotonic() - self._last_full_load > FULL_RELOAD_SECONDS:
+            self.load()
+            return
+
+        rows = execute_query(
+            _LOAD_QUERY.format(where='WHERE updated_at >= %s ORDER BY updated_at'),
+            (self._watermark,)
+        )
+        with self._lock:
+            snapshot = self._snapshot
+            # The watermark row itself comes back every time; skip versions already applied
+            rows = [r for r in rows if not self._is_current(snapshot, r)]
+            if not rows:
+                return
+            changed = _Columns(rows)
+            changed.verified = [bool(r['verified']) for r in rows]
+            self._snapshot = snapshot.with_changes(changed)
+            self._watermark = max(self._watermark, rows[-1]['updated_at'])
+
+    @staticmethod
+    def _is_current(snapshot, row):
+        stamp = row['updated_at'].timestamp() if row['updated_at'] else 0.0
+        mosque_id = row['mosque_id']
+        in_delta = np.flatnonzero(snapshot.delta.ids == mosque_id)
+        if len(in_delta):
+            return snapshot.delta.updated[in_delta[-1]] == stamp
+        pos = np.searchsorted(snapshot.sorted_ids, mosque_id)
+        if pos < len(snapshot.sorted_ids) and snapshot.sorted_ids[pos] == mosque_id:
+            main_pos = snapshot.id_order[pos]
+            if snapshot.live[main_pos]:
+                return snapshot.main.updated[main_pos] == stamp
+        return not row['verified']
+
+    def start(self):
+        """Load the index and keep it refreshed from a background thread"""
+        try:
+            self.load()
+        except Exception as e:
+            logger.warning("Mosque index load failed, falling back to SQL: %s", e)
+
+        def run():
+            while not self._stop.wait(REFRESH_SECONDS):
+                try:
+                    self.refresh()
+                except Exception as e:
+                    logger.warning("Mosque index refresh failed: %s", e)
+
+        self._thread = threading.Thread(target=run, name='mosque-index-refresh', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def within(self, lat, lon, radius_km, limit=50):
+        """
+        Find mosques within radius_km of a point
+
+        Returns:
+            List of mosque dicts with a 'distance' (km) key, nearest first
+        """
+        payload, distances = self._snapshot.within(lat, lon, radius_km, limit)
+        return self._to_dicts(payload, distances)
+
+    def nearest(self, lat, lon, k=10):
+        """Find the k nearest mosques, widening the search radius as needed"""
+        snapshot = self._snapshot
+        radius = 10.0
+        while True:
+            payload, distances = snapshot.within(lat, lon, radius, k)
+            if len(distances) >= k or radius >= math.pi * EARTH_RADIUS_KM:
+                return self._to_dicts(payload, distances)
+            radius *= 4
+
+    @staticmethod
+    def _to_dicts(payload, distances):
+        columns = [payload[name].tolist() for name in PAYLOAD_COLUMNS]
+        columns.append(distances.tolist())
+        keys = PAYLOAD_COLUMNS + ('distance',)
+        return [dict(zip(keys, row)) for row in zip(*columns)]
+
+    def stats(self):
+        snapshot = self._snapshot
+        if snapshot is None:
+            return {'ready': False}
+        return {
+            'ready': True,
+            'mosques': len(snapshot),
+            'delta_rows': len(snapshot.delta),
+            'watermark': self._watermark.isoformat() if self._watermark else None,
+        }
+
+mosque_index = MosqueIndex()
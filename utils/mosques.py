@@ -0,0 +1,74 @@
+# utils/mosques.py - Nearby mosque search shared by the mosque endpoints
+#
+# The radius is turned into a lat/lon bounding box first. idx_mosques_coords
+# can serve that range predicate, so only rows near the point are read, and
+# the exact great-circle distance is computed for those candidates only.
+#
+# When the in-process mosque index is enabled and loaded, it answers the
+# query instead and the database is not touched.
+from utils import async_db
+from utils.db import execute_query
+from utils.geo import bounding_box
+from utils.mosque_index import mosque_index
+
+NEARBY_MOSQUES_QUERY = """
+    SELECT * FROM (
+        SELECT mosque_id, name, address, city, country,
+               latitude, longitude, phone, website,
+               (6371 * acos(LEAST(1.0,
+                   cos(radians(%(lat)s)) * cos(radians(latitude)) *
+                   cos(radians(longitude) - radians(%(lng)s)) +
+                   sin(radians(%(lat)s)) * sin(radians(latitude))
+               ))) AS distance
+        FROM mosques
+        WHERE verified = TRUE
+          AND latitude BETWEEN CAST(%(min_lat)s AS numeric) AND CAST(%(max_lat)s AS numeric)
+          AND ({lon_ranges})
+    ) AS candidates
+    WHERE distance < %(radius)s
+    ORDER BY distance
+    LIMIT %(limit)s
+"""
+
+_LON_RANGE = "longitude BETWEEN CAST(%(min_lon{i})s AS numeric) AND CAST(%(max_lon{i})s AS numeric)"
+
+def build_nearby_query(lat, lng, radius_km, limit=50):
+    """Build the bounding-box prefiltered nearby query and its parameters"""
+    min_lat, max_lat, lon_ranges = bounding_box(lat, lng, radius_km)
+
+    params = {
+        'lat': lat,
+        'lng': lng,
+        'min_lat': min_lat,
+        'max_lat': max_lat,
+        'radius': radius_km,
+        'limit': limit,
+    }
+    clauses = []
+    for i, (min_lon, max_lon) in enumerate(lon_ranges):
+        params[f'min_lon{i}'] = min_lon
+        params[f'max_lon{i}'] = max_lon
+        clauses.append(_LON_RANGE.format(i=i))
+
+    return NEARBY_MOSQUES_QUERY.format(lon_ranges=' OR '.join(clauses)), params
+
+def find_nearby_mosques(lat, lng, radius_km, limit=50):
+    """
+    Find verified mosques within radius_km of a point
+
+    Returns:
+        List of mosque dicts with a 'distance' (km) key, nearest first
+    """
+    if mosque_index.ready:
+        return mosque_index.within(lat, lng, radius_km, limit)
+
+    query, params = build_nearby_query(lat, lng, radius_km, limit)
+    return execute_query(query, params) or []
+
+async def find_nearby_mosques_async(lat, lng, radius_km, limit=50):
+    """find_nearby_mosques for the async app"""
+    if mosque_index.ready:
+        return mosque_index.within(lat, lng, radius_km, limit)
+
+    query, params = build_nearby_query(lat, lng, radius_km, limit)
+    return await async_db.execute_query(query, params) or []
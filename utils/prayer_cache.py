@@ -0,0 +1,607 @@
+# utils/prayer_cache.py - prayer_time_cache reads and writes
+#
+# Rows are looked up by the integer location key (see utils/geo.py), which
+# matches idx_prayer_time_cache_key column for column, so every lookup is
+# an index scan instead of a scan over ROUND()ed coordinates.
+#
+# An in-process LRU (L1) sits in front of the table so hot locations are
+# served without a database round trip.
+#
+# Writes go to L1 immediately and to the table through a write-behind queue,
+# so a request never waits on INSERTs for the days it computed.
+#
+# Lookups have *_async twins for the asyncio app (asgi.py); they share the
+# L1 and row handling and differ only in how the query is sent.
+import atexit
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+import logging
+import os
+import threading
+import time
+
+from utils import async_db, metrics
+from utils.cache_writer import WriteBehindQueue
+from utils.db import execute_query
+from utils.geo import LOCATION_KEY_SCALE, location_key
+from utils.memory_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Max entries in the in-process cache (one entry = one location/day/method); 0 disables it
+L1_CACHE_SIZE = int(os.getenv('PRAYER_L1_CACHE_SIZE', '20000'))
+
+_l1_cache = LRUCache(L1_CACHE_SIZE)
+
+# Write-behind settings; CACHE_WRITE_BEHIND=false writes synchronously instead
+CACHE_WRITE_BEHIND = os.getenv('CACHE_WRITE_BEHIND', 'true').lower() == 'true'
+CACHE_WRITER_QUEUE_SIZE = int(os.getenv('CACHE_WRITER_QUEUE_SIZE', '20000'))
+CACHE_WRITER_BATCH_ROWS = int(os.getenv('CACHE_WRITER_BATCH_ROWS', '500'))
+CACHE_WRITER_FLUSH_SECONDS = float(os.getenv('CACHE_WRITER_FLUSH_SECONDS', '1.0'))
+
+# Lookups are counted per location cell (prayer_cache_cells) so that
+# scripts/maintain_cache.py can evict the least used cells first
+CACHE_USAGE_TRACKING = os.getenv('CACHE_USAGE_TRACKING', 'true').lower() == 'true'
+CACHE_USAGE_FLUSH_SECONDS = float(os.getenv('CACHE_USAGE_FLUSH_SECONDS', '10'))
+
+# How far (degrees) to look for a neighbouring cached cell when serving approximate times
+APPROXIMATE_RADIUS_DEGREES = float(os.getenv('PRAYER_APPROX_RADIUS_DEGREES', '0.25'))
+
+SELECT_CACHED_DAY = """
+    SELECT fajr_time, sunrise_time, dhuhr_time, asr_time,
+           maghrib_time, isha_time
+    FROM prayer_time_cache
+    WHERE lat_key = %s
+      AND lon_key = %s
+      AND calculation_method = %s
+      AND asr_method = %s
+      AND prayer_date = %s
+    LIMIT 1
+"""
+
+SELECT_CACHED_RANGE = """
+    SELECT prayer_date, fajr_time, sunrise_time, dhuhr_time, asr_time,
+           maghrib_time, isha_time
+    FROM prayer_time_cache
+    WHERE lat_key = %s
+      AND lon_key = %s
+      AND calculation_method = %s
+      AND asr_method = %s
+      AND prayer_date BETWEEN %s AND %s
+"""
+
+SELECT_CACHED_RANGE_ORDERED = SELECT_CACHED_RANGE + """
+    ORDER BY prayer_date
+"""
+
+# One query for many (location, method, asr_method, date range) keys
+SELECT_CACHED_BULK = """
+    SELECT k.idx, c.prayer_date, c.fajr_time, c.sunrise_time, c.dhuhr_time,
+           c.asr_time, c.maghrib_time, c.isha_time
+    FROM unnest(%s::int[], %s::int[], %s::int[], %s::text[], %s::text[], %s::date[], %s::date[])
+         AS k(idx, lat_key, lon_key, calculation_method, asr_method, first_date, last_date)
+    JOIN prayer_time_cache c
+      ON c.lat_key = k.lat_key
+     AND c.lon_key = k.lon_key
+     AND c.calculation_method = k.calculation_method
+     AND c.asr_method = k.asr_method
+     AND c.prayer_date BETWEEN k.first_date AND k.last_date
+"""
+
+UPSERT_CACHED_DAY = """
+    INSERT INTO prayer_time_cache
+    (lat_key, lon_key, latitude, longitude, calculation_method, asr_method, prayer_date,
+     fajr_time, sunrise_time, dhuhr_time, asr_time, maghrib_time, isha_time)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON CONFLICT (lat_key, lon_key, calculation_method, asr_method, prayer_date)
+    DO UPDATE SET
+        fajr_time = EXCLUDED.fajr_time,
+        sunrise_time = EXCLUDED.sunrise_time,
+        dhuhr_time = EXCLUDED.dhuhr_time,
+        asr_time = EXCLUDED.asr_time,
+        maghrib_time = EXCLUDED.maghrib_time,
+        isha_time = EXCLUDED.isha_time
+"""
+
+# Multi-row version of UPSERT_CACHED_DAY: one array parameter per column
+UPSERT_CACHED_ROWS = """
+    INSERT INTO prayer_time_cache
+    (lat_key, lon_key, latitude, longitude, calculation_method, asr_method, prayer_date,
+     fajr_time, sunrise_time, dhuhr_time, asr_time, maghrib_time, isha_time)
+    SELECT * FROM unnest(
+        %s::int[], %s::int[], %s::numeric[], %s::numeric[], %s::text[], %s::text[], %s::date[],
+        %s::time[], %s::time[], %s::time[], %s::time[], %s::time[], %s::time[]
+    )
+    ON CONFLICT (lat_key, lon_key, calculation_method, asr_method, prayer_date)
+    DO UPDATE SET
+        fajr_time = EXCLUDED.fajr_time,
+        sunrise_time = EXCLUDED.sunrise_time,
+        dhuhr_time = EXCLUDED.dhuhr_time,
+        asr_time = EXCLUDED.asr_time,
+        maghrib_time = EXCLUDED.maghrib_time,
+        isha_time = EXCLUDED.isha_time
+"""
+
+# Add lookup counts per cell; one array parameter per column
+UPSERT_CELL_USAGE = """
+    INSERT INTO prayer_cache_cells (lat_key, lon_key, hits, last_used)
+    SELECT u.lat_key, u.lon_key, u.hits, CURRENT_DATE
+    FROM unnest(%s::int[], %s::int[], %s::bigint[]) AS u(lat_key, lon_key, hits)
+    ON CONFLICT (lat_key, lon_key)
+    DO UPDATE SET
+        hits = prayer_cache_cells.hits + EXCLUDED.hits,
+        last_used = EXCLUDED.last_used
+"""
+
+# Nearest cached cells around a location for a date range (plus the day before),
+# for serving approximate times while prayer times can't be computed
+SELECT_APPROXIMATE_RANGE = """
+    SELECT prayer_date, fajr_time, sunrise_time, dhuhr_time, asr_time,
+           maghrib_time, isha_time,
+           (lat_key - %(lat_key)s)::bigint * (lat_key - %(lat_key)s)
+           + (lon_key - %(lon_key)s)::bigint * (lon_key - %(lon_key)s) AS distance
+    FROM prayer_time_cache
+    WHERE lat_key BETWEEN %(lat_key)s - %(radius)s AND %(lat_key)s + %(radius)s
+      AND lon_key BETWEEN %(lon_key)s - %(radius)s AND %(lon_key)s + %(radius)s
+      AND calculation_method = %(method)s
+      AND asr_method = %(asr_method)s
+      AND prayer_date BETWEEN %(first)s AND %(last)s
+    ORDER BY prayer_date, distance
+"""
+
+def _l1_key(lat_key, lon_key, date_str, method, asr_method):
+    return (lat_key, lon_key, date_str, method, asr_method)
+
+def _end_of_day():
+    """Epoch timestamp of the next UTC midnight, when L1 entries expire"""
+    tomorrow = datetime.now(timezone.utc).date() + timedelta(days=1)
+    return datetime(tomorrow.year, tomorrow.month, tomorrow.day, tzinfo=timezone.utc).timestamp()
+
+def _l1_get(lat_key, lon_key, date_str, method, asr_method):
+    times = _l1_cache.get(_l1_key(lat_key, lon_key, date_str, method, asr_method))
+    return dict(times) if times else None
+
+def _l1_set(lat_key, lon_key, date_str, method, asr_method, times):
+    _l1_cache.set(_l1_key(lat_key, lon_key, date_str, method, asr_method), dict(times), _end_of_day())
+
+def _l1_discard(lat_key, lon_key, date_str, method, asr_method):
+    _l1_cache.discard(_l1_key(lat_key, lon_key, date_str, method, asr_method))
+
+def get_l1_cache_stats():
+    """Get hit/miss/eviction counters of the in-process cache"""
+    return _l1_cache.stats()
+
+def write_cell_usage(batches):
+    """Add the hits of each Counter of (lat_key, lon_key) -> hits in batches to prayer_cache_cells"""
+    hits = Counter()
+    for counts in batches:
+        hits.update(counts)
+    execute_query(UPSERT_CELL_USAGE, [list(column) for column in zip(*((*cell, n) for cell, n in hits.items()))])
+
+cell_usage_writer = WriteBehindQueue(
+    write_cell_usage,
+    name='prayer-cache-usage',
+    max_queue=CACHE_WRITER_QUEUE_SIZE,
+    batch_size=CACHE_WRITER_BATCH_ROWS,
+    flush_interval=CACHE_USAGE_FLUSH_SECONDS
+)
+
+# Lookups are summed per cell in memory and handed to cell_usage_writer as one
+# Counter per CACHE_USAGE_FLUSH_SECONDS, so an L1 hit only bumps a counter
+_cell_hits = Counter()
+_cell_hits_lock = threading.Lock()
+_cell_hits_since = time.monotonic()
+
+def _take_cell_hits():
+    global _cell_hits, _cell_hits_since
+    with _cell_hits_lock:
+        hits, _cell_hits = _cell_hits, Counter()
+        _cell_hits_since = time.monotonic()
+    return hits
+
+def _record_use(lat_key, lon_key):
+    if not CACHE_USAGE_TRACKING:
+        return
+    with _cell_hits_lock:
+        _cell_hits[(lat_key, lon_key)] += 1
+        due = time.monotonic() - _cell_hits_since >= CACHE_USAGE_FLUSH_SECONDS
+    if due:
+        hits = _take_cell_hits()
+        if hits:
+            cell_usage_writer.put(hits)
+
+@atexit.register
+def _write_remaining_cell_hits():
+    """Write the counts of the last interval directly, the writer thread may already be stopped"""
+    hits = _take_cell_hits()
+    if hits:
+        try:
+            write_cell_usage([hits])
+        except Exception as e:
+            logger.warning("Failed to write cache usage: %s", e)
+
+def _row_to_times(row):
+    """Convert a prayer_time_cache row to a times dict (HH:MM strings)"""
+    return {
+        'fajr': str(row['fajr_time'])[:-3] if row['fajr_time'] else '00:00',
+        'sunrise': str(row['sunrise_time'])[:-3] if row['sunrise_time'] else '00:00',
+        'dhuhr': str(row['dhuhr_time'])[:-3] if row['dhuhr_time'] else '00:00',
+        'asr': str(row['asr_time'])[:-3] if row['asr_time'] else '00:00',
+        'maghrib': str(row['maghrib_time'])[:-3] if row['maghrib_time'] else '00:00',
+        'isha': str(row['isha_time'])[:-3] if row['isha_time'] else '00:00'
+    }
+
+def _day_from_l1(lat_key, lon_key, date_str, method, asr_method):
+    _record_use(lat_key, lon_key)
+    cached = _l1_get(lat_key, lon_key, date_str, method, asr_method)
+    metrics.record_cache_lookup('l1', hit=bool(cached))
+    return cached
+
+def _apply_day_row(row, lat_key, lon_key, date_str, method, asr_method):
+    metrics.record_cache_lookup('db', hit=bool(row))
+    if not row:
+        return None
+    times = _row_to_times(row)
+    _l1_set(lat_key, lon_key, date_str, method, asr_method, times)
+    return times
+
+def get_cached_prayer_times(lat, lon, date_str, method, asr_method):
+    """Get cached prayer times from database"""
+    lat_key, lon_key = location_key(lat, lon)
+    cached = _day_from_l1(lat_key, lon_key, date_str, method, asr_method)
+    if cached:
+        return cached
+    
+    try:
+        result = execute_query(
+            SELECT_CACHED_DAY,
+            (lat_key, lon_key, method, asr_method, date_str),
+            fetch_one=True
+        )
+        return _apply_day_row(result, lat_key, lon_key, date_str, method, asr_method)
+    except Exception as e:
+        logger.warning("Cache lookup failed: %s", e)
+    
+    return None
+
+async def get_cached_prayer_times_async(lat, lon, date_str, method, asr_method):
+    """get_cached_prayer_times for the async app"""
+    lat_key, lon_key = location_key(lat, lon)
+    cached = _day_from_l1(lat_key, lon_key, date_str, method, asr_method)
+    if cached:
+        return cached
+    
+    try:
+        result = await async_db.execute_query(
+            SELECT_CACHED_DAY,
+            (lat_key, lon_key, method, asr_method, date_str),
+            fetch_one=True
+        )
+        return _apply_day_row(result, lat_key, lon_key, date_str, method, asr_method)
+    except Exception as e:
+        logger.warning("Cache lookup failed: %s", e)
+    
+    return None
+
+def _range_from_l1(lat_key, lon_key, dates, method, asr_method):
+    """Split dates into (found in L1, remaining)"""
+    _record_use(lat_key, lon_key)
+    found = {}
+    for date in dates:
+        times = _l1_get(lat_key, lon_key, date.strftime('%Y-%m-%d'), method, asr_method)
+        if times:
+            found[date] = times
+    
+    remaining = [date for date in dates if date not in found]
+    metrics.record_cache_lookup('l1', hit=True, days=len(found))
+    metrics.record_cache_lookup('l1', hit=False, days=len(remaining))
+    return found, remaining
+
+def _range_params(lat_key, lon_key, method, asr_method, remaining):
+    first = min(remaining).strftime('%Y-%m-%d')
+    last = max(remaining).strftime('%Y-%m-%d')
+    return (lat_key, lon_key, method, asr_method, first, last)
+
+def _apply_range_rows(rows, lat_key, lon_key, method, asr_method, remaining, found):
+    """Add the remaining dates found in rows to found (and L1)"""
+    cached = {row['prayer_date'].strftime('%Y-%m-%d'): _row_to_times(row) for row in rows}
+    hits = 0
+    for date in remaining:
+        date_str = date.strftime('%Y-%m-%d')
+        times = cached.get(date_str)
+        if times:
+            hits += 1
+            found[date] = times
+            _l1_set(lat_key, lon_key, date_str, method, asr_method, times)
+    metrics.record_cache_lookup('db', hit=True, days=hits)
+    metrics.record_cache_lookup('db', hit=False, days=len(remaining) - hits)
+
+def get_cached_prayer_times_range(lat, lon, dates, method, asr_method):
+    """
+    Get cached prayer times for many dates with a single range query
+
+    Args:
+        dates: List of dates (or datetimes) for one location
+    
+    Returns:
+        (found, missing): dict of date -> times for cached dates, and the
+        list of dates that are not cached
+    """
+    if not dates:
+        return {}, []
+    
+    lat_key, lon_key = location_key(lat, lon)
+    found, remaining = _range_from_l1(lat_key, lon_key, dates, method, asr_method)
+    if not remaining:
+        return found, []
+    
+    try:
+        rows = execute_query(
+            SELECT_CACHED_RANGE,
+            _range_params(lat_key, lon_key, method, asr_method, remaining)
+        )
+        _apply_range_rows(rows, lat_key, lon_key, method, asr_method, remaining, found)
+    except Exception as e:
+        logger.warning("Cache range lookup failed: %s", e)
+    
+    missing = [date for date in dates if date not in found]
+    return found, missing
+
+async def get_cached_prayer_times_range_async(lat, lon, dates, method, asr_method):
+    """get_cached_prayer_times_range for the async app"""
+    if not dates:
+        return {}, []
+    
+    lat_key, lon_key = location_key(lat, lon)
+    found, remaining = _range_from_l1(lat_key, lon_key, dates, method, asr_method)
+    if not remaining:
+        return found, []
+    
+    try:
+        rows = await async_db.execute_query(
+            SELECT_CACHED_RANGE,
+            _range_params(lat_key, lon_key, method, asr_method, remaining)
+        )
+        _apply_range_rows(rows, lat_key, lon_key, method, asr_method, remaining, found)
+    except Exception as e:
+        logger.warning("Cache range lookup failed: %s", e)
+    
+    missing = [date for date in dates if date not in found]
+    return found, missing
+
+def get_cached_prayer_times_between(lat, lon, first, last, method, asr_method):
+    """
+    Get the cached days of first..last in date order, skipping L1
+
+    Reads every row with one query, so the pooled connection is released
+    before a caller streams them out. Exports call it for one chunk of
+    EXPORT_CHUNK_DAYS days at a time.
+
+    Returns:
+        List of (date, times) for every cached day; empty on a database
+        error (logged), leaving every day to be computed
+    """
+    lat_key, lon_key = location_key(lat, lon)
+    _record_use(lat_key, lon_key)
+    try:
+        rows = execute_query(SELECT_CACHED_RANGE_ORDERED, (lat_key, lon_key, method, asr_method, first, last))
+    except Exception as e:
+        logger.warning("Cache range read failed: %s", e)
+        return []
+    return [(row['prayer_date'], _row_to_times(row)) for row in rows]
+
+def get_cached_prayer_times_bulk(lookups):
+    """
+    Get cached prayer times for many locations with a single query
+
+    Args:
+        lookups: List of (lat, lon, dates, method, asr_method)
+
+    Returns:
+        List of (found, missing) per lookup, as in get_cached_prayer_times_range
+    """
+    results = []
+    pending = []
+    for idx, (lat, lon, dates, method, asr_method) in enumerate(lookups):
+        lat_key, lon_key = location_key(lat, lon)
+        _record_use(lat_key, lon_key)
+        found = {}
+        for date in dates:
+            times = _l1_get(lat_key, lon_key, date.strftime('%Y-%m-%d'), method, asr_method)
+            if times:
+                found[date] = times
+        results.append(found)
+        remaining = [date for date in dates if date not in found]
+        metrics.record_cache_lookup('l1', hit=True, days=len(found))
+        metrics.record_cache_lookup('l1', hit=False, days=len(remaining))
+        if remaining:
+            pending.append((idx, lat_key, lon_key, method, asr_method, remaining))
+    
+    if pending:
+        try:
+            columns = list(zip(*(
+                (idx, lat_key, lon_key, method, asr_method,
+                 min(remaining).strftime('%Y-%m-%d'), max(remaining).strftime('%Y-%m-%d'))
+                for idx, lat_key, lon_key, method, asr_method, remaining in pending
+            )))
+            rows = execute_query(SELECT_CACHED_BULK, [list(column) for column in columns])
+            
+            cached = {}
+            for row in rows:
+                cached[(row['idx'], row['prayer_date'].strftime('%Y-%m-%d'))] = _row_to_times(row)
+            for idx, lat_key, lon_key, method, asr_method, remaining in pending:
+                for date in remaining:
+                    date_str = date.strftime('%Y-%m-%d')
+                    times = cached.get((idx, date_str))
+                    if times:
+                        results[idx][date] = times
+                        _l1_set(lat_key, lon_key, date_str, method, asr_method, times)
+            pending_days = sum(len(p[-1]) for p in pending)
+            metrics.record_cache_lookup('db', hit=True, days=len(cached))
+            metrics.record_cache_lookup('db', hit=False, days=pending_days - len(cached))
+        except Exception as e:
+            logger.warning("Cache bulk lookup failed: %s", e)
+    
+    return [
+        (found, [date for date in lookup[2] if date not in found])
+        for found, lookup in zip(results, lookups)
+    ]
+
+def _cache_row(lat_key, lon_key, date_str, method, asr_method, times):
+    return (
+        lat_key, lon_key,
+        lat_key / LOCATION_KEY_SCALE, lon_key / LOCATION_KEY_SCALE,
+        method, asr_method, date_str,
+        times['fajr'], times['sunrise'], times['dhuhr'],
+        times['asr'], times['maghrib'], times['isha']
+    )
+
+def write_cache_rows(rows):
+    """Upsert many cache rows with a single statement"""
+    # A statement can't update the same row twice, keep the last row per key
+    unique = {}
+    for row in rows:
+        unique[row[:2] + row[4:7]] = row
+    execute_query(UPSERT_CACHED_ROWS, [list(column) for column in zip(*unique.values())])
+
+cache_writer = WriteBehindQueue(
+    write_cache_rows,
+    name='prayer-cache-writer',
+    max_queue=CACHE_WRITER_QUEUE_SIZE,
+    batch_size=CACHE_WRITER_BATCH_ROWS,
+    flush_interval=CACHE_WRITER_FLUSH_SECONDS
+)
+
+def get_cache_writer_stats():
+    """Get queue depth and write counters of the write-behind cache writer"""
+    return cache_writer.stats()
+
+def cache_prayer_times(lat, lon, date_str, method, asr_method, times, l1=True):
+    """
+    Cache calculated prayer times in memory now and in the database in the background
+    l1=False only writes the database (bulk exports would flush hot entries out of L1)
+    and drops any L1 entry for the day, which the new times replace
+    """
+    lat_key, lon_key = location_key(lat, lon)
+    if l1:
+        _l1_set(lat_key, lon_key, date_str, method, asr_method, times)
+    else:
+        _l1_discard(lat_key, lon_key, date_str, method, asr_method)
+    row = _cache_row(lat_key, lon_key, date_str, method, asr_method, times)
+    
+    if CACHE_WRITE_BEHIND:
+        if not cache_writer.put(row):
+            logger.debug("Cache write queue full, not persisting %s", date_str)
+        return
+    
+    try:
+        execute_query(UPSERT_CACHED_DAY, row)
+        logger.debug("Prayer times cached for %s", date_str)
+    except Exception as e:
+        logger.warning("Failed to cache prayer times: %s", e)
+
+async def cache_prayer_times_async(lat, lon, times_by_date, method, asr_method):
+    """
+    cache_prayer_times for the async app, for a dict of date -> times
+
+    Never blocks the event loop: write-behind rows are dropped from a full
+    queue as in cache_prayer_times, and direct writes go through async_db as
+    one statement.
+    """
+    lat_key, lon_key = location_key(lat, lon)
+    rows = []
+    for date, times in times_by_date.items():
+        date_str = date.strftime('%Y-%m-%d')
+        _l1_set(lat_key, lon_key, date_str, method, asr_method, times)
+        rows.append(_cache_row(lat_key, lon_key, date_str, method, asr_method, times))
+    
+    if CACHE_WRITE_BEHIND:
+        dropped = sum(not cache_writer.put(row) for row in rows)
+        if dropped:
+            logger.warning("Cache write queue full, not persisting %d days", dropped)
+        return
+    
+    try:
+        await async_db.execute_query(UPSERT_CACHED_ROWS, [list(column) for column in zip(*rows)])
+    except Exception as e:
+        logger.warning("Failed to cache prayer times: %s", e)
+
+def _approximate_from_l1(lat_key, lon_key, dates, method, asr_method):
+    """Previous-day times of the same cell from L1; returns (found, remaining)"""
+    found = {}
+    for date in dates:
+        previous = (date - timedelta(days=1)).strftime('%Y-%m-%d')
+        times = _l1_get(lat_key, lon_key, previous, method, asr_method)
+        if times:
+            found[date] = times
+    return found, [date for date in dates if date not in found]
+
+def _approximate_params(lat_key, lon_key, method, asr_method, remaining):
+    return {
+        'lat_key': lat_key,
+        'lon_key': lon_key,
+        'radius': int(APPROXIMATE_RADIUS_DEGREES * LOCATION_KEY_SCALE),
+        'method': method,
+        'asr_method': asr_method,
+        'first': (min(remaining) - timedelta(days=1)).strftime('%Y-%m-%d'),
+        'last': max(remaining).strftime('%Y-%m-%d'),
+    }
+
+def _apply_approximate_rows(rows, remaining, found):
+    # Rows come nearest first within each date, keep the first per date
+    nearest = {}
+    for row in rows:
+        nearest.setdefault(row['prayer_date'].strftime('%Y-%m-%d'), row)
+    for date in remaining:
+        row = (nearest.get(date.strftime('%Y-%m-%d')) or
+               nearest.get((date - timedelta(days=1)).strftime('%Y-%m-%d')))
+        if row:
+            found[date] = _row_to_times(row)
+
+def get_approximate_prayer_times(lat, lon, dates, method, asr_method):
+    """
+    Find stand-in times for dates that can't be computed right now
+
+    For each date uses the nearest cached cell within
+    APPROXIMATE_RADIUS_DEGREES on that date, or else the previous day's
+    times of the nearest cell. Either is within a minute or two of the
+    real times.
+
+    Returns:
+        Dict of date -> times for the dates a stand-in was found for
+    """
+    if not dates:
+        return {}
+
+    lat_key, lon_key = location_key(lat, lon)
+    found, remaining = _approximate_from_l1(lat_key, lon_key, dates, method, asr_method)
+    if not remaining:
+        return found
+
+    try:
+        rows = execute_query(SELECT_APPROXIMATE_RANGE,
+                             _approximate_params(lat_key, lon_key, method, asr_method, remaining))
+        _apply_approximate_rows(rows, remaining, found)
+    except Exception as e:
+        logger.warning("Approximate times lookup failed: %s", e)
+
+    return found
+
+async def get_approximate_prayer_times_async(lat, lon, dates, method, asr_method):
+    """get_approximate_prayer_times for the async app"""
+    if not dates:
+        return {}
+
+    lat_key, lon_key = location_key(lat, lon)
+    found, remaining = _approximate_from_l1(lat_key, lon_key, dates, method, asr_method)
+    if not remaining:
+        return found
+
+    try:
+        rows = await async_db.execute_query(SELECT_APPROXIMATE_RANGE,
+                                            _approximate_params(lat_key, lon_key, method, asr_method, remaining))
+        _apply_approximate_rows(rows, remaining, found)
+    except Exception as e:
+        logger.warning("Approximate times lookup failed: %s", e)
+
+    return found
@@ -0,0 +1,232 @@
+# utils/prayer_calc.py - Local astronomical prayer time calculation
+#
+# Port of the PrayTimes.org algorithm, which is what api.aladhan.com runs
+# server-side. Using the same formulas, method parameters and high latitude
+# rule (angle based) gives the same HH:MM output without a network call.
+import math
+
+# Twilight angles (degrees below the horizon) per calculation method.
+# 'isha_minutes' means Isha is a fixed interval after Maghrib instead of an angle.
+# 'maghrib' is only set for methods that delay Maghrib past sunset.
+METHODS = {
+    'ISNA': {'fajr': 15, 'isha': 15},
+    'MWL': {'fajr': 18, 'isha': 17},
+    'EGYPTIAN': {'fajr': 19.5, 'isha': 17.5},
+    'KARACHI': {'fajr': 18, 'isha': 18},
+    'MAKKAH': {'fajr': 18.5, 'isha_minutes': 90},
+    'TEHRAN': {'fajr': 17.7, 'isha': 14, 'maghrib': 4.5},
+}
+
+DEFAULT_METHOD = 'ISNA'
+
+# Shadow length factor for Asr (Standard = Shafi, Maliki, Hanbali)
+ASR_FACTORS = {
+    'standard': 1,
+    'hanafi': 2,
+}
+
+PRAYER_NAMES = ('fajr', 'sunrise', 'dhuhr', 'asr', 'maghrib', 'isha')
+
+class UndefinedTimeError(ValueError):
+    """A prayer time does not exist on some day (polar day/night)"""
+
+# Initial guesses (hours) used to evaluate the sun position for each time
+_INITIAL_TIMES = {
+    'fajr': 5, 'sunrise': 6, 'dhuhr': 12, 'asr': 13,
+    'sunset': 18, 'maghrib': 18, 'isha': 18,
+}
+
+def get_method_params(method):
+    """Get the angle parameters for a method (unknown methods fall back to ISNA)"""
+    return METHODS.get(method, METHODS[DEFAULT_METHOD])
+
+def get_asr_factor(asr_method):
+    """Get the Asr shadow factor ('hanafi' = 2, anything else = 1)"""
+    return ASR_FACTORS.get(str(asr_method).lower(), 1)
+
+# ============= MATH HELPERS =============
+
+def _dsin(d):
+    return math.sin(math.radians(d))
+
+def _dcos(d):
+    return math.cos(math.radians(d))
+
+def _dtan(d):
+    return math.tan(math.radians(d))
+
+def _darcsin(x):
+    return math.degrees(math.asin(x))
+
+def _darccos(x):
+    # Out of range means the sun never reaches this angle (high latitudes)
+    if x < -1 or x > 1:
+        return math.nan
+    return math.degrees(math.acos(x))
+
+def _darctan2(y, x):
+    return math.degrees(math.atan2(y, x))
+
+def _darccot(x):
+    return math.degrees(math.atan(1 / x))
+
+def _fix_angle(a):
+    return a % 360
+
+def _fix_hour(h):
+    return h % 24
+
+def _time_diff(t1, t2):
+    return _fix_hour(t2 - t1)
+
+# ============= ASTRONOMY =============
+
+def julian_date(year, month, day):
+    """Julian date at 0h UT of a Gregorian calendar date"""
+    if month <= 2:
+        year -= 1
+        month += 12
+    a = math.floor(year / 100)
+    b = 2 - a + math.floor(a / 4)
+    return (math.floor(365.25 * (year + 4716)) + math.floor(30.6001 * (month + 1))
+            + day + b - 1524.5)
+
+def sun_position(jd):
+    """
+    Compute the sun's declination and the equation of time
+
+    Returns:
+        (declination in degrees, equation of time in hours)
+    """
+    d = jd - 2451545.0
+    g = _fix_angle(357.529 + 0.98560028 * d)
+    q = _fix_angle(280.459 + 0.98564736 * d)
+    l = _fix_angle(q + 1.915 * _dsin(g) + 0.020 * _dsin(2 * g))
+    e = 23.439 - 0.00000036 * d
+
+    ra = _darctan2(_dcos(e) * _dsin(l), _dcos(l)) / 15
+    eqt = q / 15 - _fix_hour(ra)
+    decl = _darcsin(_dsin(e) * _dsin(l))
+    return decl, eqt
+
+# ============= PRAYER TIMES =============
+
+class _DayCalculator:
+    """Evaluates sun-angle times for one location and day"""
+
+    def __init__(self, lat, lon, jdate):
+        self.lat = lat
+        self.lon = lon
+        self.jdate = jdate
+
+    def mid_day(self, time):
+        _, eqt = sun_position(self.jdate + time / 24)
+        return _fix_hour(12 - eqt)
+
+    def sun_angle_time(self, angle, time, ccw=False):
+        decl, _ = sun_position(self.jdate + time / 24)
+        noon = self.mid_day(time)
+        t = _darccos((-_dsin(angle) - _dsin(decl) * _dsin(self.lat)) /
+                     (_dcos(decl) * _dcos(self.lat))) / 15
+        return noon - t if ccw else noon + t
+
+    def asr_time(self, factor, time):
+        decl, _ = sun_position(self.jdate + time / 24)
+        angle = -_darccot(factor + _dtan(abs(self.lat - decl)))
+        return self.sun_angle_time(angle, time)
+
+def _adjust_high_lat_time(time, base, angle, night, ccw=False):
+    """Clamp a twilight time to an angle-based portion of the night"""
+    portion = angle / 60 * night
+    if math.isnan(time):
+        return base - portion if ccw else base + portion
+    diff = _time_diff(time, base) if ccw else _time_diff(base, time)
+    if diff > portion:
+        time = base - portion if ccw else base + portion
+    return time
+
+def compute_times(lat, lon, year, month, day, tz_offset, method='ISNA', asr_method='standard'):
+    """
+    Compute prayer times as fractional local hours
+
+    Args:
+        lat, lon: Location in degrees
+        year, month, day: Gregorian date
+        tz_offset: UTC offset of the location on that date, in hours
+        method: Calculation method name (see METHODS)
+        asr_method: 'standard' or 'hanafi'
+
+    Returns:
+        Dict of prayer name -> local time in hours (NaN if undefined)
+    """
+    params = get_method_params(method)
+    rise_set_angle = 0.833
+    isha_angle = params.get('isha', params.get('isha_minutes'))
+
+    calc = _DayCalculator(lat, lon, julian_date(year, month, day) - lon / (15 * 24))
+    init = _INITIAL_TIMES
+    times = {
+        'fajr': calc.sun_angle_time(params['fajr'], init['fajr'], ccw=True),
+        'sunrise': calc.sun_angle_time(rise_set_angle, init['sunrise'], ccw=True),
+        'dhuhr': calc.mid_day(init['dhuhr']),
+        'asr': calc.asr_time(get_asr_factor(asr_method), init['asr']),
+        'sunset': calc.sun_angle_time(rise_set_angle, init['sunset']),
+        'isha': calc.sun_angle_time(isha_angle, init['isha']),
+    }
+
+    # Convert from local solar time to the location's clock time
+    shift = tz_offset - lon / 15
+    for name in times:
+        times[name] += shift
+
+    # Angle-based high latitude rule (Aladhan's default)
+    night = _time_diff(times['sunset'], times['sunrise'])
+    times['fajr'] = _adjust_high_lat_time(times['fajr'], times['sunrise'], params['fajr'], night, ccw=True)
+    times['isha'] = _adjust_high_lat_time(times['isha'], times['sunset'], isha_angle, night)
+    if 'maghrib' in params:
+        maghrib = calc.sun_angle_time(params['maghrib'], init['maghrib']) + shift
+        times['maghrib'] = _adjust_high_lat_time(maghrib, times['sunset'], params['maghrib'], night)
+    else:
+        times['maghrib'] = times['sunset']
+
+    if 'isha_minutes' in params:
+        times['isha'] = times['maghrib'] + params['isha_minutes'] / 60
+
+    return {name: times[name] for name in PRAYER_NAMES}
+
+def format_time(hours):
+    """Format fractional hours as HH:MM, rounded to the nearest minute"""
+    hours = _fix_hour(hours + 0.5 / 60)
+    h = math.floor(hours)
+    m = math.floor((hours - h) * 60)
+    return f'{h:02d}:{m:02d}'
+
+def calculate_prayer_times(lat, lon, date, method='ISNA', asr_method='standard', tz_offset=None):
+    """
+    Calculate prayer times for a location and date
+
+    Args:
+        lat, lon: Location in degrees
+        date: date or datetime
+        method: Calculation method name (see METHODS)
+        asr_method: 'standard' or 'hanafi'
+        tz_offset: UTC offset in hours (looked up from the coordinates if None)
+
+    Returns:
+        Dict with fajr, sunrise, dhuhr, asr, maghrib and isha as 'HH:MM'
+
+    Raises:
+        UndefinedTimeError: if the sun does not rise or set on that date (polar day/night)
+    """
+    if tz_offset is None:
+        from utils.timezones import utc_offset_hours
+        tz_offset = utc_offset_hours(lat, lon, date)
+
+    times = compute_times(lat, lon, date.year, date.month, date.day, tz_offset, method, asr_method)
+
+    formatted = {}
+    for name, value in times.items():
+        if math.isnan(value):
+            raise UndefinedTimeError(f"{name} is undefined at latitude {lat} on {date.strftime('%Y-%m-%d')}")
+        formatted[name] = format_time(value)
+    return formatted
@@ -0,0 +1,222 @@
+# utils/profiling.py - Opt-in request profiling for live workers
+#
+# Profiles a random fraction of requests, plus any request sent with the
+# profile header set to the admin token. Results are aggregated per
+# endpoint and served from an admin-only endpoint:
+#
+#   GET    /admin/profile                       endpoints profiled so far
+#   GET    /admin/profile?endpoint=/api/...&format=text|pstats|collapsed
+#   GET    /admin/profile?id=<X-Profile-Id>     one header-triggered request
+#   DELETE /admin/profile                       reset
+#
+# 'cprofile' mode runs cProfile around the request (exact call counts,
+# pstats/text output). 'sample' mode has one background thread sample the
+# stacks of profiled requests every few milliseconds (collapsed-stack output
+# for flamegraph.pl/speedscope, much less overhead on deep call chains).
+# Nothing is installed unless init_app is called, so disabled costs nothing.
+import cProfile
+import hmac
+import io
+import logging
+import marshal
+import pstats
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+
+from flask import Response, g, jsonify, request
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Profile'
+MODES = ('cprofile', 'sample')
+
+# Header-triggered profiles kept for lookup by id
+_RECENT_PROFILES = 50
+
+class _Sampler:
+    """Samples the stacks of registered threads while any are registered"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._threads = {}  # thread id -> Counter of collapsed stacks
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._thread = None
+
+    def start(self, thread_id):
+        stacks = Counter()
+        with self._lock:
+            self._threads[thread_id] = stacks
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+                self._thread.start()
+            self._wakeup.notify()
+        return stacks
+
+    def stop(self, thread_id):
+        with self._lock:
+            self._threads.pop(thread_id, None)
+
+    @staticmethod
+    def _collapse(frame):
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f'{code.co_name} ({code.co_filename}:{code.co_firstlineno})')
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._threads:
+                    self._wakeup.wait()
+                # Under the lock so a stopped thread's counter is never written again
+                frames = sys._current_frames()
+                for thread_id, stacks in self._threads.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stacks[self._collapse(frame)] += 1
+                del frames
+            time.sleep(self.interval)
+
+class RequestProfiler:
+    """Per-endpoint profile aggregation for a Flask app"""
+
+    def __init__(self, mode='cprofile', sample_rate=0.0, admin_token='', sample_interval=0.005):
+        if mode not in MODES:
+            raise ValueError(f'Unknown profiling mode {mode!r}, expected one of {MODES}')
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self.admin_token = admin_token
+        self._sampler = _Sampler(sample_interval) if mode == 'sample' else None
+        self._lock = threading.Lock()
+        self._stats = {}      # endpoint -> pstats.Stats (cprofile mode)
+        self._stacks = {}     # endpoint -> Counter of collapsed stacks (sample mode)
+        self._requests = Counter()
+        self._recent = OrderedDict()  # profile id -> (endpoint, pstats.Stats or Counter)
+
+    def init_app(self, app):
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        app.add_url_rule('/admin/profile', 'admin_profile', self._admin_view, methods=['GET', 'DELETE'])
+        logger.info('Request profiling enabled (%s, sample rate %s)', self.mode, self.sample_rate)
+
+    def _is_admin(self, token):
+        return bool(self.admin_token) and bool(token) and hmac.compare_digest(token, self.admin_token)
+
+    # ============= PER REQUEST =============
+
+    def _before_request(self):
+        triggered = self._is_admin(request.headers.get(PROFILE_HEADER))
+        if not triggered and (self.sample_rate <= 0 or random.random() >= self.sample_rate):
+            return
+        g.profile_id = uuid.uuid4().hex[:16] if triggered else None
+        if self.mode == 'cprofile':
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler is already active on this thread
+                return
+            g.profile = profile
+        else:
+            g.profile_thread = threading.get_ident()
+            g.profile = self._sampler.start(g.profile_thread)
+
+    def _after_request(self, response):
+        # The profile itself is stopped at teardown, only the id is known here
+        profile_id = g.get('profile_id')
+        if profile_id and 'profile' in g:
+            response.headers['X-Profile-Id'] = profile_id
+        return response
+
+    def _teardown_request(self, exc):
+        # Teardown also runs when an exception skips after_request, so a
+        # profile never stays enabled on the worker thread
+        profile = g.pop('profile', None)
+        if profile is None:
+            return
+
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        if self.mode == 'cprofile':
+            profile.disable()
+            result = pstats.Stats(profile)
+        else:
+            self._sampler.stop(g.pop('profile_thread'))
+            result = profile
+
+        with self._lock:
+            self._requests[endpoint] += 1
+            if self.mode == 'cprofile':
+                if endpoint in self._stats:
+                    self._stats[endpoint].add(result)
+                else:
+                    # A separate object, so adding to the aggregate never changes result
+                    self._stats[endpoint] = pstats.Stats(profile)
+            else:
+                self._stacks.setdefault(endpoint, Counter()).update(result)
+
+            profile_id = g.pop('profile_id', None)
+            if profile_id:
+                self._recent[profile_id] = (endpoint, result)
+                while len(self._recent) > _RECENT_PROFILES:
+                    self._recent.popitem(last=False)
+
+    # ============= ADMIN ENDPOINT =============
+
+    def _admin_view(self):
+        auth = request.headers.get('Authorization', '')
+        token = auth[len('Bearer '):] if auth.startswith('Bearer ') else request.headers.get('X-Admin-Token')
+        if not self._is_admin(token):
+            return jsonify({'success': False, 'error': 'Forbidden'}), 403
+
+        if request.method == 'DELETE':
+            with self._lock:
+                self._stats.clear()
+                self._stacks.clear()
+                self._requests.clear()
+                self._recent.clear()
+            return jsonify({'success': True})
+
+        profile_id = request.args.get('id')
+        endpoint = request.args.get('endpoint')
+        with self._lock:
+            if profile_id:
+                endpoint, result = self._recent.get(profile_id, (None, None))
+            elif endpoint:
+                result = self._stats.get(endpoint) if self.mode == 'cprofile' else self._stacks.get(endpoint)
+            else:
+                return jsonify({
+                    'success': True,
+                    'mode': self.mode,
+                    'sample_rate': self.sample_rate,
+                    'endpoints': dict(self._requests)
+                })
+            if result is None:
+                return jsonify({'success': False, 'error': 'No profile found'}), 404
+            return self._render(result, request.args.get('format', 'text'), endpoint)
+
+    def _render(self, result, fmt, endpoint):
+        if isinstance(result, Counter):
+            if fmt not in ('collapsed', 'text'):
+                return jsonify({'success': False, 'error': 'sample mode supports format=collapsed or text'}), 400
+            lines = [f'{stack} {count}' for stack, count in result.most_common()]
+            return Response('\n'.join(lines) + '\n', mimetype='text/plain')
+
+        if fmt == 'pstats':
+            # Same bytes as Stats.dump_stats(), load with pstats.Stats(path)
+            return Response(marshal.dumps(result.stats), mimetype='application/octet-stream', headers={
+                'Content-Disposition': f'attachment; filename="{endpoint.strip("/").replace("/", "_") or "root"}.pstats"'
+            })
+        if fmt != 'text':
+            return jsonify({'success': False, 'error': 'cprofile mode supports format=text or pstats'}), 400
+        out = io.StringIO()
+        result.stream = out
+        result.sort_stats(request.args.get('sort', 'cumulative')).print_stats(int(request.args.get('limit', 40)))
+        return Response(out.getvalue(), mimetype='text/plain')
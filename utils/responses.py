@@ -0,0 +1,170 @@
+# utils/responses.py - Compact timetables, fast JSON and compression
+#
+# Timetable endpoints can return a compact columnar body instead of one dict
+# per day, selected with format=compact (query string or JSON body) or
+# Accept: application/vnd.salah.compact+json, optionally with times as
+# minutes since midnight (times=minutes):
+#
+#   {"prayers": {"date": ["2026-03-01", ...], "fajr": [340, ...], ...}}
+#
+# orjson and brotli are used when installed and skipped otherwise.
+import gzip
+import json
+import os
+
+from utils.prayer_calc import PRAYER_NAMES
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPACT_MIMETYPE = 'application/vnd.salah.compact+json'
+FORMATS = ('full', 'compact')
+TIME_FORMATS = ('hhmm', 'minutes')
+
+# Smaller bodies are sent uncompressed (headers and CPU cost more than they save)
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', '1024'))
+GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', '6'))
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', '5'))
+COMPRESSIBLE_MIMETYPES = ('application/json', COMPACT_MIMETYPE, 'text/plain', 'text/csv', 'text/calendar')
+
+# ============= COMPACT TIMETABLES =============
+
+def response_format(options, accept_mimetypes):
+    """
+    Pick the timetable representation for a request
+
+    Args:
+        options: Mapping with optional 'format' and 'times' (query args or JSON body)
+        accept_mimetypes: request.accept_mimetypes
+
+    Returns:
+        (format, time_format), e.g. ('compact', 'minutes')
+    """
+    fmt = (options.get('format') or '').lower()
+    if not fmt:
+        # An explicit */* or application/json does not opt in; only the vendor type does
+        fmt = 'compact' if accept_mimetypes.best == COMPACT_MIMETYPE else 'full'
+    time_format = (options.get('times') or 'hhmm').lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}, expected one of {', '.join(FORMATS)}")
+    if time_format not in TIME_FORMATS:
+        raise ValueError(f"Unknown times {time_format!r}, expected one of {', '.join(TIME_FORMATS)}")
+    return fmt, time_format
+
+# 'HH:MM' -> minutes since midnight; a lookup is several times faster than parsing
+_MINUTES = {f'{h:02d}:{m:02d}': h * 60 + m for h in range(24) for m in range(60)}
+
+def time_to_minutes(value):
+    """'05:40' -> 340"""
+    minutes = _MINUTES.get(value)
+    if minutes is None:
+        hours, minutes = value.split(':')
+        return int(hours) * 60 + int(minutes)
+    return minutes
+
+def format_times(times, time_format):
+    """One day's times dict in the requested time format"""
+    if time_format == 'minutes':
+        return {name: time_to_minutes(value) for name, value in times.items()}
+    return times
+
+def format_days(days, fmt, time_format):
+    """
+    Render a list of {'date': ..., 'times': {...}, ...} day entries
+
+    Full format keeps the entries (times converted to minutes if asked);
+    compact returns one array per column, with the same keys as the entries
+    plus one column per prayer.
+    """
+    if fmt == 'full':
+        if time_format == 'hhmm':
+            return days
+        return [{**day, 'times': format_times(day['times'], time_format)} for day in days]
+
+    columns = {key: [day[key] for day in days] for key in (days[0] if days else {}) if key != 'times'}
+    times = [day['times'] for day in days]
+    for name in PRAYER_NAMES:
+        if time_format == 'minutes':
+            columns[name] = [time_to_minutes(t[name]) for t in times]
+        else:
+            columns[name] = [t[name] for t in times]
+    return columns
+
+# ============= ENCODING =============
+
+def dumps(obj, default, sort_keys=True):
+    """Compact JSON as bytes (orjson if installed), with default for unsupported types"""
+    if orjson is not None:
+        # Passthrough so dates go through default like with the json module
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(obj, default=default, option=option)
+        except orjson.JSONEncodeError:
+            # e.g. integers beyond 64 bits; the json module copes
+            pass
+    return json.dumps(obj, default=default, sort_keys=sort_keys, separators=(',', ':')).encode()
+
+def choose_encoding(accept_encodings):
+    """Best supported Content-Encoding for request.accept_encodings, or None"""
+    candidates = ['br', 'gzip'] if brotli is not None else ['gzip']
+    best = accept_encodings.best_match(candidates)
+    if best is None or accept_encodings[best] <= 0:
+        return None
+    return best
+
+def encode_body(body, accept_encodings):
+    """
+    Compress body with the best encoding the client accepts
+
+    Returns:
+        (compressed body, encoding), or None to send it as is
+    """
+    encoding = choose_encoding(accept_encodings)
+    if encoding is None or len(body) < COMPRESS_MIN_BYTES:
+        return None
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY), encoding
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0), encoding
+
+def compress_response(response, accept_encodings):
+    """
+    Compress a large buffered text/JSON response in place
+
+    Strong ETags get an encoding suffix, since the compressed bytes differ.
+    Streamed, already encoded and small responses are left alone.
+    """
+    if (response.direct_passthrough or response.is_streamed
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or 'Content-Encoding' in response.headers):
+        return response
+    response.vary.add('Accept-Encoding')
+    if response.status_code < 200 or response.status_code in (204, 304):
+        return response
+
+    encoded = encode_body(response.get_data(), accept_encodings)
+    if encoded is None:
+        return response
+    body, encoding = encoded
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(encoded_etag(etag, encoding))
+    return response
+
+def encoded_etag(etag, encoding):
+    return f'{etag}-{encoding}'
+
+def etag_variants(etag):
+    """The ETag and its compressed variants, as matched by If-None-Match"""
+    return [etag, encoded_etag(etag, 'gzip'), encoded_etag(etag, 'br')]
@@ -0,0 +1,111 @@
+# utils/singleflight.py - Coalesce concurrent calls for the same key
+import asyncio
+import threading
+
+from utils import metrics
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Run at most one call per key at a time
+
+    Callers that arrive while a call for their key is in flight wait for
+    it and share its result (or its exception). Nothing is remembered once
+    the call finishes, so a failure is never cached.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executions = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        if leader:
+            try:
+                call.result = fn(*args, **kwargs)
+            except BaseException as e:
+                call.error = e
+                with self._lock:
+                    self.errors += 1
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        else:
+            call.done.wait()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'executions': self.executions,
+                'coalesced_waiters': self.coalesced,
+                'errors': self.errors,
+            }
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines; use from a single event loop"""
+
+    def __init__(self):
+        self._calls = {}
+        self.executions = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    async def do(self, key, fn, *args, **kwargs):
+        task = self._calls.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            # The call runs as its own task, so cancelling the request that
+            # started it (e.g. a client disconnect) doesn't fail the others
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._calls[key] = task
+            self.executions += 1
+            task.add_done_callback(lambda done: self._finish(key, done))
+        # Shielded: a caller being cancelled must not cancel the shared call
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        del self._calls[key]
+        if not task.cancelled() and task.exception() is not None:
+            self.errors += 1
+
+    def stats(self):
+        return {
+            'in_flight': len(self._calls),
+            'executions': self.executions,
+            'coalesced_waiters': self.coalesced,
+            'errors': self.errors,
+        }
+
+def export_metrics(flight, prefix):
+    """Expose a SingleFlight's or AsyncSingleFlight's stats on /metrics as prefix_*"""
+    metrics.callback_counter(f'{prefix}_executions_total', 'Calls run, at most one per key at a time',
+                             lambda: flight.stats()['executions'])
+    metrics.callback_counter(f'{prefix}_coalesced_waiters_total', 'Callers that waited for a call already in flight',
+                             lambda: flight.stats()['coalesced_waiters'])
+    metrics.callback_counter(f'{prefix}_errors_total', 'Calls that raised',
+                             lambda: flight.stats()['errors'])
+    metrics.gauge(f'{prefix}_in_flight', 'Calls running now', lambda: flight.stats()['in_flight'])
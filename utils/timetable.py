@@ -0,0 +1,156 @@
+# utils/timetable.py - Vectorized prayer timetables for date ranges
+#
+# Same formulas as utils/prayer_calc.py, evaluated with NumPy for every day
+# of a range at once. A whole year is a handful of array operations instead
+# of 365 calls into the scalar engine.
+import math
+from datetime import timedelta
+
+import numpy as np
+
+from utils.prayer_calc import PRAYER_NAMES, _INITIAL_TIMES, UndefinedTimeError, get_asr_factor, get_method_params
+
+# date.toordinal() + this = Julian date at 0h UT
+_ORDINAL_TO_JD = 1721424.5
+
+# 'HH:MM' for every minute of the day, indexed by minutes since midnight
+_MINUTE_LABELS = np.array([f'{m // 60:02d}:{m % 60:02d}' for m in range(24 * 60)], dtype=object)
+
+def _sun_position(jd):
+    """Vectorized sun_position: (declination in degrees, equation of time in hours)"""
+    d = jd - 2451545.0
+    g = np.radians((357.529 + 0.98560028 * d) % 360)
+    q = (280.459 + 0.98564736 * d) % 360
+    l = np.radians((q + 1.915 * np.sin(g) + 0.020 * np.sin(2 * g)) % 360)
+    e = np.radians(23.439 - 0.00000036 * d)
+
+    ra = np.degrees(np.arctan2(np.cos(e) * np.sin(l), np.cos(l))) / 15
+    eqt = q / 15 - ra % 24
+    decl = np.degrees(np.arcsin(np.sin(e) * np.sin(l)))
+    return decl, eqt
+
+class _RangeCalculator:
+    """Evaluates sun-angle times for one location over an array of days"""
+
+    def __init__(self, lat, jdate):
+        self.lat = lat
+        self.sin_lat = math.sin(math.radians(lat))
+        self.cos_lat = math.cos(math.radians(lat))
+        self.jdate = jdate
+
+    def mid_day(self, time):
+        _, eqt = _sun_position(self.jdate + time / 24)
+        return (12 - eqt) % 24
+
+    def sun_angle_time(self, angle, time, ccw=False):
+        decl, _ = _sun_position(self.jdate + time / 24)
+        noon = self.mid_day(time)
+        decl_rad = np.radians(decl)
+        cos_h = ((-np.sin(np.radians(angle)) - np.sin(decl_rad) * self.sin_lat) /
+                 (np.cos(decl_rad) * self.cos_lat))
+        # Out of range means the sun never reaches this angle (high latitudes)
+        with np.errstate(invalid='ignore'):
+            t = np.degrees(np.arccos(np.where(np.abs(cos_h) <= 1, cos_h, np.nan))) / 15
+        return noon - t if ccw else noon + t
+
+    def asr_time(self, factor, time):
+        decl, _ = _sun_position(self.jdate + time / 24)
+        angle = -np.degrees(np.arctan(1 / (factor + np.tan(np.radians(np.abs(self.lat - decl))))))
+        return self.sun_angle_time(angle, time)
+
+def _adjust_high_lat_times(times, base, angle, night, ccw=False):
+    """Vectorized angle-based high latitude clamp"""
+    portion = angle / 60 * night
+    diff = (base - times) % 24 if ccw else (times - base) % 24
+    with np.errstate(invalid='ignore'):
+        clamp = np.isnan(times) | (diff > portion)
+    adjusted = base - portion if ccw else base + portion
+    return np.where(clamp, adjusted, times)
+
+def compute_timetable(lat, lon, ordinals, tz_offsets, method='ISNA', asr_method='standard'):
+    """
+    Compute prayer times for many days at once
+
+    Args:
+        lat, lon: Location in degrees
+        ordinals: Array of date.toordinal() values
+        tz_offsets: Array of UTC offsets in hours, one per day
+        method: Calculation method name
+        asr_method: 'standard' or 'hanafi'
+
+    Returns:
+        Dict of prayer name -> array of local times in hours (NaN if undefined)
+    """
+    params = get_method_params(method)
+    rise_set_angle = 0.833
+    isha_angle = params.get('isha', params.get('isha_minutes'))
+
+    jdate = np.asarray(ordinals, dtype=np.float64) + _ORDINAL_TO_JD - lon / (15 * 24)
+    calc = _RangeCalculator(lat, jdate)
+    init = _INITIAL_TIMES
+    shift = np.asarray(tz_offsets, dtype=np.float64) - lon / 15
+
+    times = {
+        'fajr': calc.sun_angle_time(params['fajr'], init['fajr'], ccw=True) + shift,
+        'sunrise': calc.sun_angle_time(rise_set_angle, init['sunrise'], ccw=True) + shift,
+        'dhuhr': calc.mid_day(init['dhuhr']) + shift,
+        'asr': calc.asr_time(get_asr_factor(asr_method), init['asr']) + shift,
+        'sunset': calc.sun_angle_time(rise_set_angle, init['sunset']) + shift,
+        'isha': calc.sun_angle_time(isha_angle, init['isha']) + shift,
+    }
+
+    night = (times['sunrise'] - times['sunset']) % 24
+    times['fajr'] = _adjust_high_lat_times(times['fajr'], times['sunrise'], params['fajr'], night, ccw=True)
+    times['isha'] = _adjust_high_lat_times(times['isha'], times['sunset'], isha_angle, night)
+    if 'maghrib' in params:
+        maghrib = calc.sun_angle_time(params['maghrib'], init['maghrib']) + shift
+        times['maghrib'] = _adjust_high_lat_times(maghrib, times['sunset'], params['maghrib'], night)
+    else:
+        times['maghrib'] = times['sunset']
+
+    if 'isha_minutes' in params:
+        times['isha'] = times['maghrib'] + params['isha_minutes'] / 60
+
+    return {name: times[name] for name in PRAYER_NAMES}
+
+def _format_times(hours):
+    """Vectorized format_time: array of hours -> list of 'HH:MM'"""
+    hours = (hours + 0.5 / 60) % 24
+    h = np.floor(hours)
+    m = np.floor((hours - h) * 60)
+    return _MINUTE_LABELS[(h * 60 + m).astype(np.intp)].tolist()
+
+def calculate_timetable(lat, lon, start_date, num_days, method='ISNA', asr_method='standard', tz_offsets=None):
+    """
+    Calculate prayer times for num_days consecutive days
+
+    Args:
+        lat, lon: Location in degrees
+        start_date: First date (date or datetime)
+        num_days: Number of days
+        method: Calculation method name
+        asr_method: 'standard' or 'hanafi'
+        tz_offsets: UTC offsets in hours per day (looked up if None)
+
+    Returns:
+        List of times dicts (same shape as calculate_prayer_times), one per day
+
+    Raises:
+        UndefinedTimeError: if a time is undefined on some day (polar day/night)
+    """
+    if tz_offsets is None:
+        from utils.timezones import utc_offsets_hours
+        tz_offsets = utc_offsets_hours(lat, lon, start_date, num_days)
+
+    first = start_date.toordinal()
+    times = compute_timetable(lat, lon, np.arange(first, first + num_days), tz_offsets, method, asr_method)
+
+    columns = {}
+    for name, values in times.items():
+        undefined = np.isnan(values)
+        if undefined.any():
+            day = start_date + timedelta(days=int(np.argmax(undefined)))
+            raise UndefinedTimeError(f"{name} is undefined at latitude {lat} on {day.strftime('%Y-%m-%d')}")
+        columns[name] = _format_times(values)
+
+    return [dict(zip(PRAYER_NAMES, row)) for row in zip(*(columns[name] for name in PRAYER_NAMES))]
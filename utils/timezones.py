@@ -0,0 +1,198 @@
+# utils/timezones.py - Resolve the timezone and UTC offset for a location
+#
+# Point-in-polygon lookups take about a millisecond (several near borders),
+# so names are read from a precomputed grid of timezone ids instead, built
+# by scripts/build_timezone_grid.py. The file is memory-mapped on first use,
+# so workers start without loading it and share its pages. Only cells that
+# timezone borders pass through fall back to the polygons, through an LRU
+# cache. Without the file, every lookup uses the polygons.
+from datetime import datetime, timedelta
+from functools import lru_cache
+import json
+import logging
+import os
+import struct
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TIMEZONE_GRID_PATH = os.getenv(
+    'TIMEZONE_GRID_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'timezone_grid.bin'))
+TIMEZONE_POLYGON_CACHE_SIZE = int(os.getenv('TIMEZONE_POLYGON_CACHE_SIZE', '4096'))
+
+# Grid file layout: magic, header length (uint32), JSON header, padding to a
+# multiple of 8 bytes, then rows x cols little-endian uint16 cells with row 0
+# at the north pole and column 0 at -180. Cell value i > 0 is header
+# zones[i - 1]; GRID_MIXED cells contain a timezone border.
+GRID_MAGIC = b'TZGRID1\n'
+GRID_DTYPE = '<u2'
+GRID_MIXED = 0
+
+_finder = None
+_grid = None
+_grid_lock = threading.Lock()
+
+def _get_finder():
+    """Create the TimezoneFinder on first use (it loads polygon data)"""
+    global _finder
+    if _finder is None:
+        from timezonefinder import TimezoneFinder
+        _finder = TimezoneFinder()
+    return _finder
+
+class TimezoneGrid:
+    """Memory-mapped grid of timezone ids (see GRID_MAGIC for the layout)"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            if f.read(len(GRID_MAGIC)) != GRID_MAGIC:
+                raise ValueError(f'{path} is not a timezone grid file')
+            (header_size,) = struct.unpack('<I', f.read(4))
+            header = json.loads(f.read(header_size))
+        offset = len(GRID_MAGIC) + 4 + header_size
+        offset += -offset % 8
+
+        self.cells_per_degree = header['cells_per_degree']
+        self.zones = [None] + header['zones']
+        self.cells = np.memmap(path, dtype=GRID_DTYPE, mode='r', offset=offset,
+                               shape=(180 * self.cells_per_degree, 360 * self.cells_per_degree))
+
+    def cell_values(self, lats, lons):
+        """Cell values (zone index or GRID_MIXED) for arrays of coordinates"""
+        rows, cols = self.cells.shape
+        row = np.clip(np.floor((90 - lats) * self.cells_per_degree).astype(np.int64), 0, rows - 1)
+        col = np.floor((lons + 180) * self.cells_per_degree).astype(np.int64) % cols
+        return self.cells[row, col]
+
+    def cell_value(self, lat, lon):
+        rows, cols = self.cells.shape
+        row = min(rows - 1, max(0, int((90 - lat) * self.cells_per_degree)))
+        col = int((lon + 180) * self.cells_per_degree) % cols
+        return int(self.cells[row, col])
+
+def get_grid():
+    """
+    Open the timezone grid on first use
+
+    Returns:
+        TimezoneGrid, or None when the file is missing or unreadable
+    """
+    global _grid
+    if _grid is None:
+        with _grid_lock:
+            if _grid is None:
+                try:
+                    _grid = TimezoneGrid(TIMEZONE_GRID_PATH)
+                    logger.info("Timezone grid loaded from %s (%d cells per degree)",
+                                TIMEZONE_GRID_PATH, _grid.cells_per_degree)
+                except (OSError, ValueError) as e:
+                    logger.warning("Timezone grid unavailable, using polygon lookups: %s", e)
+                    _grid = False
+    return _grid or None
+
+@lru_cache(maxsize=TIMEZONE_POLYGON_CACHE_SIZE)
+def _polygon_timezone_name(lat, lon):
+    finder = _get_finder()
+    return finder.timezone_at(lng=lon, lat=lat) or finder.closest_timezone_at(lng=lon, lat=lat)
+
+def timezone_name(lat, lon):
+    """
+    Get the IANA timezone name for coordinates
+
+    Returns:
+        Timezone name like 'America/New_York', or None if unknown
+    """
+    grid = get_grid()
+    if grid is not None:
+        value = grid.cell_value(lat, lon)
+        if value != GRID_MIXED:
+            return grid.zones[value]
+    return _polygon_timezone_name(lat, lon)
+
+def timezone_names(coordinates):
+    """
+    Get the IANA timezone names for many (lat, lon) pairs at once
+
+    Returns:
+        List of timezone names (or None), in input order
+    """
+    coordinates = list(coordinates)
+    grid = get_grid()
+    if grid is None or not coordinates:
+        return [_polygon_timezone_name(lat, lon) for lat, lon in coordinates]
+
+    points = np.asarray(coordinates, dtype=float)
+    values = grid.cell_values(points[:, 0], points[:, 1])
+    return [grid.zones[value] if value != GRID_MIXED else _polygon_timezone_name(lat, lon)
+            for (lat, lon), value in zip(coordinates, values.tolist())]
+
+# Offsets are taken at local noon: DST switches happen at night (01:00-03:00
+# local), so on a change day the offset at noon is the one in effect from
+# Fajr to Isha, whereas the offset at midnight is the previous day's.
+def _local_noon_offset(tz, date):
+    local_noon = tz.localize(datetime(date.year, date.month, date.day, 12))
+    return local_noon.utcoffset().total_seconds() / 3600
+
+def utc_offset_hours(lat, lon, date):
+    """
+    Get the UTC offset (in hours) in effect at local noon of a date
+
+    Falls back to the nautical offset (longitude / 15) when the location
+    has no known timezone, e.g. in the open ocean.
+    """
+    import pytz
+
+    name = timezone_name(round(lat, 4), round(lon, 4))
+    if not name:
+        return round(lon / 15)
+
+    return _local_noon_offset(pytz.timezone(name), date)
+
+# Offsets are sampled this many days apart when filling a date range. Zones
+# never change offset twice within two weeks, so equal samples mean no change.
+_OFFSET_SAMPLE_DAYS = 14
+
+def utc_offsets_hours(lat, lon, start_date, num_days):
+    """
+    Get the UTC offset for each of num_days consecutive days
+
+    Only samples every couple of weeks and bisects around DST changes,
+    so a full year costs a few dozen timezone lookups instead of 365.
+    """
+    import pytz
+
+    name = timezone_name(round(lat, 4), round(lon, 4))
+    if not name:
+        return [round(lon / 15)] * num_days
+
+    tz = pytz.timezone(name)
+    start = datetime(start_date.year, start_date.month, start_date.day)
+
+    def offset_at(i):
+        return _local_noon_offset(tz, start + timedelta(days=i))
+
+    offsets = [None] * num_days
+    last = num_days - 1
+    offsets[0] = offset_at(0)
+    lo = 0
+    while lo < last:
+        hi = min(lo + _OFFSET_SAMPLE_DAYS, last)
+        offsets[hi] = offset_at(hi)
+        # Bisect down to the day the offset changes
+        a, b = lo, hi
+        while offsets[a] != offsets[b] and b - a > 1:
+            mid = (a + b) // 2
+            offsets[mid] = offset_at(mid)
+            if offsets[mid] == offsets[a]:
+                a = mid
+            else:
+                b = mid
+        for i in range(lo + 1, hi):
+            if offsets[i] is None:
+                offsets[i] = offsets[lo] if i <= a else offsets[hi]
+        lo = hi
+
+    return offsets